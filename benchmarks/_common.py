@@ -0,0 +1,34 @@
+"""Helpers shared by the end-to-end benchmarks"""
+import json
+import os
+import statistics
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+def percentiles(samples, scale=1e3):
+    # p50/p90/p99/mean/max of samples in seconds, in milliseconds by default
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * scale
+
+    return {
+        "count": len(ordered),
+        "p50": round(at(0.50), 3),
+        "p90": round(at(0.90), 3),
+        "p99": round(at(0.99), 3),
+        "mean": round(statistics.fmean(ordered) * scale, 3),
+        "max": round(ordered[-1] * scale, 3),
+    }
+
+
+def write_result(result, output=None):
+    print(json.dumps(result, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
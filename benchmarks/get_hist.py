@@ -0,0 +1,74 @@
+"""Measure get_hist latency by n_bars and interval
+
+Starts a local MockTradingViewServer (or uses the one given with --url)
+and times get_hist for every combination of --n-bars and --intervals,
+after one warm up call that opens the pooled connection. Reports latency
+percentiles in milliseconds and the bars per second they correspond to.
+--latency adds a delay before the server answers each message, to mimic
+the round trip to TradingView.
+
+Usage:
+    python benchmarks/get_hist.py [--n-bars 100 1000 5000] [--intervals 1 1H 1D] [--runs 20] [--latency 0] [--output result.json]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from _common import percentiles, write_result
+
+from tvDatafeed import Interval, TvDatafeed
+from tvDatafeed.mock_server import MockTradingViewServer
+
+
+def run(tv, interval, n_bars, runs):
+    tv.get_hist("BENCH", "MOCK", interval, n_bars=n_bars)  # warm up
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        data = tv.get_hist("BENCH", "MOCK", interval, n_bars=n_bars)
+        samples.append(time.perf_counter() - start)
+        if data is None or len(data) != n_bars:
+            raise RuntimeError(f"get_hist returned {None if data is None else len(data)} of {n_bars} bars")
+
+    latency = percentiles(samples)
+    return {
+        "interval": interval.value,
+        "n_bars": n_bars,
+        "latency_ms": latency,
+        "bars_per_s": round(n_bars / latency["p50"] * 1e3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-bars", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--intervals", nargs="+", default=["1", "1H", "1D"], help="interval values, e.g. 5S 1 1H 1D")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the local server waits before answering")
+    parser.add_argument("--url", help="websocket url of a running mock server instead of starting one")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.getLogger("tvDatafeed").setLevel(logging.ERROR)
+
+    server = None
+    if args.url is None:
+        server = MockTradingViewServer(n_bars=max(args.n_bars), latency=args.latency, push_interval=None).start()
+    tv = TvDatafeed(ws_url=args.url or server.url)
+    try:
+        runs = [
+            run(tv, Interval(interval), n_bars, args.runs)
+            for interval in args.intervals
+            for n_bars in args.n_bars
+        ]
+    finally:
+        tv.close()
+        if server is not None:
+            server.stop()
+
+    write_result({"benchmark": "get_hist", "runs_per_case": args.runs, "latency": args.latency, "cases": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
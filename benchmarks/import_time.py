@@ -0,0 +1,79 @@
+"""Measure the time of ``import tvDatafeed`` against a budget
+
+Every sample imports the package in a fresh interpreter twice: once on its
+own (total import time) and once after its required dependencies (pandas,
+numpy, requests, websocket-client, dateutil) were already imported, which
+gives the time spent in tvDatafeed's own modules. The run fails if the
+median own import time is above the budget or if importing tvDatafeed
+pulled in an optional dependency (selenium, bs4, aiohttp, django, decouple).
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--budget-ms 50] [--output result.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIRED = "import pandas, numpy, requests, websocket, dateutil.tz, dateutil.relativedelta"
+OPTIONAL = ("selenium", "bs4", "aiohttp", "django", "decouple")
+SCRIPT = """
+import sys, time, json
+{preload}
+before = set(sys.modules)
+start = time.perf_counter()
+import tvDatafeed
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, sorted(set(sys.modules) - before)]))
+"""
+
+
+def sample(preload=""):
+    # returns (import time in ms, names of modules imported by tvDatafeed)
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(preload=preload)],
+        cwd=REPO, capture_output=True, text=True, check=True,
+    )
+    elapsed, modules = json.loads(result.stdout.splitlines()[-1])
+    return elapsed * 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="budget for tvDatafeed's own modules")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    totals, own, imported = [], [], set()
+    for _ in range(args.runs):
+        totals.append(sample()[0])
+        elapsed, modules = sample(REQUIRED)
+        own.append(elapsed)
+        imported |= {name.split(".")[0] for name in modules}
+
+    optional_imported = sorted(imported & set(OPTIONAL))
+    result = {
+        "benchmark": "import_time",
+        "runs": args.runs,
+        "total_ms_median": round(statistics.median(totals), 2),
+        "own_ms_median": round(statistics.median(own), 2),
+        "own_ms_max": round(max(own), 2),
+        "budget_ms": args.budget_ms,
+        "optional_imported": optional_imported,
+    }
+    result["passed"] = result["own_ms_median"] <= args.budget_ms and not optional_imported
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Measure TvDatafeedLive bar close to callback latency
+
+Starts a local MockTradingViewServer and, for every size in --sizes,
+creates that many Seis of distinct symbols with one consumer each, waits
+for --bars bar closes and records for every delivered bar the time from
+the bar's close (open time plus interval) to the call of its consumer's
+callback. In streaming mode the server pushes updates every
+--push-interval seconds, which bounds how early a new bar can be seen, so
+the push interval is part of the measured latency. The run fails if fewer
+than --min-delivered of the expected bars were delivered.
+
+Usage:
+    python benchmarks/live_latency.py [--sizes 10 100 1000] [--interval 5S] [--bars 3] [--mode streaming] [--output result.json]
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+
+from _common import percentiles, write_result
+
+from tvDatafeed import Interval, TvDatafeedLive, protocol
+from tvDatafeed.mock_server import MockTradingViewServer
+
+
+def run(server, size, interval, bars, streaming):
+    seconds = protocol.interval_seconds(interval.value)
+    samples = []
+    lock = threading.Lock()
+
+    def callback(seis, data):
+        received = time.time()
+        with lock:
+            samples.append(received - (data.index[-1].timestamp() + seconds))
+
+    tvl = TvDatafeedLive(streaming=streaming, ws_url=server.url, search_url=server.search_url)
+    try:
+        start = time.perf_counter()
+        for i in range(size):
+            tvl.new_seis(f"BENCH{i}", "MOCK", interval).new_consumer(callback)
+        setup = time.perf_counter() - start
+
+        # first full bar closing after all Seis were added, plus time for the last deliveries
+        deadline = (time.time() // seconds + 1 + bars) * seconds + 2 * seconds
+        while time.time() < deadline and len(samples) < size * bars:
+            time.sleep(0.05)
+        with lock:
+            delivered = list(samples)
+    finally:
+        tvl.del_tvdatafeed()
+
+    return {
+        "size": size,
+        "setup_s": round(setup, 3),
+        "expected": size * bars,
+        "delivered": len(delivered),
+        "latency_ms": percentiles(delivered),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--interval", default="5S", help="interval value of all Seis")
+    parser.add_argument("--bars", type=int, default=3, help="bar closes to wait for per size")
+    parser.add_argument("--mode", choices=("streaming", "polling"), default="streaming")
+    parser.add_argument("--push-interval", type=float, default=0.05, help="seconds between server updates")
+    parser.add_argument("--min-delivered", type=float, default=0.95, help="fraction of expected bars that must arrive")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.getLogger("tvDatafeed").setLevel(logging.ERROR)
+
+    interval = Interval(args.interval)
+    with MockTradingViewServer(push_interval=args.push_interval) as server:
+        runs = [run(server, size, interval, args.bars, args.mode == "streaming") for size in args.sizes]
+
+    result = {
+        "benchmark": "live_latency",
+        "mode": args.mode,
+        "interval": interval.value,
+        "push_interval": args.push_interval,
+        "runs": runs,
+        "passed": all(run["delivered"] >= args.min_delivered * run["expected"] for run in runs),
+    }
+    write_result(result, args.output)
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
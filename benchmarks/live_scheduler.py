@@ -0,0 +1,86 @@
+"""Measure how the live feed scheduler scales with the number of Seis
+
+Fills TvDatafeedLive's interval scheduler with Seis spread over all
+TradingView intervals and times the operations new_seis, del_seis and the
+main loop use: adding a Seis, looking it up, membership checks, finding
+the next expiry, collecting expired intervals and removing a Seis. No
+network connection is made. The run fails if the mean time of any
+operation at the largest size is more than --max-growth times its time at
+the smallest size.
+
+Usage:
+    python benchmarks/live_scheduler.py [--sizes 100 1000 10000] [--max-growth 5] [--output result.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime as dt, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tvDatafeed import Interval, Seis, TvDatafeedLive  # noqa: E402
+
+
+def timed(func, items):
+    # mean time of func(item) over items in microseconds
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / max(len(items), 1) * 1e6
+
+
+def run(size):
+    sat = TvDatafeedLive._SeisesAndTrigger()
+    intervals = list(Interval)
+    seises = [Seis(f"SYM{i}", "EXCH", intervals[i % len(intervals)]) for i in range(size)]
+    now = dt.now().astimezone()
+
+    result = {"size": size}
+    result["append_us"] = timed(lambda seis: sat.append(seis, now), seises)
+    result["get_seis_us"] = timed(lambda seis: sat.get_seis(seis.symbol, seis.exchange, seis.interval), seises)
+    result["contains_us"] = timed(lambda seis: seis in sat, seises)
+    result["next_trigger_us"] = timed(lambda _: sat._next_trigger_dt(), range(1000))
+    result["group_us"] = timed(lambda interval: sat[(interval.value, None)], intervals)
+
+    for group, values in dict.items(sat):  # make every group expire
+        values[1] = now - timedelta(seconds=1)
+        sat._schedule(group, values[1])
+    result["get_expired_us"] = timed(lambda _: sat.get_expired(), range(1))
+
+    result["discard_us"] = timed(sat.discard, seises)
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--max-growth", type=float, default=5.0, help="allowed slowdown from smallest to largest size")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [run(size) for size in args.sizes]
+    operations = [key for key in runs[0] if key.endswith("_us") and key not in ("get_expired_us", "next_trigger_us")]
+    growth = {
+        key: round(runs[-1][key] / runs[0][key], 2) if runs[0][key] else 0.0
+        for key in operations
+    }
+    result = {
+        "benchmark": "live_scheduler",
+        "runs": runs,
+        "growth": growth,
+        "max_growth": args.max_growth,
+        "passed": all(value <= args.max_growth for value in growth.values()),
+    }
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
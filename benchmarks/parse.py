@@ -0,0 +1,92 @@
+"""Measure the throughput of building dataframes from received messages
+
+Times protocol.create_df, which get_hist uses to turn the received
+websocket messages into a dataframe, in bars per second, and separately
+its two stages: decoding the frames and collecting the bars
+(FrameParser and BarCollector) and building the dataframe (bars_to_df).
+Input is a timescale_update message with --n-bars bars generated like
+MockTradingViewServer does, or the received messages of a recording made
+with tvDatafeed.replay.FrameRecorder given with --log, e.g. a real 5000
+bar response.
+
+Usage:
+    python benchmarks/parse.py [--n-bars 1000 5000 20000] [--log session.tvlog.gz] [--runs 20] [--output result.json]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from _common import write_result
+
+from tvDatafeed import protocol
+from tvDatafeed.mock_server import MockTradingViewServer
+from tvDatafeed.replay import FrameReplayer
+
+
+def generated(n_bars):
+    # raw data of one timescale_update answer with n_bars one minute bars
+    bars = MockTradingViewServer(n_bars=n_bars).bars("MOCK:BENCH", 60, 0, n_bars)
+    update = {"sds_1": {"node": "mock", "s": [{"i": i, "v": values} for i, values in enumerate(bars)]}}
+    return protocol.create_message("timescale_update", ["cs_bench", update])
+
+
+def collect(raw_data):
+    parser = protocol.FrameParser()
+    collector = protocol.BarCollector()
+    for line in raw_data.splitlines():
+        for _, message in parser.messages(line):
+            if message is not None:
+                collector.process(message)
+    return next((bars for bars in collector.bars.values() if bars), {})
+
+
+def best(func, runs):
+    # median seconds of func() over runs
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(name, raw_data, runs):
+    bars = collect(raw_data)
+    if not bars:
+        raise RuntimeError(f"no bars found in {name}")
+    n_bars = len(bars)
+    timings = {
+        "create_df": best(lambda: protocol.create_df(raw_data, "MOCK:BENCH", "UTC"), runs),
+        "collect": best(lambda: collect(raw_data), runs),
+        "bars_to_df": best(lambda: protocol.bars_to_df(bars, "MOCK:BENCH", "UTC"), runs),
+    }
+    return {
+        "input": name,
+        "n_bars": n_bars,
+        "bytes": len(raw_data.encode("utf-8")),
+        "median_ms": {stage: round(seconds * 1e3, 3) for stage, seconds in timings.items()},
+        "bars_per_s": {stage: round(n_bars / seconds) for stage, seconds in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-bars", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--log", help="frame log recorded with FrameRecorder, used instead of generated bars")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.log:
+        inputs = [(args.log, "\n".join(FrameReplayer(args.log).frames()))]
+    else:
+        inputs = [(f"generated {n_bars} bars", generated(n_bars)) for n_bars in args.n_bars]
+
+    result = {"benchmark": "parse", "runs_per_case": args.runs, "cases": [run(name, raw, args.runs) for name, raw in inputs]}
+    write_result(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Run all benchmarks and collect their results in one JSON file
+
+Runs every benchmark script in a fresh interpreter with its default
+arguments and writes one JSON document with their results, the git
+commit, Python version and platform, so runs can be compared across
+commits. With --compare the numeric results are matched against a
+previous run and the ratio current / baseline of every value is added
+(latencies and times: higher is slower, bars_per_s: higher is faster).
+Benchmarks which fail are reported with their exit code and the run
+exits with 1.
+
+Usage:
+    python benchmarks/run_all.py [--only get_hist parse] [--compare baseline.json] [--output result.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import REPO, write_result
+
+BENCHMARKS = ("import_time", "live_scheduler", "parse", "search_symbol", "get_hist", "live_latency")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(name):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "result.json")
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, os.path.join(REPO, "benchmarks", f"{name}.py"), "--output", output],
+            cwd=REPO, capture_output=True, text=True,
+        )
+        elapsed = round(time.perf_counter() - start, 1)
+        if not os.path.exists(output):
+            return {"benchmark": name, "exit_code": process.returncode, "seconds": elapsed, "error": process.stderr[-2000:]}
+        with open(output) as f:
+            result = json.load(f)
+    result.update(exit_code=process.returncode, seconds=elapsed)
+    return result
+
+
+def flatten(value, path=""):
+    # numeric leaves of a JSON document as {path: value}, list items keyed by their size/input/n_bars
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {path: value}
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = []
+        for index, item in enumerate(value):
+            key = index
+            if isinstance(item, dict):
+                key = "/".join(str(item[name]) for name in ("interval", "input", "size", "n_bars") if name in item) or index
+            items.append((key, item))
+    else:
+        return {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{path}.{key}" if path else str(key)))
+    return flat
+
+
+def compare(current, baseline):
+    old = flatten(baseline["results"])
+    return {
+        path: {"baseline": old[path], "current": value, "ratio": round(value / old[path], 3)}
+        for path, value in flatten(current["results"]).items()
+        if old.get(path) and not path.endswith(("exit_code", ".count", ".expected"))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="benchmarks to run, all by default")
+    parser.add_argument("--compare", help="result JSON of a previous run to compare against")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"running {name}", file=sys.stderr)
+        result["results"][name] = run(name)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        result["baseline_commit"] = baseline.get("commit")
+        result["comparison"] = compare(result, baseline)
+
+    write_result(result, args.output)
+    return 0 if all(item["exit_code"] == 0 for item in result["results"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
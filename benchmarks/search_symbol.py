@@ -0,0 +1,63 @@
+"""Measure search_symbol latency
+
+Starts a local MockTradingViewServer, which answers symbol search over
+HTTP, and times search_symbol with distinct search texts so every call is
+an HTTP request over the pooled keep-alive connection, then the same
+searches again answered from the symbol cache. Reports latency
+percentiles in milliseconds; --latency adds a delay before the server
+answers, to mimic the round trip to TradingView.
+
+Usage:
+    python benchmarks/search_symbol.py [--runs 200] [--latency 0] [--output result.json]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from _common import percentiles, write_result
+
+from tvDatafeed import SymbolCache, TvDatafeed
+from tvDatafeed.mock_server import MockTradingViewServer
+
+
+def timed(tv, texts, use_cache):
+    samples = []
+    for text in texts:
+        start = time.perf_counter()
+        result = tv.search_symbol(text, "MOCK", use_cache=use_cache)
+        samples.append(time.perf_counter() - start)
+        if not result:
+            raise RuntimeError(f"no search result for {text}")
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the local server waits before answering")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    logging.getLogger("tvDatafeed").setLevel(logging.ERROR)
+
+    texts = [f"BENCH{i}" for i in range(args.runs)]
+    with MockTradingViewServer(latency=args.latency, push_interval=None) as server:
+        tv = TvDatafeed(ws_url=server.url, search_url=server.search_url)
+        tv.symbol_cache = SymbolCache()  # start empty, without the process wide cache
+        try:
+            tv.search_symbol("WARMUP", "MOCK", use_cache=False)  # opens the keep-alive connection
+            result = {
+                "benchmark": "search_symbol",
+                "latency": args.latency,
+                "uncached_ms": timed(tv, texts, use_cache=False),
+                "cached_ms": timed(tv, texts, use_cache=True),
+            }
+        finally:
+            tv.close()
+
+    write_result(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
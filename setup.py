@@ -24,9 +24,16 @@ setup(
     install_requires=[
         "setuptools",
         "pandas",
+        "numpy",
+        "python-dateutil",
         "websocket-client",
         "requests"
     ],
+    extras_require={
+        "async": ["aiohttp"],
+        "cache": ["pyarrow"],
+        "browser": ["selenium", "beautifulsoup4"],
+    },
 )
 
 
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tvDatafeed.mock_server import MockTradingViewServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    """Local mock TradingView server, live updates are pushed every 0.1s"""
+    with MockTradingViewServer(push_interval=0.1, heartbeat_interval=1.0) as mock:
+        yield mock
+
+
+@pytest.fixture
+def tv(server):
+    from tvDatafeed import TvDatafeed
+
+    client = TvDatafeed(ws_url=server.url, search_url=server.search_url)
+    yield client
+    client.close()
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from tvDatafeed.mock_server import MockTradingViewServer
+
+pytest.importorskip("aiohttp")
+
+from tvDatafeed.aio import AsyncTvDatafeed  # noqa: E402
+
+
+def test_get_hist_many_reuses_connections(server):
+    async def fetch():
+        async with AsyncTvDatafeed(ws_url=server.url, search_url=server.search_url, max_concurrency=2) as tv:
+            return await tv.get_hist_many([f"MOCK:SYM{i}" for i in range(6)], n_bars=50)
+
+    frames = asyncio.run(fetch())
+    assert all(len(df) == 50 for df in frames.values())
+    assert server.stats["connections"] <= 2
+
+
+def test_get_hist_exchange_timezone():
+    async def fetch(url):
+        async with AsyncTvDatafeed(ws_url=url, timezone="exchange") as tv:
+            return await tv.get_hist("AAA", "MOCK", n_bars=10)
+
+    with MockTradingViewServer(timezone="America/New_York") as mock:
+        data = asyncio.run(fetch(mock.url))
+    assert str(data.index.tz) == "America/New_York"
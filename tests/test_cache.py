@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from tvDatafeed import protocol
+
+pytest.importorskip("pyarrow")
+
+from tvDatafeed.cache import BarCache  # noqa: E402
+
+
+def bars(n, start=1_700_000_000):
+    return protocol.bars_to_df(
+        {i: [start + i * 60, 1.0, 2.0, 0.5, 1.5, 100.0] for i in range(n)}, "MOCK:AAA", "UTC"
+    )
+
+
+def files(directory, suffix):
+    return sorted(name for name in os.listdir(directory) if name.endswith(suffix))
+
+
+def test_store_and_load(tmp_path):
+    cache = BarCache(str(tmp_path))
+    key = cache.key("MOCK:AAA", "1")
+    assert cache.load(key) is None
+
+    data = bars(10)
+    cache.store(key, data)
+    loaded = cache.load(key)
+    assert loaded.index.tolist() == data.index.tolist()
+    assert loaded["close"].tolist() == data["close"].tolist()
+
+
+def test_evict_removes_lock_files(tmp_path):
+    cache = BarCache(str(tmp_path))
+    for i in range(3):
+        cache.store(cache.key(f"MOCK:SYM{i}", "1"), bars(1000))
+    cache.max_bytes = cache.size() // 2
+
+    assert cache.evict() >= 1
+    assert len(files(tmp_path, ".lock")) == len(files(tmp_path, ".parquet"))
+
+
+def test_delete_removes_lock_file(tmp_path):
+    cache = BarCache(str(tmp_path))
+    key = cache.key("MOCK:AAA", "1")
+    cache.store(key, bars(10))
+    cache.delete(key)
+
+    assert files(tmp_path, ".parquet") == []
+    assert files(tmp_path, ".lock") == []
+    cache.store(key, bars(10))  # a new lock file is created
+    assert len(cache.load(key)) == 10
+
+
+@pytest.mark.skipif(os.name == "nt", reason="open lock files can not be removed on Windows")
+def test_waiting_lock_follows_removed_lock_file(tmp_path):
+    import threading
+
+    from tvDatafeed.cache import _FileLock
+
+    path = str(tmp_path / "key.lock")
+    holder = _FileLock(path).acquire()
+    acquired = threading.Event()
+    waiter = _FileLock(path)
+    thread = threading.Thread(target=lambda: (waiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.2)
+
+    holder.remove()
+    holder.release()
+    assert acquired.wait(5)
+    assert os.path.samestat(os.fstat(waiter._fd), os.stat(path))  # locked the new lock file
+    waiter.release()
+    thread.join()
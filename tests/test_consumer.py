@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tvDatafeed import Consumer, Interval, Seis
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="consumer")
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_executor_calls_each_consumer_in_order(executor):
+    received = {}
+    overlaps = []
+
+    def make_callback(name):
+        active = threading.Lock()
+        received[name] = []
+
+        def callback(seis, data):
+            if not active.acquire(blocking=False):
+                overlaps.append(name)  # called again before the previous call returned
+                return
+            try:
+                received[name].append(data)
+                time.sleep(0.0005)
+            finally:
+                active.release()
+
+        callback.__name__ = name
+        return callback
+
+    consumers = [
+        Consumer(Seis(f"S{i}", "MOCK", Interval.in_1_minute), make_callback(f"c{i}"), executor=executor)
+        for i in range(6)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    for sample in range(100):  # more than one _drain batch per consumer
+        for consumer in consumers:
+            consumer.put(sample)
+    for consumer in consumers:
+        consumer.stop()
+    for consumer in consumers:
+        consumer.join(10)
+
+    assert not overlaps
+    assert all(samples == list(range(100)) for samples in received.values())
+    assert not any(consumer.is_alive() for consumer in consumers)
+
+
+def test_executor_consumer_buffers_until_started(executor):
+    received = []
+    consumer = Consumer(Seis("AAA", "MOCK", Interval.in_1_minute), lambda seis, data: received.append(data), executor=executor)
+    consumer.put(1)
+    consumer.put(2)
+    time.sleep(0.05)
+    assert received == []
+    assert consumer.depth == 2
+
+    consumer.start()
+    consumer.stop()
+    consumer.join(5)
+    assert received == [1, 2]
+
+
+def test_slow_consumer_does_not_hold_up_others():
+    pool = ThreadPoolExecutor(max_workers=2)
+    release = threading.Event()
+    fast = []
+    slow = Consumer(Seis("SLOW", "MOCK", Interval.in_1_minute), lambda seis, data: release.wait(5), executor=pool)
+    quick = Consumer(Seis("FAST", "MOCK", Interval.in_1_minute), lambda seis, data: fast.append(data), executor=pool)
+    try:
+        slow.start()
+        quick.start()
+        slow.put(0)
+        for sample in range(20):
+            quick.put(sample)
+        deadline = time.monotonic() + 5
+        while len(fast) < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fast == list(range(20))
+    finally:
+        release.set()
+        slow.stop()
+        quick.stop()
+        pool.shutdown(wait=True)
@@ -0,0 +1,270 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from tvDatafeed import Interval, Seis, TvDatafeedLive, protocol
+
+
+def bar(open_time):
+    return protocol.bars_to_df({0: [open_time, 1.0, 2.0, 0.5, 1.5, 100.0]}, "MOCK:AAA", "UTC")
+
+
+@pytest.fixture
+def live(server):
+    tvl = TvDatafeedLive(streaming=True, ws_url=server.url, search_url=server.search_url)
+    yield tvl
+    tvl.del_tvdatafeed()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")  # the callback raises on purpose
+def test_callback_raising_while_producer_blocked_does_not_deadlock(live):
+    seis = live.new_seis("AAA", "MOCK", Interval.in_daily)  # no bar closes during the test
+    running = threading.Event()
+    release = threading.Event()
+
+    def callback(seis, data):
+        running.set()
+        release.wait(5)
+        raise RuntimeError("callback failed")
+
+    consumer = seis.new_consumer(callback, maxsize=1, policy="block")
+
+    def produce():
+        for open_time in (1_700_000_000, 1_700_086_400, 1_700_172_800):
+            live._push_bar(seis, bar(open_time))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    assert running.wait(5)
+    producer.join(0.5)
+    assert producer.is_alive()  # third bar waits for room in the full buffer
+
+    # the blocked producer must not hold the live feed lock
+    assert live._lock.acquire(timeout=1)
+    live._lock.release()
+
+    release.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    consumer.join(5)
+    assert not consumer.is_alive()
+    assert consumer not in seis.get_consumers()
+
+    assert live._lock.acquire(timeout=1)  # the consumer was removed without deadlocking
+    live._lock.release()
+
+
+def test_slow_block_consumer_does_not_stall_other_consumers(live):
+    seis = live.new_seis("AAA", "MOCK", Interval.in_daily)
+    other = live.new_seis("BBB", "MOCK", Interval.in_daily)
+    release = threading.Event()
+    received = threading.Event()
+
+    seis.new_consumer(lambda seis, data: release.wait(5), maxsize=1, policy="block")
+    other.new_consumer(lambda seis, data: received.set())
+
+    producer = threading.Thread(
+        target=lambda: [live._push_bar(seis, bar(t)) for t in (1_700_000_000, 1_700_086_400, 1_700_172_800)],
+        daemon=True,
+    )
+    producer.start()
+    producer.join(0.5)
+
+    live._push_bar(other, bar(1_700_000_000))
+    assert received.wait(2)
+    release.set()
+    producer.join(5)
+
+
+def test_delivery_latency_keyed_by_interval_group(server):
+    tvl = TvDatafeedLive(ws_url=server.url, search_url=server.search_url)
+    try:
+        seis = tvl.new_seis("AAA", "MOCK", Interval.in_daily)
+        delivered = threading.Event()
+        seis.new_consumer(lambda seis, data: delivered.set())
+        (group,) = tvl._sat.intervals()
+        assert group[0] == Interval.in_daily.value and group[1] is not None  # mock symbols have a session
+
+        assert delivered.wait(5)  # the last closed bar is delivered right after the Seis was added
+        assert list(tvl.delivery_latency) == [group]
+    finally:
+        tvl.del_tvdatafeed()
+
+
+
+def test_new_custom_seis_source_given_as_interval_value(live):
+    seis = live.new_custom_seis("AAA", "MOCK", "2", source="1")
+    assert seis is not False
+    assert seis.interval.value == "2"
+
+    with pytest.raises(ValueError, match="Unknown source"):
+        live.new_custom_seis("AAA", "MOCK", "4", source="1X")
+    with pytest.raises(ValueError, match="not a multiple"):
+        live.new_custom_seis("AAA", "MOCK", "7", source="5")
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [("drop_oldest", [0, 2, 3]), ("drop_newest", [0, 1, 2]), ("coalesce", [0, 3])],
+)
+def test_consumer_buffer_policies(live, policy, expected):
+    seis = live.new_seis("AAA", "MOCK", Interval.in_daily)
+    opens = [1_700_000_000 + day * 86_400 for day in range(4)]
+    received = []
+    running = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+
+    def callback(seis, data):
+        received.append(int(data.index[0].timestamp()))
+        running.set()
+        release.wait(5)
+        if len(received) == len(expected):
+            done.set()
+
+    consumer = seis.new_consumer(callback, maxsize=2, policy=policy)
+    live._push_bar(seis, bar(opens[0]))
+    assert running.wait(5)  # first bar is in the callback, the others go to the buffer
+    for open_time in opens[1:]:
+        live._push_bar(seis, bar(open_time))
+
+    release.set()
+    assert done.wait(5)
+    assert received == [opens[i] for i in expected]
+    assert consumer.dropped == len(opens) - len(expected)
+
+
+def test_fetch_group_skips_symbols_with_a_single_bar(live, monkeypatch):
+    from tvDatafeed import TvDatafeed
+
+    listed = live.new_seis("AAA", "MOCK", Interval.in_daily)
+    new = live.new_seis("BBB", "MOCK", Interval.in_daily)
+    received = []
+    delivered = threading.Event()
+
+    def callback(seis, data):
+        received.append(seis)
+        delivered.set()
+
+    listed.new_consumer(callback)
+    new.new_consumer(callback)
+    two_bars = pd.concat([bar(1_700_000_000), bar(1_700_086_400)])
+    monkeypatch.setattr(
+        TvDatafeed, "get_hist_many",
+        lambda self, symbols, **kwargs: {"MOCK:AAA": two_bars, "MOCK:BBB": bar(1_700_086_400)},
+    )
+
+    assert live._fetch_group((Interval.in_daily.value, None), [listed, new], 0.0)
+    assert delivered.wait(5)
+    assert received == [listed]
+
+
+def test_new_seis_takes_session_from_get_hist(server, monkeypatch):
+    tvl = TvDatafeedLive(ws_url=server.url, search_url=server.search_url)
+    monkeypatch.setattr(tvl, "get_symbol_info", lambda *args, **kwargs: pytest.fail("symbol info requested"))
+    try:
+        tvl.new_seis("AAA", "MOCK", Interval.in_daily)
+        tvl.new_seis("AAA", "MOCK", Interval.in_1_hour)
+        assert len(tvl._sat.intervals()) == 2
+        assert all(session is not None for _, session in tvl._sat.intervals())
+    finally:
+        tvl.del_tvdatafeed()
+
+
+def test_del_tvdatafeed_releases_threads_and_connections(server):
+    before = set(threading.enumerate())
+    tvl = TvDatafeedLive(ws_url=server.url, search_url=server.search_url, consumer_workers=2)
+    received = threading.Event()
+    seis = tvl.new_seis("AAA", "MOCK", Interval.in_daily)
+    seis.new_consumer(lambda seis, data: received.set())
+    assert received.wait(5)
+
+    tvl.del_tvdatafeed()
+    assert len(tvl._pool) == 0
+    leaked = [
+        thread.name for thread in threading.enumerate()
+        if thread not in before and thread.name.startswith(("consumer", "main_loop"))  # not the mock server threads
+    ]
+    assert not leaked
+
+
+def test_custom_quote_seis_sees_every_price(server, live):
+    seis = live.new_custom_seis("AAA", "MOCK", "2", source="quotes")
+    bars = []
+    completed = threading.Event()
+
+    def callback(seis, data):
+        bars.append(data.iloc[0])
+        if len(bars) == 2:
+            completed.set()
+
+    seis.new_consumer(callback)
+    stream = live._quote_stream
+    deadline = time.time() + 5
+    while stream.quote("MOCK:AAA").get("lp") is None and time.time() < deadline:  # initial quote of the server
+        time.sleep(0.01)
+
+    start = (time.time() // 120 + 1) * 120  # next bar, so it can not be completed by time
+    prices = [100.0, 130.0, 70.0, 90.0, 115.0]
+    for offset, price in enumerate(prices + [120.0]):
+        timestamp = start + offset if offset < len(prices) else start + 120
+        stream._on_message({"m": "qsd", "p": ["qs", {"n": "MOCK:AAA", "s": "ok", "v": {"lp": price, "lp_time": timestamp}}]})
+
+    assert completed.wait(5)
+    assert [bars[1]["open"], bars[1]["high"], bars[1]["low"], bars[1]["close"]] == [100.0, 130.0, 70.0, 115.0]
+
+
+def test_seises_and_trigger_heap_order_and_discard():
+    sat = TvDatafeedLive._SeisesAndTrigger()
+    now = datetime.now().astimezone()
+    minute = Seis("AAA", "MOCK", Interval.in_1_minute)
+    five = Seis("BBB", "MOCK", Interval.in_5_minute)
+    other_minute = Seis("CCC", "MOCK", Interval.in_1_minute)
+    sat.append(five, now - timedelta(minutes=5) + timedelta(seconds=30))
+    sat.append(minute, now - timedelta(minutes=1) + timedelta(seconds=10))
+    sat.append(other_minute)  # joins the existing 1 minute group
+
+    assert sat._next_trigger_dt() == now + timedelta(seconds=10)
+    assert sat.get_seis("CCC", "MOCK", Interval.in_1_minute) is other_minute
+    assert list(sat[sat.group_key(minute)]) == [minute, other_minute]
+
+    sat.discard(minute)
+    assert minute not in sat
+    assert sat.get_seis("AAA", "MOCK", Interval.in_1_minute) is None
+    assert sat._next_trigger_dt() == now + timedelta(seconds=10)  # group still has a Seis
+
+    sat.discard(other_minute)
+    assert list(sat.intervals()) == [sat.group_key(five)]
+    assert sat._next_trigger_dt() == now + timedelta(seconds=30)  # stale entry of the removed group is skipped
+    assert len(sat._heap) == 1
+    with pytest.raises(KeyError):
+        sat.discard(minute)
+
+
+def test_seises_and_trigger_get_expired_reschedules_groups():
+    sat = TvDatafeedLive._SeisesAndTrigger()
+    now = datetime.now().astimezone()
+    minute = Seis("AAA", "MOCK", Interval.in_1_minute)
+    hour = Seis("BBB", "MOCK", Interval.in_1_hour)
+    sat.append(minute, now - timedelta(minutes=3, seconds=30))  # missed several closes
+    sat.append(hour, now - timedelta(minutes=30))
+
+    assert sat.get_expired() == [sat.group_key(minute)]
+    assert sat.get_expired() == []  # rescheduled once, into the future
+    expiry = sat._next_trigger_dt()
+    assert now < expiry <= now + timedelta(seconds=31)
+    assert (expiry - (now - timedelta(minutes=3, seconds=30))).total_seconds() % 60 == 0  # still on bar boundaries
+
+    sat.discard(minute)
+    sat.append(minute, now - timedelta(seconds=50))  # group re-created, the old heap entry must not fire
+    assert sat.get_expired() == []
+    assert sat._next_trigger_dt() == now + timedelta(seconds=10)
+
+
+def test_seises_and_trigger_new_group_needs_update_datetime():
+    sat = TvDatafeedLive._SeisesAndTrigger()
+    with pytest.raises(ValueError):
+        sat.append(Seis("AAA", "MOCK", Interval.in_1_minute))
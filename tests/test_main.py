@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from tvDatafeed import Interval
+
+
+def test_get_hist_reuses_pooled_connection(server, tv):
+    for _ in range(3):
+        assert len(tv.get_hist("AAA", "MOCK", Interval.in_1_hour, n_bars=100)) == 100
+    assert server.stats["connections"] == 1
+
+
+def test_get_hist_after_server_dropped_connections(server, tv, caplog):
+    assert tv.get_hist("AAA", "MOCK", n_bars=10) is not None
+    assert server.drop_connections() == 1
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    data = tv.get_hist("AAA", "MOCK", n_bars=10)
+    assert time.perf_counter() - start < 1  # no network retry delay
+    assert len(data) == 10
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
+    assert server.stats["connections"] == 2
+
+
+def test_cache_keeps_history_after_smaller_request(server, tmp_path):
+    from tvDatafeed import TvDatafeed
+
+    tv = TvDatafeed(ws_url=server.url, search_url=server.search_url, cache_dir=str(tmp_path))
+    try:
+        history = tv.get_hist("AAA", "MOCK", Interval.in_1_hour, n_bars=1000)
+        assert len(history) == 1000
+
+        latest = tv.get_hist("AAA", "MOCK", Interval.in_1_hour, n_bars=2)
+        assert len(latest) == 2
+        assert latest.index[-1] >= history.index[-1]
+
+        cached = tv._cache.load(tv._cache.key("MOCK:AAA", Interval.in_1_hour.value))
+        assert len(cached) >= 1000
+        assert cached.index[0] == history.index[0]
+    finally:
+        tv.close()
+
+
+def test_get_hist_many_after_server_dropped_connections(server, tv, caplog):
+    assert tv.get_hist("AAA", "MOCK", n_bars=10) is not None
+    server.drop_connections()
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    frames = tv.get_hist_many(["MOCK:AAA", "MOCK:BBB"], n_bars=10)
+    assert time.perf_counter() - start < 1
+    assert all(len(df) == 10 for df in frames.values())
+    assert not [record for record in caplog.records if record.levelname == "ERROR"]
+
+
+def test_get_hist_many_discards_rejected_connection(server):
+    from websocket import create_connection
+
+    from tvDatafeed import TvDatafeed, protocol
+
+    sockets = []
+
+    class RejectingWebSocket:
+        # answers the first create_series with a critical_error instead of bars
+        def __init__(self, ws):
+            self.ws = ws
+            self.reject = False
+
+        def __getattr__(self, name):
+            return getattr(self.ws, name)
+
+        def send(self, payload):
+            if "create_series" in payload and len(sockets) == 1:
+                self.reject = True
+            return self.ws.send(payload)
+
+        def recv(self):
+            if self.reject:
+                self.reject = False
+                return protocol.create_message("critical_error", ["cs", "rejected"])
+            return self.ws.recv()
+
+    def factory(*args, **kwargs):
+        sockets.append(RejectingWebSocket(create_connection(*args, **kwargs)))
+        return sockets[-1]
+
+    tv = TvDatafeed(ws_url=server.url, ws_factory=factory)
+    try:
+        with pytest.raises(ConnectionError):
+            tv.get_hist_many(["MOCK:AAA"], n_bars=10)
+        assert len(tv._pool) == 0  # the rejected connection is not handed out again
+
+        assert len(tv.get_hist("AAA", "MOCK", n_bars=10)) == 10
+        assert len(sockets) == 2
+    finally:
+        tv.close()
+
+
+def test_get_hist_large_request_with_invalid_symbol_returns_none():
+    from tvDatafeed import TvDatafeed
+    from tvDatafeed.mock_server import MockTradingViewServer
+
+    with MockTradingViewServer(error_symbols=["MOCK:BAD"]) as server:
+        tv = TvDatafeed(ws_url=server.url)
+        try:
+            assert tv.get_hist("BAD", "MOCK", n_bars=100) is None
+            assert tv.get_hist("BAD", "MOCK", n_bars=6000) is None
+        finally:
+            tv.close()
+
+
+def test_get_hist_large_request_uses_cache(server, tmp_path):
+    from tvDatafeed import TvDatafeed
+
+    tv = TvDatafeed(ws_url=server.url, cache_dir=str(tmp_path))
+    try:
+        assert len(tv.get_hist("AAA", "MOCK", Interval.in_1_minute, n_bars=6000)) == 6000
+        cached = tv._cache.load(tv._cache.key("MOCK:AAA", Interval.in_1_minute.value))
+        assert len(cached) == 6000
+
+        received = server.stats["bytes_sent"]
+        assert len(tv.get_hist("AAA", "MOCK", Interval.in_1_minute, n_bars=6000)) == 6000
+        assert server.stats["bytes_sent"] - received < 50_000  # only the newest bars were downloaded
+    finally:
+        tv.close()
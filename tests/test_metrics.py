@@ -0,0 +1,94 @@
+import urllib.request
+
+import pytest
+
+from tvDatafeed.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    metrics = MetricsRegistry()
+    yield metrics
+    metrics.close()
+
+
+def test_prometheus_format(registry):
+    retries = registry.counter("test_retries_total", "Retried requests", labels=("cause",))
+    depth = registry.gauge("test_depth", "Queue depth")
+    latency = registry.histogram("test_latency_seconds", "Latency", labels=("stage",), buckets=(0.1, 1))
+    retries.inc(cause="network")
+    retries.inc(2, cause='auth "x"\n')
+    depth.set(2.5)
+    latency.observe(0.05, stage="parse")
+    latency.observe(0.5, stage="parse")
+    latency.observe(5, stage="parse")
+
+    assert registry.to_prometheus() == "\n".join([
+        "# HELP test_depth Queue depth",
+        "# TYPE test_depth gauge",
+        "test_depth 2.5",
+        "# HELP test_latency_seconds Latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_latency_seconds_bucket{stage="parse",le="1"} 2',
+        'test_latency_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'test_latency_seconds_sum{stage="parse"} 5.55',
+        'test_latency_seconds_count{stage="parse"} 3',
+        "# HELP test_retries_total Retried requests",
+        "# TYPE test_retries_total counter",
+        'test_retries_total{cause="auth \\"x\\"\\n"} 2',
+        'test_retries_total{cause="network"} 1',
+    ]) + "\n"
+
+
+def test_metrics_without_updates_are_zero(registry):
+    registry.counter("test_total", "Count")
+    registry.histogram("test_seconds", "Time", buckets=(1,))
+    registry.counter("test_labelled_total", "Count", labels=("kind",))
+    assert registry.to_prometheus().splitlines() == [
+        "# HELP test_labelled_total Count",
+        "# TYPE test_labelled_total counter",
+        "# HELP test_seconds Time",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="1"} 0',
+        'test_seconds_bucket{le="+Inf"} 0',
+        "test_seconds_sum 0",
+        "test_seconds_count 0",
+        "# HELP test_total Count",
+        "# TYPE test_total counter",
+        "test_total 0",
+    ]
+
+
+def test_registry_returns_existing_metric(registry):
+    counter = registry.counter("test_total", "Count", labels=("kind",))
+    assert registry.counter("test_total", "Count", labels=("kind",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Count", labels=("kind",))
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+
+
+def test_computed_gauge_and_snapshot(registry):
+    values = [3]
+    registry.gauge("test_open", "Open connections", function=lambda: values[-1])
+    histogram = registry.histogram("test_seconds", "Time", buckets=(1,))
+    histogram.observe(0.5)
+    values.append(4)
+    snapshot = registry.snapshot()
+    assert snapshot["test_open"] == {(): 4}
+    assert snapshot["test_seconds"] == {(): {"count": 1, "sum": 0.5, "buckets": {1: 1, float("inf"): 1}}}
+
+    registry.clear()
+    assert histogram.value()["count"] == 0
+
+
+def test_serve(registry):
+    registry.counter("test_total", "Count").inc(7)
+    server = registry.serve(port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    with urllib.request.urlopen(url, timeout=5) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "test_total 7\n" in response.read().decode("utf-8")
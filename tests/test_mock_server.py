@@ -0,0 +1,23 @@
+from tvDatafeed import Interval, TvDatafeed
+from tvDatafeed.mock_server import MockTradingViewServer
+
+
+def test_get_hist_pagination(tv):
+    data = tv.get_hist("AAA", "MOCK", Interval.in_1_minute, n_bars=12000)
+    assert len(data) == 12000
+    assert data.index.is_monotonic_increasing and data.index.is_unique
+
+    latest = tv.get_hist("AAA", "MOCK", Interval.in_1_minute, n_bars=100)
+    assert data.index[-1] <= latest.index[-1]
+    assert data.index[-1] >= latest.index[-3]  # at most a bar or two closed in between
+
+
+def test_error_symbol_keeps_connection_usable():
+    with MockTradingViewServer(error_symbols=["MOCK:BAD"]) as server:
+        tv = TvDatafeed(ws_url=server.url)
+        try:
+            assert tv.get_hist("BAD", "MOCK", n_bars=10) is None
+            assert len(tv.get_hist("AAA", "MOCK", n_bars=10)) == 10
+            assert server.stats["connections"] == 1
+        finally:
+            tv.close()
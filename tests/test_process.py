@@ -0,0 +1,77 @@
+import math
+import queue
+import threading
+
+from tvDatafeed import Interval, Seis, protocol
+from tvDatafeed.process import _BAR, ProcessConsumer, ProcessPool, _worker
+
+
+class RecordingPool(ProcessPool):
+    # ProcessPool without worker processes, keeps the sent messages of each shard
+    def __init__(self, processes=2):
+        self.processes = processes
+        self.sent = [[] for _ in range(processes)]
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _send(self, shard, message):
+        self.sent[shard].append(message)
+
+
+def run_worker(messages):
+    inbox = queue.Queue()
+    for message in messages:
+        inbox.put(message)
+    inbox.put(None)
+    _worker(inbox)
+
+
+def test_bar_struct_size():
+    assert _BAR.size == 52
+
+
+def test_bars_survive_the_round_trip():
+    received = []
+    pool = RecordingPool()
+    seis = Seis("AAA", "MOCK", Interval.in_1_minute)
+    consumer = ProcessConsumer(seis, lambda seis, data: received.append((seis, data)), pool)
+    consumer.start()
+    bars = [
+        protocol.bars_to_df({0: [1_700_000_000, 1.25, 2.5, 0.125, 1.5, 1234.0]}, "MOCK:AAA", "America/New_York"),
+        protocol.bars_to_df({0: [1_700_000_060, 1.5, 2.0, 1.0, 1.75]}, "MOCK:AAA", "America/New_York"),  # no volume
+    ]
+    for data in bars:
+        consumer.put(data)
+    consumer.stop()
+
+    run_worker(pool.sent[pool.shard(seis)])
+    assert len(received) == 2
+    for (worker_seis, data), sent in zip(received, bars):
+        assert worker_seis == seis
+        assert data.index.equals(sent.index)
+        assert str(data.index.tz) == "America/New_York"
+        assert data["symbol"].tolist() == ["MOCK:AAA"]
+        assert data[["open", "high", "low", "close"]].equals(sent[["open", "high", "low", "close"]])
+    assert received[0][1]["volume"].iloc[0] == 1234.0
+    assert math.isnan(received[1][1]["volume"].iloc[0])
+
+
+def test_removed_consumer_gets_no_bars():
+    received = []
+    pool = RecordingPool(processes=1)
+    consumer = ProcessConsumer(Seis("AAA", "MOCK", Interval.in_1_minute), lambda seis, data: received.append(data), pool)
+    consumer.start()
+    consumer.stop()
+    consumer.put(protocol.bars_to_df({0: [1_700_000_000, 1.0, 2.0, 0.5, 1.5, 1.0]}, "MOCK:AAA", "UTC"))
+    assert not consumer.is_alive()
+
+    run_worker(pool.sent[0] + [_BAR.pack(consumer._id, 1_700_000_000, 1.0, 2.0, 0.5, 1.5, 1.0)])
+    assert received == []
+
+
+def test_shard_is_stable():
+    pool = RecordingPool(processes=4)
+    seis = Seis("AAA", "MOCK", Interval.in_1_minute)
+    shard = pool.shard(seis)
+    assert 0 <= shard < 4
+    assert pool.shard(Seis("AAA", "MOCK", Interval.in_1_minute)) == shard
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from tvDatafeed import protocol
+
+
+def test_frame_parser_splits_frames():
+    text = protocol.create_message("a", [1]) + protocol.create_message("b", ["x"])
+    assert protocol.FrameParser().feed(text) == ['{"m":"a","p":[1]}', '{"m":"b","p":["x"]}']
+
+
+def test_frame_parser_keeps_incomplete_frame():
+    first = protocol.create_message("first", [1])
+    second = protocol.create_message("second", ["é" * 10])
+    text = first + second
+
+    for cut in (len(first) + 2, len(first) + 5, len(text) - 3):  # inside header, length and payload
+        parser = protocol.FrameParser()
+        assert parser.feed(text[:cut]) == [first[first.index("{"):]]
+        assert parser.feed(text[cut:]) == [second[second.index("{"):]]
+        assert parser.feed("") == []
+
+
+def test_frame_parser_byte_by_byte():
+    text = protocol.create_message("a", [1]) + "~m~4~m~~h~1" + protocol.create_message("b", [2])
+    parser = protocol.FrameParser()
+    frames = []
+    for char in text:
+        frames.extend(parser.feed(char))
+    assert frames == protocol.split_frames(text)
+    assert len(frames) == 3
+
+
+def test_frame_parser_rejects_invalid_header():
+    with pytest.raises(ValueError):
+        protocol.FrameParser().feed('{"m":"a"}')
+    with pytest.raises(ValueError):
+        protocol.FrameParser().feed(protocol.create_message("a", []) + "garbage")
+
+
+def test_heartbeats_are_returned_without_message():
+    parser = protocol.FrameParser()
+    text = "~m~4~m~~h~7" + protocol.create_message("qsd", ["qs_x", {"n": "MOCK:AAA"}])
+    messages = list(parser.messages(text))
+    assert messages[0] == ("~h~7", None)
+    assert messages[1][1] == {"m": "qsd", "p": ["qs_x", {"n": "MOCK:AAA"}]}
+    assert protocol.prepend_header(messages[0][0]) == "~m~4~m~~h~7"  # echoed back unchanged
+
+
+def test_decode_frame_ignores_non_objects():
+    assert protocol.decode_frame("~h~1") is None
+    assert protocol.decode_frame("not json") is None
+    assert protocol.decode_frame("[1, 2]") is None
+    assert protocol.decode_frame('{"m":"du"}') == {"m": "du"}
+
+
+def test_create_df_from_framed_messages():
+    bars = {"s": [{"i": i, "v": [1_700_000_000 + 60 * i, 1.0, 2.0, 0.5, 1.5, 10.0]} for i in range(3)]}
+    raw = "\n".join([
+        "~m~4~m~~h~1",
+        protocol.create_message("timescale_update", ["cs_x", {"sds_1": bars}]),
+    ])
+    data = protocol.create_df(raw, "MOCK:AAA", "UTC")
+    assert len(data) == 3
+    assert data.index[0].timestamp() == 1_700_000_000
+
+
+def test_bars_to_df_columns_and_order():
+    bars = {
+        1: [1_700_000_060, 2.0, 3.0, 1.0, 2.5, 20.0],
+        0: [1_700_000_000, 1.0, 2.0, 0.5, 1.5, 10.0],
+    }
+    data = protocol.bars_to_df(bars, "MOCK:AAA", "UTC")
+    assert list(data.columns) == ["symbol", "open", "high", "low", "close", "volume"]
+    assert data.index.name == "datetime"
+    assert str(data.index.tz) == "UTC"
+    assert [ts.timestamp() for ts in data.index] == [1_700_000_000, 1_700_000_060]  # sorted by bar index
+    assert data["close"].tolist() == [1.5, 2.5]
+    assert (data["symbol"] == "MOCK:AAA").all()
+    assert (data.dtypes.drop("symbol") == "float64").all()
+
+
+def test_bars_to_df_missing_volume_is_nan():
+    data = protocol.bars_to_df({0: [1_700_000_000, 1.0, 2.0, 0.5, 1.5]}, "FX:EURUSD", "UTC")
+    assert data["volume"].isna().all()
+    assert data["close"].iloc[0] == 1.5
+
+
+def test_bars_to_df_volume_of_some_bars_missing():
+    bars = {
+        0: [1_700_000_000, 1.0, 2.0, 0.5, 1.5],
+        1: [1_700_000_060, 2.0, 3.0, 1.0, 2.5, 20.0],
+    }
+    data = protocol.bars_to_df(bars, "MOCK:AAA", "UTC")
+    assert np.isnan(data["volume"].iloc[0])
+    assert data["volume"].iloc[1] == 20.0
+    assert data["open"].tolist() == [1.0, 2.0]
+
+
+def test_bars_to_df_empty():
+    data = protocol.bars_to_df({}, "MOCK:AAA", "UTC")
+    assert data.empty
+    assert list(data.columns) == ["symbol", "open", "high", "low", "close", "volume"]
+
+
+def test_bars_to_df_null_values_are_nan():
+    data = protocol.bars_to_df({0: [1_700_000_000, 1.0, None, 0.5, 1.5, None]}, "MOCK:AAA", "UTC")
+    assert np.isnan(data["high"].iloc[0])
+    assert np.isnan(data["volume"].iloc[0])
+    assert data["low"].iloc[0] == 0.5
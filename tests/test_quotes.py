@@ -0,0 +1,83 @@
+import pytest
+
+from tvDatafeed.quotes import QuoteStream
+
+
+def qsd(symbol, status="ok", **values):
+    return {"m": "qsd", "p": ["qs_x", {"n": symbol, "s": status, "v": values}]}
+
+
+@pytest.fixture
+def stream():
+    quotes = QuoteStream(None)
+    quotes.start = lambda: None  # messages are fed in directly, no connection
+    return quotes
+
+
+def test_updates_are_merged_into_latest_quote(stream):
+    subscription = stream.subscribe(["MOCK:AAA"])
+    stream._on_message(qsd("MOCK:AAA", lp=1.0, volume=10, ch=0.1))
+    stream._on_message(qsd("MOCK:AAA", lp=1.5))
+    stream._on_message(qsd("MOCK:AAA", volume=12))
+
+    assert stream.quote("MOCK:AAA") == {"lp": 1.5, "volume": 12, "ch": 0.1}
+    assert subscription.get(timeout=0) == ("MOCK:AAA", {"lp": 1.5, "volume": 12, "ch": 0.1})
+    assert subscription.coalesced == 2
+    assert subscription.get(timeout=0) is None
+
+
+def test_pending_symbols_are_read_oldest_first(stream):
+    subscription = stream.subscribe(["MOCK:AAA", "MOCK:BBB"])
+    stream._on_message(qsd("MOCK:BBB", lp=2.0))
+    stream._on_message(qsd("MOCK:AAA", lp=1.0))
+    stream._on_message(qsd("MOCK:BBB", lp=2.5))
+    assert [subscription.get(timeout=0)[0] for _ in range(2)] == ["MOCK:BBB", "MOCK:AAA"]
+
+
+def test_subscription_fields(stream):
+    subscription = stream.subscribe(["MOCK:AAA"], fields=["lp"])
+    stream._on_message(qsd("MOCK:AAA", volume=10))
+    assert subscription.get(timeout=0) is None  # no subscribed field changed
+
+    stream._on_message(qsd("MOCK:AAA", lp=1.0, ch=0.1))
+    assert subscription.get(timeout=0) == ("MOCK:AAA", {"lp": 1.0})
+
+
+def test_errors_and_unsubscribed_symbols_are_ignored(stream):
+    subscription = stream.subscribe(["MOCK:AAA"])
+    stream._on_message(qsd("MOCK:AAA", status="error", lp=1.0))
+    stream._on_message(qsd("MOCK:BBB", lp=2.0))
+    assert subscription.get(timeout=0) is None
+    assert stream.quote("MOCK:BBB") == {}
+
+    with pytest.raises(ConnectionError):
+        stream._on_message({"m": "critical_error", "p": ["qs_x", "error"]})
+
+
+def test_listener_sees_every_update(stream):
+    stream.subscribe(["MOCK:AAA"])
+    updates = []
+    listener = stream.add_listener(lambda symbol, quote, changed: updates.append((quote, dict(changed))))
+    stream._on_message(qsd("MOCK:AAA", lp=1.0, volume=10))
+    stream._on_message(qsd("MOCK:AAA", lp=1.5))
+    assert updates == [
+        ({"lp": 1.0, "volume": 10}, {"lp": 1.0, "volume": 10}),
+        ({"lp": 1.5, "volume": 10}, {"lp": 1.5}),
+    ]
+
+    stream.remove_listener(listener)
+    stream._on_message(qsd("MOCK:AAA", lp=2.0))
+    assert len(updates) == 2
+
+
+def test_new_subscription_gets_known_quote(stream):
+    first = stream.subscribe(["MOCK:AAA"])
+    stream._on_message(qsd("MOCK:AAA", lp=1.0))
+    second = stream.subscribe(["MOCK:AAA"])
+    assert second.get(timeout=0) == ("MOCK:AAA", {"lp": 1.0})
+
+    first.close()
+    assert stream.quote("MOCK:AAA") == {"lp": 1.0}  # still used by the second subscription
+    second.close()
+    assert stream.quote("MOCK:AAA") == {}
+    assert len(stream) == 0
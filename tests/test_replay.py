@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from tvDatafeed import Interval, TvDatafeed
+from tvDatafeed.replay import FrameRecorder, FrameReplayer, RECV, read_log
+
+
+def test_replay_round_trip(server, tmp_path):
+    path = str(tmp_path / "session.tvlog.gz")
+    with FrameRecorder(path) as recorder:
+        tv = TvDatafeed(ws_url=server.url, ws_factory=recorder.create_connection)
+        try:
+            recorded = [
+                tv.get_hist("AAA", "MOCK", Interval.in_1_hour, n_bars=500),
+                tv.get_hist("BBB", "MOCK", Interval.in_daily, n_bars=50),
+            ]
+        finally:
+            tv.close()
+    assert any(direction == RECV for _, _, direction, _ in read_log(path))
+
+    replayer = FrameReplayer(path)
+    tv = TvDatafeed(ws_url="ws://replay", ws_factory=replayer.create_connection)
+    try:
+        replayed = [
+            tv.get_hist("AAA", "MOCK", Interval.in_1_hour, n_bars=500),
+            tv.get_hist("BBB", "MOCK", Interval.in_daily, n_bars=50),
+        ]
+    finally:
+        tv.close()
+
+    for expected, data in zip(recorded, replayed):
+        pd.testing.assert_frame_equal(data, expected)
+
+
+def test_replayer_without_connections_left(server, tmp_path):
+    path = str(tmp_path / "session.tvlog")
+    with FrameRecorder(path) as recorder:
+        recorder.create_connection(server.url).close()
+
+    replayer = FrameReplayer(path)
+    replayer.create_connection().close()
+    with pytest.raises(ConnectionError):
+        replayer.create_connection()
@@ -0,0 +1,99 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from tvDatafeed.sessions import TradingSession
+
+KOLKATA = ZoneInfo("Asia/Kolkata")
+CHICAGO = ZoneInfo("America/Chicago")
+
+
+def at(tz, *args):
+    return datetime(*args, tzinfo=tz)
+
+
+@pytest.fixture
+def nse():
+    # 2024-01-08 is a Monday
+    return TradingSession("0915-1530", "Asia/Kolkata", holidays=["20240109"])
+
+
+@pytest.fixture
+def cme():
+    return TradingSession("1700-1600:23456", "America/Chicago")
+
+
+@pytest.mark.parametrize("after, interval, expected", [
+    ((2024, 1, 8, 10, 0), "5", (2024, 1, 8, 10, 5)),
+    ((2024, 1, 8, 10, 2), "5", (2024, 1, 8, 10, 5)),
+    ((2024, 1, 8, 10, 5), "5", (2024, 1, 8, 10, 10)),
+    ((2024, 1, 8, 10, 0), "1H", (2024, 1, 8, 10, 15)),  # aligned to the session open
+    ((2024, 1, 8, 15, 20), "1H", (2024, 1, 8, 15, 30)),  # last bar closes with the session
+    ((2024, 1, 8, 8, 0), "15", (2024, 1, 8, 9, 30)),  # before the open
+    ((2024, 1, 8, 15, 30), "5", (2024, 1, 10, 9, 20)),  # Tuesday is a holiday
+    ((2024, 1, 12, 16, 0), "5", (2024, 1, 15, 9, 20)),  # weekend
+    ((2024, 1, 8, 12, 0), "1D", (2024, 1, 8, 15, 30)),
+    ((2024, 1, 8, 15, 30), "1D", (2024, 1, 10, 15, 30)),
+    ((2024, 1, 8, 12, 0), "1W", (2024, 1, 12, 15, 30)),
+    ((2024, 1, 8, 12, 0), "1M", (2024, 1, 31, 15, 30)),
+])
+def test_next_bar_close(nse, after, interval, expected):
+    assert nse.next_bar_close(at(KOLKATA, *after), interval) == at(KOLKATA, *expected)
+
+
+@pytest.mark.parametrize("after, interval, expected", [
+    ((2024, 1, 7, 18, 0), "1H", (2024, 1, 7, 19, 0)),  # Monday session opened Sunday evening
+    ((2024, 1, 8, 15, 30), "1H", (2024, 1, 8, 16, 0)),
+    ((2024, 1, 8, 16, 15), "1H", (2024, 1, 8, 18, 0)),  # daily break
+    ((2024, 1, 12, 16, 30), "1H", (2024, 1, 14, 18, 0)),  # weekend
+    ((2024, 1, 7, 20, 0), "1D", (2024, 1, 8, 16, 0)),
+    ((2024, 1, 8, 16, 30), "1D", (2024, 1, 9, 16, 0)),
+    ((2024, 1, 7, 20, 0), "1W", (2024, 1, 12, 16, 0)),
+])
+def test_next_bar_close_overnight_session(cme, after, interval, expected):
+    assert cme.next_bar_close(at(CHICAGO, *after), interval) == at(CHICAGO, *expected)
+
+
+def test_week_ends_before_holiday():
+    session = TradingSession("0930-1600", "America/New_York", holidays=["20240329"])  # Good Friday
+    new_york = ZoneInfo("America/New_York")
+    assert session.next_bar_close(at(new_york, 2024, 3, 25, 12, 0), "1W") == at(new_york, 2024, 3, 28, 16, 0)
+
+
+def test_next_bar_close_in_other_timezone(nse):
+    after = at(ZoneInfo("UTC"), 2024, 1, 8, 4, 30)  # 10:00 in Kolkata
+    assert nse.next_bar_close(after, "5") == at(KOLKATA, 2024, 1, 8, 10, 5)
+
+
+def test_next_bar_close_24x7():
+    session = TradingSession("24x7", "Etc/UTC")
+    utc = ZoneInfo("Etc/UTC")
+    assert session.next_bar_close(at(utc, 2024, 1, 6, 23, 59, 30), "1") == at(utc, 2024, 1, 7, 0, 0)
+    assert session.next_bar_close(at(utc, 2024, 1, 6, 12, 0), "1D") == at(utc, 2024, 1, 7, 0, 0)
+
+
+def test_split_sessions():
+    session = TradingSession("0930-1200,1300-1500", "Asia/Tokyo")
+    tokyo = ZoneInfo("Asia/Tokyo")
+    assert session.next_bar_close(at(tokyo, 2024, 1, 8, 11, 45), "1H") == at(tokyo, 2024, 1, 8, 12, 0)
+    assert session.next_bar_close(at(tokyo, 2024, 1, 8, 12, 30), "1H") == at(tokyo, 2024, 1, 8, 14, 0)
+    assert not session.is_open(at(tokyo, 2024, 1, 8, 12, 30))
+    assert session.is_open(at(tokyo, 2024, 1, 8, 13, 0))
+
+
+def test_is_open_overnight(cme):
+    assert cme.is_open(at(CHICAGO, 2024, 1, 7, 17, 0))
+    assert not cme.is_open(at(CHICAGO, 2024, 1, 8, 16, 30))
+    assert not cme.is_open(at(CHICAGO, 2024, 1, 6, 12, 0))
+
+
+def test_from_symbol_info():
+    session = TradingSession.from_symbol_info(
+        {"session": "0915-1530", "timezone": "Asia/Kolkata", "session_holidays": "20240109,20240126"}
+    )
+    assert session.sessions(datetime(2024, 1, 26).date()) == []
+    assert TradingSession.from_symbol_info({"session": "0915-1530"}) is None
+    assert TradingSession.from_symbol_info({"session": "bad", "timezone": "Asia/Kolkata"}) is None
+    assert TradingSession.from_symbol_info({"session": "24x7", "timezone": "No/Such_Zone"}) is None
+    assert TradingSession.from_symbol_info(None) is None
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from tvDatafeed import Interval, Seis, protocol
+from tvDatafeed.stream import ChartStream
+
+
+def du(series_id, *bars):
+    return {"m": "du", "p": ["cs_x", {series_id: {"s": [{"i": i, "v": v} for i, v in bars]}}]}
+
+
+@pytest.fixture
+def chart():
+    delivered = []
+    stream = ChartStream(None, lambda seis, data: delivered.append((seis, data)), timezone="UTC", close_grace=0)
+    stream.delivered = delivered
+    return stream
+
+
+def add(stream, interval=Interval.in_1_minute):
+    seis = Seis("AAA", "MOCK", interval)
+    stream.add(seis)
+    series_id = stream._keys[stream._key(seis)]
+    return seis, series_id
+
+
+def closes(stream):
+    return [data["close"].iloc[0] for _, data in stream.delivered]
+
+
+def test_newer_bar_closes_previous_bar(chart):
+    seis, series_id = add(chart, Interval.in_daily)  # no close timer for daily bars
+    day = 86400
+    chart._on_message(du(series_id, (0, [10 * day, 1, 2, 0.5, 1.0, 5]), (1, [11 * day, 1, 2, 0.5, 1.1, 5])))
+    chart._on_message({"m": "series_completed", "p": ["cs_x", series_id]})
+    assert chart.delivered == []  # bars of the initial snapshot are not live
+
+    chart._on_message(du(series_id, (1, [11 * day, 1, 2, 0.5, 1.2, 6])))  # update of the open bar
+    assert chart.delivered == []
+
+    chart._on_message(du(series_id, (2, [12 * day, 1, 2, 0.5, 1.3, 1])))
+    assert closes(chart) == [1.2]
+    assert chart.delivered[0][0] is seis
+    assert chart.delivered[0][1].index[0].timestamp() == 11 * day
+
+
+def test_bars_of_one_message_close_in_order(chart):
+    _, series_id = add(chart, Interval.in_daily)
+    day = 86400
+    chart._on_message(du(series_id, (0, [10 * day, 1, 2, 0.5, 1.0, 5])))
+    chart._on_message({"m": "series_completed", "p": ["cs_x", series_id]})
+    chart._on_message(du(series_id, (2, [12 * day, 1, 2, 0.5, 1.2, 5]), (1, [11 * day, 1, 2, 0.5, 1.1, 5])))
+    assert closes(chart) == [1.0, 1.1]
+
+
+def test_expired_intraday_bar_is_delivered_once(chart):
+    _, series_id = add(chart, Interval.in_1_minute)
+    opened = int(time.time()) // 60 * 60 - 120  # ended a minute ago
+    chart._on_message(du(series_id, (0, [opened, 1, 2, 0.5, 1.0, 5])))
+    chart._on_message({"m": "series_completed", "p": ["cs_x", series_id]})
+
+    chart._on_idle()
+    chart._on_idle()
+    assert closes(chart) == [1.0]
+
+    chart._on_message(du(series_id, (1, [opened + 60, 1, 2, 0.5, 1.1, 5])))
+    assert closes(chart) == [1.0]  # already delivered by the close timer
+
+
+def test_removed_series_is_not_delivered(chart):
+    seis, series_id = add(chart, Interval.in_daily)
+    chart._on_message({"m": "series_completed", "p": ["cs_x", series_id]})
+    chart._on_message(du(series_id, (0, [86400, 1, 2, 0.5, 1.0, 5])))
+    chart.remove(seis)
+    assert seis not in chart
+    chart._on_message(du(series_id, (1, [2 * 86400, 1, 2, 0.5, 1.1, 5])))
+    assert chart.delivered == []
+
+
+def test_critical_error_reopens_connection(chart):
+    with pytest.raises(ConnectionError):
+        chart._on_message({"m": "critical_error", "p": ["cs_x", "invalid session"]})
+
+
+def test_bar_index_timezone_of_exchange():
+    delivered = []
+    chart = ChartStream(None, lambda seis, data: delivered.append(data), timezone="exchange")
+    _, series_id = add(chart, Interval.in_daily)
+    chart._on_message({"m": "symbol_resolved", "p": ["cs_x", "symbol_1", {"timezone": "America/New_York"}]})
+    chart._on_message({"m": "series_completed", "p": ["cs_x", series_id]})
+    chart._on_message(du(series_id, (0, [86400, 1, 2, 0.5, 1.0, 5]), (1, [2 * 86400, 1, 2, 0.5, 1.1, 5])))
+    assert str(delivered[0].index.tz) == "America/New_York"
+    assert list(delivered[0].columns) == list(protocol.bars_to_df({}, "", "UTC").columns)
@@ -0,0 +1,150 @@
+import json
+import queue
+
+import pytest
+from websocket import WebSocketTimeoutException
+
+from tvDatafeed import protocol
+from tvDatafeed.supervisor import Backoff, ConnectionSupervisor
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.frames = queue.Queue()
+
+    def settimeout(self, timeout):
+        pass
+
+    def send(self, text):
+        self.sent.extend(protocol.split_frames(text))
+
+    def recv(self):
+        try:
+            return self.frames.get_nowait()
+        except queue.Empty:
+            raise WebSocketTimeoutException("timed out") from None
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.ws = FakeWebSocket()
+        self.chart_session = f"cs_{number}"
+        self.quote_session = f"qs_{number}"
+        self.connected = True
+
+    def close(self):
+        self.connected = False
+
+    def messages(self):
+        return [(message["m"], message["p"]) for message in map(json.loads, self.ws.sent)]
+
+
+@pytest.fixture
+def connections():
+    return []
+
+
+@pytest.fixture
+def supervisor(connections):
+    def open_connection():
+        connections.append(FakeConnection(len(connections) + 1))
+        return connections[-1]
+
+    sup = ConnectionSupervisor(open_connection, read_timeout=60)
+    sup._backoff = Backoff(base=0.001, max_delay=0.001)
+    yield sup
+    sup.close()
+
+
+def test_journal_drops_cancelled_messages(supervisor):
+    cs, qs = supervisor.chart_session, supervisor.quote_session
+    supervisor.send("switch_timezone", [cs, "Etc/UTC"])
+    supervisor.send("switch_timezone", [cs, "exchange"])
+    supervisor.send("resolve_symbol", [cs, "symbol_1", "={}"])
+    supervisor.send("create_series", [cs, "s1", "s1", "symbol_1", "1", 2])
+    supervisor.send("resolve_symbol", [cs, "symbol_2", "={}"])
+    supervisor.send("create_series", [cs, "s2", "s2", "symbol_2", "1", 2])
+    supervisor.send("modify_series", [cs, "s2", "s2", "symbol_2", "5", ""])
+    supervisor.send("remove_series", [cs, "s2"])
+    supervisor.send("quote_add_symbols", [qs, "MOCK:AAA", "MOCK:BBB"])
+    supervisor.send("quote_add_symbols", [qs, "MOCK:BBB", "MOCK:CCC"])
+    supervisor.send("quote_remove_symbols", [qs, "MOCK:AAA"])
+
+    assert supervisor.journal() == [
+        ("switch_timezone", [cs, "exchange"]),
+        ("resolve_symbol", [cs, "symbol_1", "={}"]),
+        ("create_series", [cs, "s1", "s1", "symbol_1", "1", 2]),
+        ("quote_add_symbols", [qs, "MOCK:BBB", "MOCK:CCC"]),
+    ]
+
+    supervisor.send("quote_remove_symbols", [qs, "MOCK:BBB", "MOCK:CCC"])
+    supervisor.send("chart_delete_session", [cs])
+    assert supervisor.journal() == []
+
+
+def test_shared_symbol_is_kept_until_last_series_is_removed(supervisor):
+    cs = supervisor.chart_session
+    supervisor.send("resolve_symbol", [cs, "symbol_1", "={}"])
+    supervisor.send("create_series", [cs, "s1", "s1", "symbol_1", "1", 2])
+    supervisor.send("create_series", [cs, "s2", "s2", "symbol_1", "5", 2])
+    supervisor.send("remove_series", [cs, "s1"])
+    assert [func for func, _ in supervisor.journal()] == ["resolve_symbol", "create_series"]
+    supervisor.send("remove_series", [cs, "s2"])
+    assert supervisor.journal() == []
+
+
+def test_reconnect_replays_journal_with_new_session_ids(supervisor, connections):
+    cs, qs = supervisor.chart_session, supervisor.quote_session
+    assert (cs, qs) == ("cs_1", "qs_1")
+    supervisor.send("resolve_symbol", [cs, "symbol_1", "={}"])
+    supervisor.send("create_series", [cs, "s1", "s1", "symbol_1", "1", 2])
+    supervisor.send("quote_add_symbols", [qs, "MOCK:AAA"])
+
+    supervisor.reconnect("test")
+    assert supervisor.recv() == []  # connects, nothing received yet
+    assert len(connections) == 2
+    assert supervisor.reconnects == 1
+    assert connections[1].messages() == [
+        ("resolve_symbol", ["cs_2", "symbol_1", "={}"]),
+        ("create_series", ["cs_2", "s1", "s1", "symbol_1", "1", 2]),
+        ("quote_add_symbols", ["qs_2", "MOCK:AAA"]),
+    ]
+    assert supervisor.chart_session == "cs_1"  # stable for callers
+
+    supervisor.send("remove_series", [cs, "s1"])
+    assert connections[1].messages()[-1] == ("remove_series", ["cs_2", "s1"])
+
+
+def test_received_session_ids_are_translated_back(supervisor, connections):
+    assert supervisor.chart_session == "cs_1"
+    supervisor.reconnect("test")
+    supervisor.recv()
+    connections[1].ws.frames.put(
+        "~m~4~m~~h~3" + protocol.create_message("du", ["cs_2", {"s1": {"s": []}}])
+    )
+    messages = supervisor.recv()
+    assert messages == [{"m": "du", "p": ["cs_1", {"s1": {"s": []}}]}]
+    assert connections[1].ws.sent[-1] == "~h~3"  # heartbeat answered
+
+
+def test_messages_sent_while_disconnected_are_replayed(supervisor, connections):
+    cs = supervisor.chart_session
+    supervisor.reconnect("test")
+    supervisor.send("create_series", [cs, "s1", "s1", "symbol_1", "1", 2])
+    assert connections[0].messages() == []
+    supervisor.recv()
+    assert connections[1].messages() == [("create_series", ["cs_2", "s1", "s1", "symbol_1", "1", 2])]
+
+
+def test_stalled_connection_is_reopened(connections):
+    def open_connection():
+        connections.append(FakeConnection(len(connections) + 1))
+        return connections[-1]
+
+    with ConnectionSupervisor(open_connection, read_timeout=0) as supervisor:
+        supervisor._backoff = Backoff(base=0.001, max_delay=0.001)
+        supervisor.recv()  # connects, then times out
+        assert not connections[0].connected
+        supervisor.recv()
+        assert len(connections) == 2
@@ -0,0 +1,71 @@
+import json
+import time
+
+from tvDatafeed.symbols import SymbolCache
+
+
+def item(symbol, exchange="MOCK"):
+    return {"symbol": symbol, "exchange": exchange, "description": f"{symbol} description"}
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = SymbolCache(maxsize=2)
+    cache.put_symbol(item("AAA"))
+    cache.put_symbol(item("BBB"))
+    assert cache.get_symbol("AAA", "MOCK") is not None  # BBB is now least recently used
+
+    cache.put_symbol(item("CCC"))
+    assert len(cache) == 2
+    assert cache.get_symbol("BBB", "MOCK") is None
+    assert cache.get_symbol("AAA", "MOCK") is not None
+    assert cache.get_symbol("CCC", "MOCK") is not None
+
+
+def test_entries_expire_after_ttl():
+    cache = SymbolCache(ttl=0.05)
+    cache.put_symbol(item("AAA"))
+    cache.put_symbol(item("BBB"), ttl=None)
+    cache.put_resolved("MOCK:AAA", {"timezone": "Etc/UTC"})
+    assert cache.get_symbol("AAA", "MOCK") is not None
+    assert cache.get_resolved("MOCK:AAA") == {"timezone": "Etc/UTC"}
+
+    time.sleep(0.1)
+    assert cache.get_symbol("AAA", "MOCK") is None
+    assert cache.get_resolved("MOCK:AAA") is None
+    assert cache.get_symbol("BBB", "MOCK") is not None  # no expiry
+    assert len(cache) == 1
+
+
+def test_search_results_index_symbols():
+    cache = SymbolCache()
+    result = {"symbols": [item("AAA"), item("BBB", "OTHER")], "symbols_remaining": 0}
+    cache.put_search("A", "", result)
+    assert cache.get_search("A", "") is result
+    assert cache.get_search("A", "MOCK") is None
+    assert cache.get_symbol("BBB", "OTHER")["description"] == "BBB description"
+
+
+def test_resolved_info_keyed_by_session():
+    cache = SymbolCache()
+    cache.put_resolved("MOCK:AAA", {"session": "regular"})
+    cache.put_resolved("MOCK:AAA", {"session": "extended"}, extended_session=True)
+    assert cache.get_resolved("MOCK:AAA") == {"session": "regular"}
+    assert cache.get_resolved("MOCK:AAA", extended_session=True) == {"session": "extended"}
+
+
+def test_load_csv(tmp_path):
+    path = tmp_path / "symbols.csv"
+    path.write_text("symbol,exchange,description\nAAA,MOCK,first\n,MOCK,no symbol\nBBB,MOCK,second\n")
+    cache = SymbolCache(ttl=0.01)
+    assert cache.load(str(path)) == 2
+    time.sleep(0.05)
+    assert cache.get_symbol("AAA", "MOCK")["description"] == "first"  # loaded symbols do not expire
+
+
+def test_load_json(tmp_path):
+    path = tmp_path / "symbols.json"
+    path.write_text(json.dumps({"symbols": [item("AAA"), {"symbol": "BBB"}]}))
+    cache = SymbolCache()
+    assert cache.load(str(path), ttl=60) == 1
+    assert cache.get_symbol("AAA", "MOCK") is not None
+    assert cache.get_symbol("BBB", "") is None
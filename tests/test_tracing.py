@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from tvDatafeed import tracing
+
+
+@pytest.fixture
+def recorder():
+    hook = tracing.add_hook(tracing.SpanRecorder())
+    yield hook
+    tracing.remove_hook(hook)
+
+
+def test_spans_nest(recorder):
+    with tracing.span("outer", symbol="MOCK:AAA") as outer:
+        with tracing.span("inner") as inner:
+            with tracing.span("innermost") as innermost:
+                pass
+        with tracing.span("sibling") as sibling:
+            pass
+
+    assert [span.name for span in recorder.spans] == ["innermost", "inner", "sibling", "outer"]
+    assert outer.parent is None and outer.trace_id == outer.span_id
+    assert inner.parent is outer and sibling.parent is outer
+    assert innermost.parent is inner
+    assert {span.trace_id for span in recorder.spans} == {outer.span_id}
+    assert outer.attributes == {"symbol": "MOCK:AAA"}
+    assert outer.duration >= inner.duration >= innermost.duration
+
+
+def test_started_span_is_not_a_parent(recorder):
+    with tracing.span("get_hist") as root:
+        resolve = tracing.start_span("resolve")
+        with tracing.span("parse") as parse:
+            resolve.end()
+        resolve.end()  # ending twice reports it once
+    assert resolve.parent is root
+    assert parse.parent is root
+    assert [span.name for span in recorder.spans] == ["resolve", "parse", "get_hist"]
+
+
+def test_span_records_error(recorder):
+    with pytest.raises(KeyError):
+        with tracing.span("outer") as outer:
+            with tracing.span("inner"):
+                raise KeyError("x")
+    assert recorder.spans[0].error == "KeyError('x')"
+    assert outer.error == "KeyError('x')"
+    with tracing.span("after") as after:
+        pass
+    assert after.parent is None  # the stack was unwound
+
+
+def test_threads_have_their_own_stack(recorder):
+    started = threading.Event()
+    release = threading.Event()
+    spans = {}
+
+    def work():
+        with tracing.span("thread") as span:
+            spans["thread"] = span
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=work)
+    with tracing.span("main"):
+        thread.start()
+        started.wait(5)
+        with tracing.span("child") as child:
+            pass
+        release.set()
+        thread.join()
+    assert child.parent.name == "main"
+    assert spans["thread"].parent is None
+
+
+def test_no_spans_without_hooks():
+    with tracing.span("outer") as span:
+        assert tracing.start_span("inner") is span
+    assert span.duration is None
+
+
+def test_profiler_reports_slow_spans():
+    slow = []
+    tracing.enable_profiler(threshold=0.05, interval=0.001, callback=slow.append)
+    try:
+        with tracing.span("get_hist"):
+            with tracing.span("receive"):
+                time.sleep(0.1)
+        with tracing.span("get_hist") as fast:
+            pass
+    finally:
+        tracing.disable_profiler()
+    assert len(slow) == 1
+    assert slow[0].profile and all(count > 0 for count, _ in slow[0].profile)
+    assert " test_profiler_reports_slow_spans" in slow[0].profile[0][1][0]  # innermost frame first
+    assert fast.profile is None
+
+
+def test_get_hist_stages(server, tv, recorder):
+    tv.get_hist("AAA", "MOCK", n_bars=10)
+    spans = list(recorder.spans)
+    root = spans[-1]
+    assert root.name == "get_hist"
+    names = {span.name for span in spans}
+    assert {"acquire", "resolve", "create_series", "receive", "parse", "dataframe"} <= names
+    assert all(span.trace_id == root.span_id for span in spans)
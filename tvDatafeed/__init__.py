@@ -3,5 +3,16 @@ from .seis import Seis
 from .datafeed import TvDatafeedLive
 from .consumer import Consumer
 from .token_manager import TokenManager
+from .cache import BarCache
+from .symbols import SymbolCache, symbol_cache
+from .aggregate import BarAggregator, CustomInterval
 
 __version__ = "3.0.1"
+
+
+def __getattr__(name):
+    # aiohttp is slow to import and optional, load the async client only when used
+    if name == "AsyncTvDatafeed":
+        from .aio import AsyncTvDatafeed
+        return AsyncTvDatafeed
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
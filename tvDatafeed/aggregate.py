@@ -0,0 +1,178 @@
+import logging
+import math
+import re
+from . import protocol
+
+logger = logging.getLogger(__name__)
+
+
+class CustomInterval:
+    """Chart interval of any duration, built locally by BarAggregator
+
+    Can be used wherever a tvDatafeed.Interval is expected by Seis and
+    Consumer. Values use the TradingView notation: "7S" for seconds, "2" or
+    "90" for minutes, "2H" for hours and "2D" for days.
+
+    Args:
+        value (str): interval value, e.g. "7S", "2", "90" or "6H"
+
+    Raises:
+        ValueError: if value is not a valid interval
+    """
+
+    _units = {"S": "second", "": "minute", "H": "hour", "D": "day"}
+
+    def __init__(self, value):
+        match = re.fullmatch(r"(\d+)([SHD]?)", str(value))
+        if match is None or int(match.group(1)) < 1:
+            raise ValueError(f"not a valid custom interval {value}")
+        self.value = str(value)
+        self.name = f"in_{match.group(1)}_{self._units[match.group(2)]}"
+        self.seconds = protocol.interval_seconds(self.value)
+
+    def __repr__(self):
+        return f"CustomInterval('{self.value}')"
+
+    def __eq__(self, other):
+        return getattr(other, "value", None) == self.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+
+class BarAggregator:
+    """Build OHLCV bars of a fixed duration from trades, quotes or finer bars
+
+    Only the bar currently being built is kept, so every update is O(1).
+    Bars are aligned to multiples of the duration counted from origin (unix
+    epoch by default, which aligns minute and hour bars with the clock).
+    All update methods return the completed bar as a [time, open, high,
+    low, close, volume] list once an update falls into a later bar, or
+    once a finer bar ends exactly at the end of the current bar, otherwise
+    None. Bars without any update in their period are not produced.
+
+    Args:
+        seconds (int): bar duration in seconds
+        origin (int, optional): unix time bars are aligned to. Defaults to 0.
+    """
+
+    def __init__(self, seconds, origin=0):
+        if seconds <= 0:
+            raise ValueError("bar duration must be positive")
+        self.seconds = seconds
+        self.origin = origin
+        self.bar = None  # [time, open, high, low, close, volume] of the bar being built
+        self._last_volume = None  # last cumulative volume seen in quotes
+
+    def bar_start(self, timestamp):
+        """Return the start time of the bar containing timestamp"""
+        return timestamp - (timestamp - self.origin) % self.seconds
+
+    def _update(self, timestamp, open, high, low, close, volume):
+        start = self.bar_start(timestamp)
+        completed = None
+        if self.bar is not None and start != self.bar[0]:
+            if start < self.bar[0]:
+                logger.debug(f"Dropped update at {timestamp} older than the current bar")
+                return None
+            completed, self.bar = self.bar, None
+
+        if self.bar is None:
+            self.bar = [start, open, high, low, close, volume]
+        else:
+            bar = self.bar
+            if high > bar[2]:
+                bar[2] = high
+            if low < bar[3]:
+                bar[3] = low
+            bar[4] = close
+            bar[5] += volume
+        return completed
+
+    def add_trade(self, timestamp, price, volume=0.0):
+        """Add a trade
+
+        Args:
+            timestamp (float): unix time of the trade
+            price (float): trade price
+            volume (float, optional): traded volume. Defaults to 0.
+
+        Returns:
+            list: completed bar or None
+        """
+        return self._update(timestamp, price, price, price, price, volume)
+
+    def add_quote(self, timestamp, price, cumulative_volume=None):
+        """Add a quote update with last price and cumulative session volume
+
+        The volume of a quote is the total volume of the session, so only the
+        increase since the previous quote is added to the bar.
+
+        Args:
+            timestamp (float): unix time of the quote
+            price (float): last price
+            cumulative_volume (float, optional): session volume. Defaults to None.
+
+        Returns:
+            list: completed bar or None
+        """
+        volume = 0.0
+        if cumulative_volume is not None:
+            if self._last_volume is not None and cumulative_volume >= self._last_volume:
+                volume = cumulative_volume - self._last_volume
+            self._last_volume = cumulative_volume  # a drop means a new session started
+        return self._update(timestamp, price, price, price, price, volume)
+
+    def add_bar(self, timestamp, open, high, low, close, volume=0.0, duration=0):
+        """Add a finer bar
+
+        Args:
+            timestamp (float): unix open time of the bar
+            open, high, low, close (float): bar prices
+            volume (float, optional): bar volume, NaN is counted as 0. Defaults to 0.
+            duration (int, optional): length of the bar in seconds, when the bar ends at the end
+                of the current bar the current bar is completed right away. Defaults to 0.
+
+        Returns:
+            list: completed bar or None
+        """
+        if volume is None or math.isnan(volume):
+            volume = 0.0
+        completed = self._update(timestamp, open, high, low, close, volume)
+        if completed is None and duration and timestamp + duration >= self.bar[0] + self.seconds:
+            completed, self.bar = self.bar, None
+        return completed
+
+    def flush(self, now=None):
+        """Complete the current bar if its end time has passed
+
+        Args:
+            now (float, optional): current unix time. Defaults to None (always complete).
+
+        Returns:
+            list: completed bar or None
+        """
+        if self.bar is None or (now is not None and now < self.bar[0] + self.seconds):
+            return None
+        completed, self.bar = self.bar, None
+        return completed
+
+
+def base_interval(seconds, intervals):
+    """Return the longest of intervals whose length divides seconds evenly
+
+    Args:
+        seconds (int): length of the custom interval
+        intervals (iterable): Interval members to choose from
+
+    Returns:
+        Interval: finest bars to build the custom interval from, None if none fits
+    """
+    best = None
+    for interval in intervals:
+        length = protocol.interval_seconds(interval.value)
+        if interval.value[-1:] in ("W", "M"):
+            continue  # not a fixed length
+        if length <= seconds and seconds % length == 0 and (best is None or length > best[0]):
+            best = (length, interval)
+    return None if best is None else best[1]
@@ -0,0 +1,378 @@
+import asyncio
+import json
+import logging
+import time
+import pandas as pd
+from .main import Interval
+from .token_manager import TokenManager
+from . import protocol
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, install with pip install tvdatafeed[async]
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncConnection:
+    # authenticated websocket with its chart and quote sessions
+    def __init__(self, ws, token, chart_session, quote_session):
+        self.ws = ws
+        self.token = token
+        self.chart_session = chart_session
+        self.quote_session = quote_session
+        self.last_used = time.monotonic()
+        self._series_counter = 0
+
+    def next_series_ids(self):
+        self._series_counter += 1
+        return f"symbol_{self._series_counter}", f"s{self._series_counter}"
+
+    async def send_message(self, func, args):
+        await self.ws.send_str(protocol.create_message(func, args))
+
+    async def close(self):
+        try:
+            await self.ws.close()
+        except Exception as e:
+            logger.debug(f"Error while closing websocket: {e}")
+
+
+class AsyncTvDatafeed:
+    """asyncio native TradingView historical data downloader
+
+    Same protocol as TvDatafeed, but driven by aiohttp so many fetches can be
+    in flight on one event loop. Authenticated websocket connections are kept
+    and reused between calls, at most max_concurrency of them are used at once.
+
+    Args:
+        username (str, optional): tradingview username. Defaults to None.
+        password (str, optional): tradingview password. Defaults to None.
+        token_file (str, optional): path to token file. Defaults to "tvdatafeed_token.json".
+        max_concurrency (int, optional): maximum number of fetches in flight. Defaults to 10.
+        idle_timeout (float, optional): seconds after which an unused connection is closed. Defaults to 60.
+        ws_url (str, optional): websocket endpoint to connect to instead of TradingView. Defaults to None.
+        search_url (str, optional): symbol search endpoint with {} placeholders for text and exchange. Defaults to None.
+        timezone (str, optional): timezone of the returned datetime index, "exchange" for the
+            timezone of the symbol's exchange. Defaults to None (local timezone).
+
+    Example:
+        async with AsyncTvDatafeed(username, password) as tv:
+            data = await tv.get_hist("NIFTY", "NSE", n_bars=100)
+    """
+
+    __ws_timeout = 5
+    __token_validation_wait_time = 5
+
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        token_file: str = "tvdatafeed_token.json",
+        max_concurrency: int = 10,
+        idle_timeout: float = 60,
+        ws_url: str = None,
+        search_url: str = None,
+        timezone: str = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError("AsyncTvDatafeed requires aiohttp, install it with 'pip install tvdatafeed[async]'")
+
+        self.username = username
+        self.password = password
+        self.token_manager = TokenManager(token_file)
+        self.token = None
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self.ws_url = ws_url or protocol.WS_URL
+        self.search_url = search_url or protocol.SEARCH_URL
+        self.timezone = timezone
+
+        self._http = None
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._auth_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.login()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def __session(self):
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(connect=self.__ws_timeout))
+        return self._http
+
+    async def login(self):
+        """Authenticate, reusing a saved token when it is still valid
+
+        Returns:
+            str: auth token in use
+        """
+        async with self._auth_lock:
+            if self.token is not None:
+                return self.token
+
+            token = None
+            if self.username is None or self.password is None:
+                logger.info("Credentials not provided, using unauthorized mode")
+            else:
+                saved_token = self.token_manager.load_token(self.username)
+                if saved_token and await self.__is_token_valid(saved_token):
+                    logger.info("The saved token is valid, let's use it")
+                    token = saved_token
+                else:
+                    logger.info("Getting a new token...")
+                    token = await self.__auth(self.username, self.password)
+                    if token:
+                        self.token_manager.save_token(token, self.username)
+
+            if token is None:
+                token = "unauthorized_user_token"
+                logger.warning(
+                    "you are using nologin method, data you access may be limited"
+                )
+            self.token = token
+            return token
+
+    async def refresh_token(self):
+        """Force refresh token
+
+        Returns:
+            bool: True if a new token was obtained
+        """
+        if not (self.username and self.password):
+            logger.error("No credentials to refresh the token")
+            return False
+
+        new_token = await self.__auth(self.username, self.password)
+        if not new_token:
+            logger.error("Failed to obtain a new token")
+            return False
+
+        self.token_manager.save_token(new_token, self.username)
+        self.token = new_token
+        await self.__close_idle(all_connections=True)
+        logger.info("Token successfully refreshed")
+        return True
+
+    async def __auth(self, username, password):
+        data = {"username": username, "password": password, "remember": "on"}
+        try:
+            async with self.__session().post(
+                protocol.SIGN_IN_URL, data=data, headers=protocol.SIGN_IN_HEADERS
+            ) as response:
+                return (await response.json(content_type=None))["user"]["auth_token"]
+        except Exception as e:
+            # browser based captcha login is only available in the blocking client
+            logger.error(f"Captcha required, please sign in once with TvDatafeed to save a token: {e}")
+            return None
+
+    async def __is_token_valid(self, token):
+        try:
+            ws = await self.__ws_connect()
+        except Exception as e:
+            logger.debug(f"Error validating token: {e}")
+            return True  # better to try using the token than to delete it on a network error
+
+        try:
+            await ws.send_str(protocol.create_message("set_auth_token", [token]))
+            result = await ws.receive_str(timeout=self.__token_validation_wait_time)
+            return not ("critical_error" in result or "auth_error" in result or "unauthorized" in result.lower())
+        except Exception as e:
+            logger.debug(f"No response received from the server when verifying the token: {e}")
+            return True
+        finally:
+            await ws.close()
+
+    def __ws_connect(self):
+        # connect timeout comes from the session, receive and close timeouts from the websocket timeout
+        return self.__session().ws_connect(
+            self.ws_url,
+            headers={"Origin": protocol.WS_ORIGIN},
+            timeout=aiohttp.ClientWSTimeout(ws_receive=self.__ws_timeout, ws_close=self.__ws_timeout),
+        )
+
+    async def __open_connection(self):
+        ws = await self.__ws_connect()
+        conn = _AsyncConnection(
+            ws,
+            token=self.token,
+            chart_session=protocol.generate_chart_session(),
+            quote_session=protocol.generate_session(),
+        )
+        try:
+            await conn.send_message("set_auth_token", [self.token])
+            await conn.send_message("chart_create_session", [conn.chart_session, ""])
+            await conn.send_message("quote_create_session", [conn.quote_session])
+            await conn.send_message("quote_set_fields", [conn.quote_session] + protocol.QUOTE_FIELDS)
+        except Exception:
+            await conn.close()
+            raise
+        return conn
+
+    async def __acquire(self):
+        await self.__close_idle()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.token == self.token and not conn.ws.closed:
+                return conn
+            await conn.close()
+        return await self.__open_connection()
+
+    async def __release(self, conn, discard=False):
+        conn.last_used = time.monotonic()
+        if discard or conn.ws.closed or len(self._idle) >= self.max_concurrency:
+            await conn.close()
+        else:
+            self._idle.append(conn)
+
+    async def __close_idle(self, all_connections=False):
+        now = time.monotonic()
+        keep = []
+        for conn in self._idle:
+            if all_connections or now - conn.last_used > self.idle_timeout:
+                await conn.close()
+            else:
+                keep.append(conn)
+        self._idle = keep
+
+    async def close(self):
+        """Close all websocket connections and the http session"""
+        await self.__close_idle(all_connections=True)
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def get_hist(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 10,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        _retry_count: int = 0,
+    ) -> pd.DataFrame:
+        """get historical data
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            interval (str, optional): chart interval. Defaults to 'D'.
+            n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+
+        Returns:
+            pd.Dataframe: dataframe with sohlcv as columns, None if no data was received
+        """
+        await self.login()
+        symbol = protocol.format_symbol(symbol=symbol, exchange=exchange, contract=fut_contract)
+        interval_str = interval.value if hasattr(interval, "value") else interval
+
+        async with self._semaphore:
+            conn = await self.__acquire()
+            reusable = False
+            auth_error_detected = False
+            bars = {}
+            symbol_info = None
+            try:
+                symbol_id, series_id = conn.next_series_ids()
+                await conn.send_message("resolve_symbol", [
+                    conn.chart_session, symbol_id, protocol.resolve_symbol_param(symbol, extended_session)
+                ])
+                await conn.send_message("create_series", [
+                    conn.chart_session, series_id, series_id, symbol_id, interval_str, n_bars
+                ])
+                await conn.send_message("switch_timezone", [conn.chart_session, "exchange"])
+
+                logger.debug(f"getting data for {symbol}...")
+                parser = protocol.FrameParser()
+                collector = protocol.BarCollector([series_id])
+                completed = False
+                while not completed:
+                    result = await conn.ws.receive_str(timeout=self.__ws_timeout)
+                    for payload, message in parser.messages(result):
+                        if message is None:
+                            if payload.startswith("~h~"):
+                                await conn.ws.send_str(protocol.prepend_header(payload))
+                            continue
+
+                        func = message.get("m")
+                        params = message.get("p", [])
+                        if func in protocol.DATA_MESSAGES:
+                            collector.process(message)
+                        elif func == "symbol_resolved" and params[1] == symbol_id:
+                            symbol_info = params[2]
+                        elif func == "series_completed" and params[1] == series_id:
+                            completed = True
+                        elif func in ("symbol_error", "series_error") and params[1] in (symbol_id, series_id):
+                            logger.warning(f"{func} for {symbol}: {params[2:]}")
+                            completed = True
+                        elif func == "critical_error":
+                            auth_error_detected = "invalid parameters" not in payload
+                            logger.warning(f"A critical error was detected in the server response: {payload[:500]}...")
+                            raise RuntimeError("critical error from server")
+
+                bars = collector.pop(series_id)
+                await conn.send_message("remove_series", [conn.chart_session, series_id])
+                reusable = True
+            except Exception as e:
+                logger.error(f"Error receiving data: {e}")
+            finally:
+                await self.__release(conn, discard=not reusable)
+
+        if auth_error_detected and _retry_count < 1 and await self.refresh_token():
+            return await self.get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, _retry_count + 1)
+
+        if not bars:
+            logger.error("no data, please check the exchange and symbol")
+            return None
+
+        return protocol.bars_to_df(bars, symbol, protocol.index_timezone(self.timezone, symbol_info))
+
+    async def get_hist_many(self, symbols, **kwargs):
+        """get historical data for many symbols concurrently
+
+        Args:
+            symbols (list): items can be a symbol string in format EXCHANGE:SYMBOL, a
+                (symbol, exchange) tuple or a dict with get_hist keyword arguments
+            **kwargs: default get_hist keyword arguments for all symbols
+
+        Returns:
+            dict: dataframes keyed by EXCHANGE:SYMBOL, None for failed symbols
+        """
+        calls = []
+        for item in symbols:
+            if isinstance(item, str):
+                item = {"symbol": item}
+            elif isinstance(item, (tuple, list)):
+                item = dict(zip(("symbol", "exchange"), item))
+            call = {**kwargs, **item}
+            key = protocol.format_symbol(call["symbol"], call.get("exchange", "NSE"), call.get("fut_contract"))
+            calls.append((key, call))
+
+        frames = await asyncio.gather(
+            *(self.get_hist(**call) for _, call in calls), return_exceptions=True
+        )
+        return {
+            key: (None if isinstance(df, BaseException) else df)
+            for (key, _), df in zip(calls, frames)
+        }
+
+    async def search_symbol(self, text: str, exchange: str = ''):
+        url = self.search_url.format(text, exchange)
+
+        symbols_list = []
+        try:
+            async with self.__session().get(url, headers=protocol.SEARCH_HEADERS) as resp:
+                body = await resp.text()
+            symbols_list = json.loads(body.replace('</em>', '').replace('<em>', ''))
+        except Exception as e:
+            logger.error(e)
+
+        return symbols_list
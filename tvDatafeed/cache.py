@@ -0,0 +1,225 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import tempfile
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class _FileLock:
+    # Advisory lock on a separate .lock file, shared for readers and
+    # exclusive for writers, so several processes can use the same cache
+    def __init__(self, path, exclusive=True, blocking=True):
+        self.path = path
+        self.exclusive = exclusive
+        self.blocking = blocking
+        self._fd = None
+
+    def acquire(self):
+        while True:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    flags = fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH
+                    if not self.blocking:
+                        flags |= fcntl.LOCK_NB
+                    fcntl.flock(self._fd, flags)
+                else:  # msvcrt has no shared locks, all locks are exclusive
+                    mode = msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK
+                    msvcrt.locking(self._fd, mode, 1)
+            except OSError:
+                os.close(self._fd)
+                self._fd = None
+                raise
+            if self._is_current():
+                return self
+            self.release()  # lock file was removed while waiting for it, lock the new one
+
+    def _is_current(self):
+        # True if the locked file is still the lock file at path
+        try:
+            return os.path.samestat(os.fstat(self._fd), os.stat(self.path))
+        except FileNotFoundError:
+            return False
+
+    def remove(self):
+        # delete the lock file while holding the exclusive lock, processes
+        # waiting for it notice that it was removed and lock a new one
+        try:
+            os.remove(self.path)
+        except OSError:  # open files can not be removed on Windows
+            pass
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class BarCache:
+    """Persistent on-disk cache of downloaded bars
+
+    Each (symbol, interval, session) series is stored in its own columnar
+    file, Parquet or Feather, and protected by a per-key file lock so the
+    cache directory can be shared by several processes. Lock files are
+    removed together with their cache files. When the total size
+    of the cache grows above max_bytes the least recently used files are
+    removed.
+
+    Requires pyarrow (pip install tvdatafeed[cache]).
+
+    Args:
+        directory (str): directory where cache files are stored, created if missing
+        max_bytes (int, optional): maximum total size of cached files. Defaults to None (unlimited).
+        file_format (str, optional): "parquet" or "feather". Defaults to "parquet".
+
+    Raises:
+        ImportError: if pyarrow is not installed
+        ValueError: if file_format is not supported
+    """
+
+    _extensions = {"parquet": ".parquet", "feather": ".feather"}
+
+    def __init__(self, directory, max_bytes=None, file_format="parquet"):
+        if file_format not in self._extensions:
+            raise ValueError(f"Unsupported cache format {file_format}, use parquet or feather")
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("BarCache requires pyarrow, install it with 'pip install tvdatafeed[cache]'")
+
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.file_format = file_format
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(symbol, interval, extended_session=False):
+        """Return cache key of a series
+
+        Args:
+            symbol (str): symbol in EXCHANGE:SYMBOL format, including future contract suffix
+            interval (str): interval value
+            extended_session (bool, optional): extended session data. Defaults to False.
+        """
+        return (symbol, interval, "extended" if extended_session else "regular")
+
+    def _path(self, key):
+        name = re.sub(r"[^A-Za-z0-9]+", "_", "_".join(key)).strip("_")
+        digest = hashlib.sha1("|".join(key).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, f"{name}_{digest}{self._extensions[self.file_format]}")
+
+    def _lock(self, path, exclusive=True, blocking=True):
+        return _FileLock(path + ".lock", exclusive, blocking)
+
+    def load(self, key):
+        """Load cached bars
+
+        Returns:
+            pd.DataFrame: cached bars with UTC datetime index, None if not cached or not readable
+        """
+        path = self._path(key)
+        with self._lock(path, exclusive=False):
+            if not os.path.exists(path):
+                return None
+            try:
+                if self.file_format == "parquet":
+                    data = pd.read_parquet(path)
+                else:
+                    data = pd.read_feather(path)
+            except Exception as e:
+                logger.warning(f"Could not read cache file {path}: {e}")
+                return None
+            os.utime(path)  # mark as recently used for eviction
+        return data.set_index("datetime")
+
+    def store(self, key, data):
+        """Store bars, replacing previously cached bars of the key
+
+        Args:
+            key (tuple): cache key from BarCache.key
+            data (pd.DataFrame): bars with datetime index
+        """
+        path = self._path(key)
+        data = data.tz_convert("UTC").reset_index()  # local timezones can not be stored
+        with self._lock(path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                if self.file_format == "parquet":
+                    data.to_parquet(tmp_path, index=False)
+                else:
+                    data.to_feather(tmp_path)
+                os.replace(tmp_path, path)  # readers never see a partially written file
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        self.evict()
+
+    def delete(self, key):
+        path = self._path(key)
+        with self._lock(path) as lock:
+            if os.path.exists(path):
+                os.remove(path)
+            lock.remove()
+
+    def size(self):
+        """Total size of cached files in bytes"""
+        return sum(size for _, _, size in self._files())
+
+    def _files(self):
+        extension = self._extensions[self.file_format]
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(extension):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_mtime, stat.st_size))
+        return files
+
+    def evict(self):
+        """Remove least recently used files until the cache fits in max_bytes
+
+        Returns:
+            int: number of removed files
+        """
+        if self.max_bytes is None:
+            return 0
+
+        files = sorted(self._files(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        removed = 0
+        for path, _, size in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                with self._lock(path, blocking=False) as lock:  # skip files other processes are using
+                    os.remove(path)
+                    lock.remove()  # the lock of a removed file would be left behind otherwise
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.debug(f"Evicted {removed} files from bar cache")
+        return removed
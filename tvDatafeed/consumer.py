@@ -1,4 +1,89 @@
-import threading, queue, traceback
+import threading, traceback, logging
+from collections import deque
+from tvDatafeed import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+POLICIES=("block", "drop_oldest", "drop_newest", "coalesce")
+_EMPTY=object() # returned by _Buffer.get_nowait when there is no data
+
+class _Buffer(object):
+    # Bounded FIFO buffer between the data producer and the callback
+    #
+    # When full, the policy decides what happens to new data: block the
+    # producer until there is room, drop the oldest buffered data, drop
+    # the new data or replace all buffered data with the new data 
+    # (coalesce to the latest). None is the shutdown signal and is 
+    # always accepted, so stopping never blocks or gets dropped.
+    def __init__(self, maxsize=0, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown buffer policy {policy}, must be one of {POLICIES}")
+        
+        self.maxsize=maxsize # 0 is unbounded
+        self.policy=policy
+        self.dropped=0 # number of data samples dropped or replaced because buffer was full
+        self.max_depth=0 # highest number of buffered samples seen
+        self._items=deque()
+        self._cond=threading.Condition()
+        self._closed=False
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def put(self, data):
+        with self._cond:
+            if data is not None and self.maxsize and len(self._items) >= self.maxsize:
+                if self.policy=="block":
+                    self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+                    if self._closed: # nobody reads anymore
+                        return
+                elif self.policy=="drop_oldest":
+                    self._drop_data(1)
+                elif self.policy=="drop_newest":
+                    self.dropped+=1
+                    metrics.consumer_dropped.inc()
+                    return
+                else: # coalesce
+                    self._drop_data(len(self._items))
+            
+            self._items.append(data)
+            self.max_depth=max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+    
+    def _drop_data(self, count):
+        # drop up to count oldest data samples, never the shutdown signal
+        kept=deque()
+        while count and self._items:
+            if (item := self._items.popleft()) is None:
+                kept.append(item)
+            else:
+                self.dropped+=1
+                metrics.consumer_dropped.inc()
+                count-=1
+        self._items.extendleft(reversed(kept))
+    
+    def close(self):
+        # release producers blocked on a buffer nobody reads anymore
+        with self._cond:
+            self._closed=True
+            self._items.clear()
+            self._cond.notify_all()
+    
+    def get(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._items)
+            data=self._items.popleft()
+            self._cond.notify_all() # wake up blocked producers
+            return data
+    
+    def get_nowait(self):
+        with self._cond:
+            if not self._items:
+                return _EMPTY
+            data=self._items.popleft()
+            self._cond.notify_all()
+            return data
+
 
 class Consumer(threading.Thread):
     '''
@@ -8,7 +93,10 @@ class Consumer(threading.Thread):
     which will be called when new data bar becomes available for
     that Seis. Data reception and calling callback function is 
     done in a separate thread which the user must start by calling
-    start() method.
+    start() method. If an executor is given then no thread of its 
+    own is created, instead the callback is called in the threads 
+    of the executor which are shared by many consumers. Data is 
+    still passed to the callback one sample at a time in order.
     
     Parameters
     ----------
@@ -17,6 +105,27 @@ class Consumer(threading.Thread):
     callback : func
         reference to a function to be called when new data available,
         function protoype must be func_name(seis, data)
+    maxsize : int, optional
+        maximum number of data samples waiting for the callback, 0
+        for unbounded (default 0)
+    policy : str, optional
+        what to do with new data when the buffer is full: "block" 
+        waits until there is room, "drop_oldest" drops the oldest
+        waiting sample, "drop_newest" drops the new sample and 
+        "coalesce" replaces all waiting samples with the new one
+        (default "block")
+    executor : concurrent.futures.Executor, optional
+        shared executor to call the callback in instead of a 
+        thread of its own (default None)
+    
+    Attributes
+    ----------
+    dropped : int
+        number of data samples dropped because the buffer was full
+    depth : int
+        number of data samples waiting for the callback
+    max_depth : int
+        highest number of data samples that were waiting at once
     
     Methods
     -------
@@ -29,13 +138,23 @@ class Consumer(threading.Thread):
     stop()
         Stop the data processing and callback thread
     '''
-    def __init__(self, seis, callback):
+    _batch=16 # samples processed per executor task before giving other consumers a turn
+    
+    def __init__(self, seis, callback, maxsize=0, policy="block", executor=None):
         super().__init__()
 
-        self._buffer=queue.Queue()               
+        self._buffer=_Buffer(maxsize, policy)
+        self._executor=executor
+        self._scheduled=False # a _drain task is queued or running in the executor
+        self._executor_started=False
+        self._schedule_lock=threading.Lock()
+        self._done=threading.Event()
+        self._dropped=0 # counters are kept here once the buffer is released
+        self._max_depth=0
         self.seis=seis
         self.callback=callback
         self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
+        metrics.track_consumer(self) # buffer depth is reported in the consumer queue gauges
     
     def __repr__(self):
         return f'Consumer({repr(self.seis)},{self.callback.__name__})'
@@ -43,6 +162,81 @@ class Consumer(threading.Thread):
     def __str__(self):
         return f'{repr(self.seis)},callback={self.callback.__name__}'
     
+    @property
+    def dropped(self):
+        return self._buffer.dropped if self._buffer is not None else self._dropped
+    
+    @property
+    def depth(self):
+        return len(self._buffer) if self._buffer is not None else 0
+    
+    @property
+    def max_depth(self):
+        return self._buffer.max_depth if self._buffer is not None else self._max_depth
+    
+    def start(self):
+        '''
+        Start data processing and callback thread
+        '''
+        if self._executor is None:
+            return super().start()
+        
+        with self._schedule_lock:
+            self._executor_started=True
+        self._schedule()
+    
+    def join(self, timeout=None):
+        if self._executor is None:
+            return super().join(timeout)
+        
+        self._done.wait(timeout)
+    
+    def is_alive(self):
+        if self._executor is None:
+            return super().is_alive()
+        
+        return self._executor_started and not self._done.is_set()
+    
+    def _schedule(self):
+        # queue a _drain task unless one is already queued or running
+        with self._schedule_lock:
+            if self._scheduled or not self._executor_started or not self.depth:
+                return
+            self._scheduled=True
+        self._executor.submit(self._drain)
+    
+    def _drain(self):
+        # executor task, call the callback for up to _batch samples and 
+        # requeue itself if there is more, so the consumers sharing the 
+        # executor take turns and each one is processed serially
+        buffer=self._buffer
+        for _ in range(self._batch):
+            if (data := buffer.get_nowait()) is _EMPTY:
+                break
+            if data is None:
+                self._close()
+                return
+            
+            try: # in case user provided function throws an exception
+                with tracing.span("consumer_callback", consumer=self.name):
+                    self.callback(self.seis, data)
+            except Exception: # remove the consumer from Seis and close down gracefully
+                logger.exception(f"Callback of consumer {self.name} failed, removing it")
+                self._close_buffer() # release a producer blocked on the full buffer first
+                self.del_consumer()
+                self._close()
+                return
+        
+        with self._schedule_lock:
+            self._scheduled=False
+        self._schedule()
+    
+    def _close(self):
+        self.seis=None # delete references
+        self.callback=None
+        self._close_buffer()
+        self._done.set()
+    
     def run(self):
         # callback thread tasks
         while True:
@@ -51,17 +245,28 @@ class Consumer(threading.Thread):
                 break
 
             try: # in case user provided function throws an exception
-                self.callback(self.seis, data)
+                with tracing.span("consumer_callback", consumer=self.name):
+                    self.callback(self.seis, data)
             except Exception as e: # remove the consumer from Seis and close down gracefully
+                self._close_buffer() # release a producer blocked on the full buffer first
                 self.del_consumer()
                 self.seis=None # delete references
                 self.callback=None
-                self._buffer=None
                 raise e from None
         
         self.seis=None # delete references
         self.callback=None
+        self._close_buffer()
+    
+    def _close_buffer(self):
+        # keep the counters and release the buffer
+        if self._buffer is None:
+            return
+        self._dropped=self._buffer.dropped
+        self._max_depth=self._buffer.max_depth
+        self._buffer.close()
         self._buffer=None
+        metrics.untrack_consumer(self)
     
     def put(self, data):
         '''
@@ -72,7 +277,10 @@ class Consumer(threading.Thread):
         data : pandas.DataFrame
             contains single bar data retrieved from TradingView
         '''
-        self._buffer.put(data)
+        if (buffer := self._buffer) is not None: # None once the callback thread has closed
+            buffer.put(data)
+            if self._executor is not None:
+                self._schedule()
     
     def del_consumer(self, timeout=-1):
         '''
@@ -95,5 +303,5 @@ class Consumer(threading.Thread):
         '''
         Stop the data processing and callback thread
         '''
-        self._buffer.put(None)
+        self.put(None)
         
\ No newline at end of file
@@ -1,5 +1,12 @@
-import threading, queue, time, logging
+import threading, queue, time, logging, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor
 import tvDatafeed 
+from tvDatafeed.stream import ChartStream
+from tvDatafeed.protocol import format_symbol, interval_seconds, bars_to_df
+from tvDatafeed.aggregate import BarAggregator, CustomInterval, base_interval
+from tvDatafeed.process import ProcessPool, ProcessConsumer
+from tvDatafeed.sessions import TradingSession
+from tvDatafeed import metrics
 from datetime import datetime as dt
 from dateutil.relativedelta import relativedelta as rd
 
@@ -26,14 +33,50 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         TradingView username (default None)
     password : str, optional
         TradingView password (default None)
+    streaming : bool, optional
+        receive bars pushed over long-lived chart sessions instead
+        of polling get_hist at every interval expiry (default False)
+    max_series_per_stream : int, optional
+        maximum number of Seis streamed over one websocket 
+        connection when streaming (default 100)
+    consumer_workers : int, optional
+        call the callbacks of all consumers in a shared pool of this
+        many threads instead of one thread per consumer, None for a
+        thread per consumer (default None)
+    consumer_processes : int, optional
+        call the callbacks of all consumers in this many worker 
+        processes, Seises are sharded over the processes and the
+        callbacks must be picklable (module level) functions. 0 for
+        one process per CPU core, None to call callbacks in this
+        process (default None)
+    ws_url : str, optional
+        websocket endpoint to connect to instead of TradingView,
+        e.g. a local mock server (default None)
+    ws_factory : callable, optional
+        opens the websockets instead of websocket.create_connection,
+        e.g. to record or replay them with tvDatafeed.replay
+        (default None)
+    search_url : str, optional
+        symbol search endpoint with {} placeholders for text and
+        exchange (default None)
+    
+    Attributes
+    ----------
+    delivery_latency : dict
+        worst-case seconds from interval expiry until the new bar
+        was pushed into consumers in the last update, keyed by the
+        (interval, trading session) group; the session is None for
+        groups without a known trading session
     
     Methods
     -------
     new_seis(symbol, exchange, interval, timeout)
         Create and add new Seis to live feed
+    new_custom_seis(symbol, exchange, interval, source, origin, timeout)
+        Create and add new Seis with locally built bars of any interval
     del_seis(seis, timeout)
         Remove Seis from live feed
-    new_consumer(seis, callback, timeout)
+    new_consumer(seis, callback, timeout, maxsize, policy)
         Create a new consumer for Seis with provided callback
     del_consumer(consumer, timeout)
         Remove the consumer from Seis consumers list
@@ -46,6 +89,18 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
     class _SeisesAndTrigger(dict):
         # Internal class to contain an array of Seis objects
         # and to manage/track their interval update times
+        #
+        # Maps (interval, TradingSession or None) group key to [Seises of 
+        # the interval group, expiry datetime]. Seises of one interval are
+        # grouped by their trading session, so every group expires only 
+        # when its bars can close: at bar boundaries counted from the 
+        # session open and at the session close, never during weekends,
+        # holidays or session breaks. Groups without a known session
+        # expire every interval. Expiry datetimes are also kept in a 
+        # min-heap so the next expiry is found in O(log n), and Seises are
+        # indexed by (symbol, exchange, interval) for O(1) lookups. Heap
+        # entries of removed or rescheduled groups are left in the heap 
+        # and skipped once on top.
         def __init__(self):
             super().__init__()
             
@@ -53,6 +108,11 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             self._trigger_dt=None
             self._trigger_interrupt=threading.Event()
             
+            self._heap=[] # (expiry datetime, sequence number, interval)
+            self._sequence=itertools.count() # tie breaker for equal expiry datetimes
+            self._index={} # (symbol, exchange, interval) -> (Seis, group key)
+            self._heap_lock=threading.Lock() # wait() reads the heap without holding the live feed lock
+            
             # time periods available in TradingView 
             self._timeframes={"1S":rd(seconds=1), "5S":rd(seconds=5), "10S":rd(seconds=10), "15S":rd(seconds=15), "30S":rd(seconds=30), "45S":rd(seconds=45),
                              "1":rd(minutes=1), "3":rd(minutes=3), "5":rd(minutes=5), \
@@ -60,28 +120,53 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
                              "1H":rd(hours=1), "2H":rd(hours=2), "3H":rd(hours=3), "4H":rd(hours=4), \
                              "1D":rd(days=1), "1W":rd(weeks=1), "1M":rd(months=1)}
         
+        @staticmethod
+        def _key(seis):
+            return (seis.symbol, seis.exchange, seis.interval)
+        
+        @staticmethod
+        def group_key(seis, session=None):
+            # key of the interval group of Seis trading in session
+            return (seis.interval.value, session)
+        
+        def _schedule(self, group, expiry_dt):
+            # set expiry datetime of interval group, _heap_lock must be held
+            super().__getitem__(group)[1]=expiry_dt
+            heapq.heappush(self._heap, (expiry_dt, next(self._sequence), group))
+        
+        def _is_current(self, expiry_dt, group):
+            # True if heap entry is the current expiry of an existing interval group
+            return group in self.keys() and super().__getitem__(group)[1]==expiry_dt
+        
+        def _next_expiry(self, group, expiry_dt, now):
+            # Get the first bar close of the group after both its last 
+            # expiry and now, so bars missed while busy are skipped 
+            # instead of firing once for each of them
+            interval, session=group
+            if session is not None and (close_dt := session.next_bar_close(max(expiry_dt, now), interval)) is not None:
+                return close_dt
+            
+            expiry_dt+=self._timeframes[interval] # no session known, every interval can close a bar
+            while expiry_dt <= now:
+                expiry_dt+=self._timeframes[interval]
+            return expiry_dt
+        
         def _next_trigger_dt(self):
             # Get the next closest expiry datetime
-            if not self.values(): # if Seis list is empty
-                return None
-            
-            interval_dt_list=[]
-            for values in self.values():
-                interval_dt_list.append(values[1])
+            with self._heap_lock:
+                while self._heap:
+                    if self._is_current(self._heap[0][0], self._heap[0][2]):
+                        return self._heap[0][0]
+                    heapq.heappop(self._heap) # stale entry
             
-            interval_dt_list.sort()
-
-            return interval_dt_list[0]
+            return None # if Seis list is empty
 
         def get_seis(self, symbol, exchange, interval):
             # Returns Seis object listed in SAT based on
             # symbol, exchange and interval. If not listed then 
             # None is returned
-            for seis in self:
-                if seis.symbol==symbol and seis.exchange==exchange and seis.interval==interval:
-                    return seis
-            
-            return None
+            entry=self._index.get((symbol, exchange, interval))
+            return None if entry is None else entry[0]
             
         def wait(self):
             # Wait until next interval(s) expire
@@ -93,25 +178,34 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             self._trigger_dt=self._next_trigger_dt() # get new expiry datetime
             
             while True: # might need to restart waiting if trigger_dt changes and interrupted when waiting
-                wait_time=self._trigger_dt-dt.now() # calculate the time to next expiry
+                wait_time=None if self._trigger_dt is None else (self._trigger_dt-dt.now().astimezone()).total_seconds() # time to next expiry, bar datetimes are timezone aware
                 
-                if (interrupted := self._trigger_interrupt.wait(wait_time.total_seconds())) and self._trigger_quit: # if we received a shutdown event during waiting
+                if (interrupted := self._trigger_interrupt.wait(wait_time)) and self._trigger_quit: # if we received a shutdown event during waiting
                     return False 
                 elif not interrupted: # if not interrupted then no more waiting needed
-                    self._trigger_interrupt.clear() # in case waiting was interrupted, but not quit - reset the event flag
                     break
+                
+                # interval group was added or removed, reset the event flag and get the expiry to wait for
+                self._trigger_interrupt.clear()
+                if self._trigger_quit: # quit arrived while clearing
+                    return False
+                self._trigger_dt=self._next_trigger_dt()
 
             return True
             
         def get_expired(self):
-            # return expired intervals in a list, update expiry values
-            expired_intervals=[]
-            for interval, values in self.items():
-                if dt.now() >= values[1]:
-                    expired_intervals.append(interval)
-                    values[1]= values[1] + self._timeframes[interval] # add interval to get new expiry dt in future
+            # return expired interval group keys in a list, update expiry values
+            expired_groups=[]
+            now=dt.now().astimezone()
+            with self._heap_lock:
+                while self._heap and self._heap[0][0] <= now:
+                    expiry_dt, _, group=heapq.heappop(self._heap)
+                    if self._is_current(expiry_dt, group):
+                        expired_groups.append(group)
+                        metrics.trigger_lag_seconds.observe((now-expiry_dt).total_seconds(), interval=group[0])
+                        self._schedule(group, self._next_expiry(group, expiry_dt, now)) # next bar close in the future
             
-            return expired_intervals
+            return expired_groups
         
         def quit(self):
             # interrupt waiting and return False - breaks the loop
@@ -122,72 +216,89 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             # clear the list of interval groups and Seises
             raise NotImplementedError
         
-        def append(self, seis, update_dt=None):
-            # append new Seis instance into list
-            if self: # if empty then reset flags
+        def append(self, seis, update_dt=None, session=None):
+            # append new Seis instance into list, session is the 
+            # TradingSession of its symbol or None if not known
+            if not self: # if empty then reset flags
                 self._trigger_quit=False
                 self._trigger_interrupt.clear()
+            
+            group=self.group_key(seis, session)
+            with self._heap_lock:
+                if group in self.keys(): # interval group already exists
+                    super().__getitem__(group)[0][seis]=None
+                    self._index[self._key(seis)]=(seis, group)
+                    return
                 
-            if seis.interval.value in self.keys(): # interval group already exists
-                super().__getitem__(seis.interval.value)[0].append(seis)
-            else: # new interval group needs to be created
+                # new interval group needs to be created
                 if update_dt is None:
                     raise ValueError("Missing update datetime for new interval group")
-                else:
-                    update_dt= update_dt + self._timeframes[seis.interval.value] # change the time to next update datetime (result will be datetime object)
-                    self.__setitem__(seis.interval.value, [[seis], update_dt]) 
-                    
-                    if (trigger_dt := self._next_trigger_dt()) != self._trigger_dt: # if new interval group expiry is sooner than current expiry being waited on
-                        self._trigger_dt=trigger_dt
-                        self._trigger_interrupt.set()
+                self.__setitem__(group, [{seis: None}, None]) # Seises are kept as keys of an insertion ordered dict
+                expiry_dt=None if session is None else session.next_bar_close(update_dt, group[0]) # close of the bar released at update_dt
+                self._schedule(group, expiry_dt or update_dt + self._timeframes[group[0]])
+                self._index[self._key(seis)]=(seis, group)
+            
+            if self._trigger_dt is None or super().__getitem__(group)[1] < self._trigger_dt: # if new interval group expiry is sooner than current expiry being waited on
+                self._trigger_interrupt.set()
            
         def discard(self, seis):
             # remove Seis instance from the list
             if seis not in self:
                 raise KeyError("No such Seis in the list")
-            else:
-                super().__getitem__(seis.interval.value)[0].remove(seis)
-                if not super().__getitem__(seis.interval.value)[0]: # if interval group now empty then remove it
-                    self.pop(seis.interval.value)    
-                    
-                    if ((trigger_dt := self._next_trigger_dt()) != self._trigger_dt) and (self._trigger_quit is False): # if interval group expiry dt was being waited on and havent quit
-                        self._trigger_dt=trigger_dt
-                        self._trigger_interrupt.set()
+            
+            with self._heap_lock:
+                _, group=self._index.pop(self._key(seis))
+                seises=super().__getitem__(group)[0]
+                del seises[seis]
+                if seises: 
+                    return
+                self.pop(group) # interval group now empty, its heap entry is skipped from now on
+            
+            if self._trigger_quit is False: # interval group expiry dt might have been waited on
+                self._trigger_interrupt.set()
             
         def intervals(self):
-            # return list of interval groups
+            # return list of interval group keys
             return self.keys()
         
-        def __getitem__(self, interval_key):
-            return super().__getitem__(interval_key)[0]
+        def __getitem__(self, group):
+            # live view of the Seises of the interval group, copy it before 
+            # adding or removing Seises while iterating
+            return super().__getitem__(group)[0].keys()
         
         def __iter__(self):
-            seises_list=[]
-            
-            for seis_list in super().values():
-                seises_list+=seis_list[0]
-            
-            return seises_list.__iter__()
+            return iter([seis for seis, _ in self._index.values()]) # copy, Seises may be discarded while iterating
         
         def __contains__(self, seis):
-            for seis_list in super().values():
-                if seis in seis_list[0]:
-                    return True
-            
-            return False
+            try:
+                entry=self._index.get(self._key(seis))
+            except AttributeError: # not a Seis
+                return False
+            return entry is not None and entry[0]==seis
     
-    def __init__(self, username=None, password=None):
-        super().__init__(username, password)
+    def __init__(self, username=None, password=None, streaming=False, max_series_per_stream=100, consumer_workers=None, consumer_processes=None, ws_url=None, ws_factory=None, search_url=None):
+        super().__init__(username, password, ws_url=ws_url, ws_factory=ws_factory, search_url=search_url)
         
         self._lock=threading.Lock()
         self._main_thread = None  
         self._sat = self._SeisesAndTrigger() 
+        self._streaming=streaming
+        self._max_series_per_stream=max_series_per_stream
+        self._streams=[] # ChartStream instances, only used when streaming
+        self.delivery_latency={} # (interval, session) group -> seconds from expiry to delivery of the last bar in the group
+        self._executor=ThreadPoolExecutor(max_workers=consumer_workers, thread_name_prefix="consumer") if consumer_workers else None # shared by all consumers
+        self._consumer_processes=consumer_processes
+        self._process_pool=None # ProcessPool, started with the first consumer when consumer_processes is set
+        self._custom={} # (symbol, exchange, interval) -> [Seis, function closing its data feed] of custom interval Seises
     
     def _args_invalid(self, symbol, exchange):
         # check if provided arguemnts are valid and that such
         # symbol, exchange and interval set exists in TradingView
         # 
         # returns True if does not exist, False otherwise
+        if self.symbol_cache.get_symbol(symbol, exchange) is not None: # known symbol, no need to search
+            return False
+        
         result_list=self.search_symbol(symbol, exchange)
         
         if not result_list: # if does not exists then empty
@@ -245,6 +356,17 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         new_seis=tvDatafeed.Seis(symbol, exchange, interval)
         
+        # requests are made before taking the lock so the main loop and other callers are not stalled.
+        # When polling, the group of the Seis depends on its trading session (None if not known, then 
+        # the group expires every interval), taken from the symbol info that get_hist caches
+        session=None
+        ticker_data=None
+        if not self._streaming: # bars are pushed by the server when streaming, no need to know when they close
+            session=TradingSession.from_symbol_info(self.symbol_cache.get_resolved(format_symbol(symbol, exchange, None)))
+            if session is None or self._sat.group_key(new_seis, session) not in self._sat.intervals():
+                ticker_data=super().get_hist(symbol, exchange, interval, n_bars=2) # get ticker data bar for this symbol from TradingView
+                session=TradingSession.from_symbol_info(self.symbol_cache.get_resolved(format_symbol(symbol, exchange, None)))
+        
         if self._lock.acquire(timeout=timeout) is False:
             return False
         
@@ -255,23 +377,228 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             return self._sat.get_seis(symbol, exchange, interval)
         
         # add to interval group - if interval group does not exists then create one
-        interval_key=new_seis.interval.value
-        if interval_key not in self._sat.intervals():
-            # get last bar update datetime value for the Seis
-            ticker_data=super().get_hist(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2) # get ticker data bar for this symbol from TradingView
-            update_dt=ticker_data.index.to_pydatetime()[0] # extract datetime of when this bar was produced/released
+        if self._sat.group_key(new_seis, session) not in self._sat.intervals():
+            if self._streaming: # bars are pushed by the server, no need to know when the last one was released
+                update_dt=dt.now().astimezone()
+            else:
+                if ticker_data is None: # group was removed since it was checked
+                    ticker_data=super().get_hist(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2)
+                update_dt=ticker_data.index.to_pydatetime()[0] # extract datetime of when this bar was produced/released
             # append this seis into SAT
-            self._sat.append(new_seis, update_dt)
+            self._sat.append(new_seis, update_dt, session)
         else:
-            self._sat.append(new_seis)
+            self._sat.append(new_seis, session=session)
+        
+        if self._streaming:
+            self._stream_add(new_seis)
         
         self._lock.release()
         
         if self._main_thread is None: # if main thread is not running then start 
-            self._main_thread = threading.Thread(name="main_loop", target=self._main_loop)
+            self._main_thread = threading.Thread(name="main_loop", target=self._stream_loop if self._streaming else self._main_loop)
             self._main_thread.start() 
         
         return new_seis
+    
+    def new_custom_seis(self, symbol, exchange, interval, source=None, origin=0, timeout=-1):
+        '''
+        Create and add new Seis with a custom interval to live feed
+        
+        Bars of custom intervals such as 7 seconds, 2 minutes or 90 
+        minutes are not produced by TradingView. They are built locally
+        by a BarAggregator from closed bars of a finer interval, which 
+        are received through a regular Seis, or from real-time quote 
+        updates, so no extra requests are made. Completed bars are 
+        passed to the consumers of the returned Seis like any other bar.
+        
+        Parameters
+        ----------
+        symbol : str 
+            ticker string for symbol
+        exchange : str
+            exchange where symbol is listed
+        interval : str or CustomInterval
+            custom chart interval, e.g. "7S", "2", "90" or "6H"
+        source : tvDatafeed.Interval or str, optional
+            interval of the bars to build from or "quotes" to build
+            from quote updates, default is the longest interval which
+            divides the custom interval evenly
+        origin : int, optional
+            unix time the bars are aligned to, default is 0 which 
+            aligns bars to the clock
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        ----------
+        Seis
+            If such Seis already existed then that will be returned, 
+            otherwise new will be created. If timeout was specified 
+            and expired then False will be returned.
+        
+        Raises
+        ----------
+        ValueError
+            If provided symbol and exchange combination is not listed
+            on TradingView, source is not a known interval or the 
+            interval can not be built from source
+        '''
+        if not isinstance(interval, CustomInterval):
+            interval=CustomInterval(interval)
+        if source is None:
+            source=base_interval(interval.seconds, tvDatafeed.Interval)
+        elif source!="quotes":
+            try:
+                source=tvDatafeed.Interval(source) # also accepts interval values such as "1" or "1H"
+            except ValueError:
+                raise ValueError(f"Unknown source {source!r}, expected a tvDatafeed.Interval or \"quotes\"") from None
+            if interval.seconds % interval_seconds(source.value):
+                raise ValueError(f"Interval {interval.value} is not a multiple of {source.value}")
+        
+        if self._args_invalid(symbol, exchange):
+            raise ValueError("Provided symbol and exchange combination is not listed in TradingView")
+        
+        key=(symbol, exchange, interval.value)
+        if key in self._custom:
+            return self._custom[key][0]
+        
+        new_seis=tvDatafeed.Seis(symbol, exchange, interval)
+        new_seis.tvdatafeed=self
+        aggregator=BarAggregator(interval.seconds, origin)
+        
+        # data feed is set up without holding the lock as it adds Seises and consumers
+        if source=="quotes":
+            close=self._custom_quote_feed(new_seis, aggregator)
+        else:
+            close=self._custom_bar_feed(new_seis, aggregator, source, timeout)
+            if close is False:
+                return False
+        
+        if self._lock.acquire(timeout=timeout) is False:
+            close()
+            return False
+        if key in self._custom: # created by another thread in the meantime
+            self._lock.release()
+            close()
+            return self._custom[key][0]
+        self._custom[key]=[new_seis, close]
+        self._lock.release()
+        
+        return new_seis
+    
+    def _custom_bar_feed(self, seis, aggregator, source, timeout):
+        # Feed closed bars of source interval into aggregator through a 
+        # consumer of a regular Seis, returns function to close the feed
+        base_created=self._sat.get_seis(seis.symbol, seis.exchange, source) is None
+        if (base_seis := self.new_seis(seis.symbol, seis.exchange, source, timeout)) is False:
+            return False
+        duration=interval_seconds(source.value)
+        
+        def feed(base, data):
+            row=data.iloc[0]
+            completed=aggregator.add_bar(data.index[0].timestamp(), row["open"], row["high"], row["low"], row["close"], row["volume"], duration=duration)
+            if completed is not None:
+                self._push_custom(seis, completed, data.index.tz)
+        
+        feed.__name__=f"aggregate_{seis.interval.value}" # used in the consumer thread name
+        if (consumer := self._add_consumer(base_seis, feed, timeout, in_process=True)) is False: # closure can not be sent to a worker process
+            return False
+        
+        def close():
+            with self._lock: # the consumer is already gone if the main loop shut down the live feed
+                if consumer in base_seis.get_consumers():
+                    base_seis.pop_consumer(consumer)
+                    consumer.stop()
+            try:
+                if base_created and not base_seis.get_consumers(): # base Seis was only used for this feed
+                    base_seis.del_seis()
+            except (NameError, ValueError): # live feed was already shut down
+                pass
+        
+        return close
+    
+    def _custom_quote_feed(self, seis, aggregator):
+        # Feed every quote update into aggregator in a separate thread, 
+        # bars are completed when their end time passes, returns function 
+        # to close the feed. Subscriptions coalesce updates, so prices are 
+        # taken from a quote stream listener which sees all of them; the
+        # subscription keeps the symbol in the quote session
+        symbol=format_symbol(seis.symbol, seis.exchange, None)
+        subscription=self.subscribe_quotes([symbol], ["lp", "lp_time", "volume"])
+        stream=self._quote_stream
+        ticks=queue.SimpleQueue() # (time, price, volume) of every update, None to stop
+        tz=None if self.timezone=="exchange" else self.timezone # exchange timezone is not known without a chart session
+        
+        def listener(updated, quote, changed):
+            if updated==symbol and "lp" in changed: # called in the stream thread, only hand the update over
+                ticks.put((quote.get("lp_time") or time.time(), changed["lp"], quote.get("volume")))
+        
+        def run():
+            while True:
+                wait=aggregator.bar[0]+aggregator.seconds-time.time() if aggregator.bar is not None else 1
+                try:
+                    tick=ticks.get(timeout=max(wait, 0))
+                except queue.Empty: # no updates until the end of the bar
+                    completed=aggregator.flush(time.time())
+                else:
+                    if tick is None:
+                        break
+                    completed=aggregator.add_quote(*tick)
+                
+                if completed is not None:
+                    self._push_custom(seis, completed, tz)
+        
+        stream.add_listener(listener)
+        threading.Thread(name=f"aggregate_{seis.symbol}_{seis.exchange}_{seis.interval.value}", target=run, daemon=True).start()
+        
+        def close():
+            stream.remove_listener(listener)
+            subscription.close()
+            ticks.put(None)
+        
+        return close
+    
+    def _push_custom(self, seis, values, tz):
+        # push completed custom interval bar into all consumers of the Seis
+        data=bars_to_df({0: values}, format_symbol(seis.symbol, seis.exchange, None), tz)
+        with self._lock:
+            consumers=list(seis.get_consumers()) if self._is_custom(seis) and seis.is_new_data(data) else []
+        for consumer in consumers: # outside the lock, put blocks while a "block" policy buffer is full
+            consumer.put(data)
+    
+    def _is_custom(self, seis):
+        # True if seis is a custom interval Seis listed in this live feed
+        entry=self._custom.get((seis.symbol, seis.exchange, seis.interval.value))
+        return entry is not None and entry[0] is seis
+    
+    def _del_custom_seis(self, seis, timeout):
+        # remove custom interval Seis and close its data feed
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        for consumer in seis.get_consumers():
+            consumer.put(None) # None signals closing for the callback thread
+        
+        _, close=self._custom.pop((seis.symbol, seis.exchange, seis.interval.value))
+        del seis.tvdatafeed
+        self._lock.release()
+        
+        close()
+        
+        return True
+    
+    def _shutdown_custom(self):
+        # close down all custom interval Seises and their consumers
+        with self._lock:
+            entries=list(self._custom.values())
+            self._custom.clear()
+            for seis, _ in entries:
+                for consumer in seis.get_consumers():
+                    seis.pop_consumer(consumer)
+                    consumer.stop()
+        
+        for _, close in entries:
+            close()
         
     def del_seis(self, seis, timeout=-1):
         '''
@@ -295,6 +622,9 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         ValueError
             If Seis does not exist in live feed (has not been added)
         '''
+        if self._is_custom(seis):
+            return self._del_custom_seis(seis, timeout)
+        
         if seis not in self._sat:
             raise ValueError("Seis is not listed")
         
@@ -308,6 +638,9 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         self._sat.discard(seis)
         del seis.tvdatafeed
         
+        if self._streaming:
+            self._stream_remove(seis)
+        
         # if SAT list empty now then close down main loop
         if not self._sat:
             self._sat.quit()
@@ -316,7 +649,7 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         return True
     
-    def new_consumer(self, seis, callback, timeout=-1):
+    def new_consumer(self, seis, callback, timeout=-1, maxsize=0, policy="block"):
         '''
         Create a new Consumer for this Seis with provided callback
         
@@ -329,6 +662,15 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         timeout : int, optional
             maximum time to wait in seconds for return, default
             is -1 (blocking)
+        maxsize : int, optional
+            maximum number of bars waiting for the callback, 0 for
+            unbounded (default 0)
+        policy : str, optional
+            what to do with a new bar when maxsize bars are waiting:
+            "block", "drop_oldest", "drop_newest" or "coalesce" (keep
+            only the latest), see Consumer (default "block"). Note that
+            "block" delays all other consumers until there is room.
+            Not used when consumers run in worker processes
         
         Returns
         ----------
@@ -342,13 +684,24 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         ValueError
             If Seis does not exist in live feed (has not been added)
         '''
-        if seis not in self._sat:
+        if seis not in self._sat and not self._is_custom(seis):
             raise ValueError("Seis is not listed")
         
-        # new consumer to hold callback related info
-        consumer=tvDatafeed.Consumer(seis, callback)
+        return self._add_consumer(seis, callback, timeout, maxsize, policy, in_process=self._consumer_processes is None)
+    
+    def _add_consumer(self, seis, callback, timeout=-1, maxsize=0, policy="block", in_process=True):
+        # create and start a consumer running in this process or in a worker process
         if self._lock.acquire(timeout=timeout) is False:
             return False
+        
+        # new consumer to hold callback related info
+        if in_process:
+            consumer=tvDatafeed.Consumer(seis, callback, maxsize, policy, self._executor)
+        else:
+            if self._process_pool is None:
+                self._process_pool=ProcessPool(self._consumer_processes or None)
+            consumer=ProcessConsumer(seis, callback, self._process_pool)
+        
         seis.add_consumer(consumer)     
         consumer.start()  
         self._lock.release()
@@ -391,34 +744,134 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         # case first all the consumer threads are closed and then this 
         # main thread is closed. Once wait() method returns then we
         # get a list of intervals which were under monitor and have 
-        # expired. We loop through every Seis which has that 
-        # interval and retrieve new data and push it into all the 
-        # consumer threads that are added for that particular Seis.
+        # expired. For every such interval we retrieve new data of all
+        # its Seises in one batch without holding the lock and push it
+        # into all the consumer threads added for each Seis.
         #
         # If fail to retrieve data then retry up to RETRY_LIMIT times 
         # and if still fail then log the event (critical) and close
         # down the consumer threads and the main loop itself.
         
         while self._sat.wait(): # waits until soonest expiry and returns True; returns False if closed                     
+            triggered=time.monotonic()
+            with self._lock: # only hold the lock for taking a snapshot, fetching is done without it
+                expired={group: list(self._sat[group]) for group in self._sat.get_expired()} # interval groups that have expired and their Seises
+            
+            for group, seises in expired.items():
+                if not self._fetch_group(group, seises, triggered): # limit reached, print an error into logs and gracefully shut down the main loop and consumer threads
+                    with self._lock:
+                        self._sat.quit()
+                    logger.warning("Failed to retrieve new data from TradingView")
+                    break
+        
+        self._shutdown_consumers()
+    
+    def _fetch_group(self, group, seises, triggered):
+        # Fetch new data bar of every Seis in an expired interval group
+        #
+        # All Seises are requested at once over a single websocket with
+        # get_hist_many, so the group takes about as long as its slowest
+        # symbol. Seises for which TradingView did not yet have the new bar
+        # are requested again, up to RETRY_LIMIT times. New bars are pushed
+        # into the consumers as soon as the batch returns. The time from
+        # the interval expiry to the last delivery is stored in 
+        # delivery_latency. Returns False if retry limit was reached.
+        interval, session=group
+        pending=seises
+        for _ in range(0, RETRY_LIMIT): # re-try maximum of RETRY_LIMIT times
+            try:
+                results=super().get_hist_many([(seis.symbol, seis.exchange) for seis in pending], interval=interval, n_bars=2) # get_hist returns bars starting with currently open so need to read 2 to get first closed
+            except Exception as e: # whole batch failed, all its Seises are retried
+                logger.warning(f"Failed to fetch bars of interval {interval}: {e}")
+                results={}
+            
+            retry=[]
+            deliveries=[] # (consumer, data) pairs, put after releasing the lock
             with self._lock:
-                for interval in self._sat.get_expired(): # returns a list of intervals that have expired
-                    for seis in self._sat[interval]: # go through all the seises in this interval group 
-                        for _ in range(0, RETRY_LIMIT): # re-try maximum of RETRY_LIMIT times
-                            data=super().get_hist(seis.symbol, seis.exchange, interval=seis.interval, n_bars=2) # get_hist returns bars starting with currently open so need to read 2 to get first closed
-                            if data is not None: # check that we did get any data
-                                if seis.is_new_data(data): # check that it is new data not old 
-                                    data=data.drop(labels=data.index[1]) # drop the row (last) which has yet un-closed bar data 
-                                    break
-                            
-                            time.sleep(0.1) # little time before retrying
-                        else: # limit reached, print an error into logs and gracefully shut down the main loop and consumer threads
-                            self._sat.quit()
-                            logger.warning("Failed to retrieve new data from TradingView")
-                        
+                for seis in pending:
+                    if seis not in self._sat: # removed while fetching
+                        continue
+                    
+                    data=results.get(format_symbol(seis.symbol, seis.exchange, None))
+                    if data is not None and len(data) < 2: # e.g. newly listed symbol, there is no closed bar yet
+                        logger.debug(f"Only {len(data)} bar received for {seis}, skipping it")
+                        continue
+                    if data is not None and seis.is_new_data(data): # check that we did get new data, not old
+                        data=data.drop(labels=data.index[1]) # drop the row (last) which has yet un-closed bar data 
                         # push new data into all consumers that are expecting data for this Seis
-                        for consumer in seis.get_consumers():
-                            consumer.put(data)
+                        deliveries.extend((consumer, data) for consumer in seis.get_consumers())
+                    else:
+                        retry.append(seis)
+            
+            # a full "block" policy buffer makes put wait, holding the lock there would stall 
+            # the other consumers and deadlock a callback that raises and removes its consumer
+            for consumer, data in deliveries:
+                consumer.put(data)
+            
+            if not (pending := retry):
+                break
+            
+            time.sleep(0.1) # little time before retrying
+        else:
+            return False
         
+        latency=self.delivery_latency[group]=time.monotonic()-triggered
+        session_label="" if session is None else f"{session.session} {session.timezone}"
+        metrics.group_fetch_seconds.observe(latency, interval=interval, session=session_label)
+        logger.debug(f"Delivered {len(seises)} bars of interval {interval} and session {session} in {latency:.3f}s")
+        
+        return True
+    
+    def _stream_loop(self):
+        # Main thread in streaming mode
+        #
+        # Bars are pushed into consumers by the ChartStream threads as
+        # soon as the server reports a new bar, so this thread only waits
+        # until the user removes all Seises or calls del_tvdatafeed() and
+        # then closes down the streams and the consumer threads.
+        while self._sat.wait():
+            self._sat.get_expired() # nothing to fetch, only move the expiry datetimes forward
+        
+        for stream in self._streams:
+            stream.stop()
+        self._streams=[]
+        
+        self._shutdown_consumers()
+    
+    def _stream_add(self, seis):
+        # Add Seis to a ChartStream which has room for it, lock must be held
+        for stream in self._streams:
+            if len(stream) < self._max_series_per_stream:
+                break
+        else: # all streams full, open a new connection
+            stream=ChartStream(self._open_connection, self._push_bar, timezone=self.timezone)
+            self._streams.append(stream)
+            stream.start()
+        
+        stream.add(seis)
+    
+    def _stream_remove(self, seis):
+        # Remove Seis from its ChartStream, lock must be held
+        for stream in self._streams:
+            if seis in stream:
+                stream.remove(seis)
+                if not len(stream): # close the connection, do not join as the stream thread might wait for the lock
+                    stream.stop(timeout=0)
+                    self._streams.remove(stream)
+                break
+    
+    def _push_bar(self, seis, data):
+        # ChartStream callback, push closed bar into all consumers of the Seis
+        with self._lock:
+            if not (seis in self._sat and seis.is_new_data(data)):
+                return
+            consumers=list(seis.get_consumers())
+        for consumer in consumers: # outside the lock, put blocks while a "block" policy buffer is full
+            consumer.put(data)
+        bar_close=data.index[0].timestamp()+interval_seconds(seis.interval.value)
+        metrics.stream_delay_seconds.observe(time.time()-bar_close, interval=seis.interval.value)
+    
+    def _shutdown_consumers(self):
         # send a shutdown signal to all the callback threads
         with self._lock:
             for seis in self._sat:
@@ -480,11 +933,26 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         # wait until all threads are closed down - they are closed in the main_loop
         if self._main_thread is not None:
             self._main_thread.join() 
+        
+        self._shutdown_custom() # custom Seises fed by quotes do not depend on the main loop
+        
+        if self._process_pool is not None: # all bars were sent, let the workers finish them
+            self._process_pool.close()
+            self._process_pool=None
     
     def del_tvdatafeed(self): 
         '''
         Stop and delete this object
+        
+        Stops the main loop and consumers, then waits for the shared 
+        consumer threads and closes the pooled websocket and HTTP 
+        connections.
         '''
-        if self._main_thread is not None:
+        if self._main_thread is not None or self._custom:
             self.__del__()  
         
+        if self._executor is not None: # consumers were stopped, let the callbacks still running finish
+            self._executor.shutdown(wait=True)
+            self._executor=None
+        self.close()
+        
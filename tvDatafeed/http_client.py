@@ -0,0 +1,56 @@
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Pooled HTTP client used for all TradingView REST calls
+
+    Wraps a requests.Session so TCP/TLS connections are kept alive and
+    reused between calls instead of being opened for every request.
+    Responses are transparently decompressed (gzip/deflate) and idempotent
+    requests are retried with exponential backoff on connection errors and
+    429/5xx responses.
+
+    Args:
+        pool_size (int, optional): max connections kept open per host. Defaults to 10.
+        retries (int, optional): max retries of a request. Defaults to 3.
+        backoff_factor (float, optional): backoff between retries is backoff_factor * 2 ** (retry - 1)
+            seconds. Defaults to 0.5.
+        timeout (float, optional): connect and read timeout in seconds. Defaults to 10.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, retries=3, backoff_factor=0.5, timeout=10):
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # login POST is not retried
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -1,20 +1,18 @@
-from selenium import webdriver
 import time
-import datetime
 import enum
 import json
 import logging
-import random
-import re
-import string
 import pandas as pd
+from dateutil.tz import tzlocal
 from websocket import create_connection
-import requests
-import json
-from bs4 import BeautifulSoup
 from .token_manager import TokenManager
-from base.models import ProjectSettings
-from decouple import config
+from .pool import ConnectionPool, PooledConnection
+from .cache import BarCache
+from .symbols import symbol_cache
+from .http_client import HttpClient
+from .quotes import QuoteStream
+from .supervisor import ConnectionSupervisor
+from . import metrics, protocol, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +40,14 @@ class Interval(enum.Enum):
 
 
 class TvDatafeed:
-    __sign_in_url = 'https://www.tradingview.com/accounts/signin/'
-    __search_url = 'https://symbol-search.tradingview.com/symbol_search/v3/?text={}&hl=1&exchange={}&lang=en&search_type=undefined&domain=production&sort_by_country=IN'
-    __ws_headers = json.dumps({"Origin": "https://data.tradingview.com"})
-    __signin_headers = {'Referer': 'https://www.tradingview.com'}
+    __ws_url = protocol.WS_URL
+    __sign_in_url = protocol.SIGN_IN_URL
+    __search_url = protocol.SEARCH_URL
+    __ws_headers = json.dumps({"Origin": protocol.WS_ORIGIN})
+    __signin_headers = protocol.SIGN_IN_HEADERS
     __ws_timeout = 5
+    __max_bars_per_request = 5000
+    __quote_fields = protocol.QUOTE_FIELDS
     
     # Constants for token verification
 
@@ -63,6 +64,16 @@ class TvDatafeed:
         username: str = None,
         password: str = None,
         token_file: str = "tvdatafeed_token.json",
+        pool_size: int = 2,
+        pool_idle_timeout: float = 60,
+        timezone: str = None,
+        cache_dir: str = None,
+        cache_max_bytes: int = None,
+        http_pool_size: int = 10,
+        http_retries: int = 3,
+        ws_url: str = None,
+        ws_factory=None,
+        search_url: str = None,
     ) -> None:
         """Create TvDatafeed object
 
@@ -70,12 +81,39 @@ class TvDatafeed:
             username (str, optional): tradingview username. Defaults to None.
             password (str, optional): tradingview password. Defaults to None.
             token_file (str, optional): path to token file. Defaults to "tvdatafeed_token.json".
+            pool_size (int, optional): maximum number of authenticated websocket connections kept
+                open and reused between get_hist calls. Defaults to 2.
+            pool_idle_timeout (float, optional): seconds after which an unused pooled connection
+                is closed. Defaults to 60.
+            timezone (str, optional): timezone of the returned datetime index, "exchange" for the
+                timezone of the symbol's exchange. Defaults to None (local timezone).
+            cache_dir (str, optional): directory of the on-disk bar cache, get_hist then only downloads
+                bars newer than the cached ones. Requires pyarrow. Defaults to None (no cache).
+            cache_max_bytes (int, optional): size limit of the bar cache, least recently used series
+                are evicted above it. Defaults to None (unlimited).
+            http_pool_size (int, optional): max keep-alive connections per host used for REST calls. Defaults to 10.
+            http_retries (int, optional): max retries of REST calls with exponential backoff. Defaults to 3.
+            ws_url (str, optional): websocket endpoint to connect to instead of TradingView, e.g. the
+                url of a tvDatafeed.mock_server.MockTradingViewServer. Defaults to None.
+            ws_factory (callable, optional): opens the websockets instead of websocket.create_connection,
+                e.g. create_connection of a tvDatafeed.replay.FrameRecorder or FrameReplayer. Defaults to None.
+            search_url (str, optional): symbol search endpoint with {} placeholders for text and exchange,
+                e.g. MockTradingViewServer.search_url. Defaults to None.
         """
 
         self.ws_debug = False
+        if ws_url is not None:
+            self.__ws_url = ws_url
+        self._ws_factory = ws_factory or create_connection
+        if search_url is not None:
+            self.__search_url = search_url
+        self.symbol_cache = symbol_cache
+        self.metrics = metrics.registry  # process wide, see tvDatafeed.metrics
+        self.timezone = timezone
         self.username = username
         self.password = password
         self.token_manager = TokenManager(token_file)
+        self._http = HttpClient(pool_size=http_pool_size, retries=http_retries)
 
         self.token = self.__auth_with_token_management(username, password)
 
@@ -88,6 +126,25 @@ class TvDatafeed:
         self.ws = None
         self.session = self.__generate_session()
         self.chart_session = self.__generate_chart_session()
+        self._pool = ConnectionPool(
+            self.__open_pooled_connection, max_size=pool_size, idle_timeout=pool_idle_timeout
+        )
+        self._cache = BarCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+        self._quote_stream = None  # created by the first subscribe_quotes call
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close all pooled websocket and HTTP connections"""
+        if self._quote_stream is not None:
+            self._quote_stream.stop()
+            self._quote_stream = None
+        self._pool.close()
+        self._http.close()
 
     def __auth_with_token_management(self, username, password):
         """Authentication with token management"""
@@ -127,8 +184,8 @@ class TvDatafeed:
             logger.debug("We are starting to check the token validity...")
             
             # Create a test connection to verify the token
-            test_ws = create_connection(
-                "wss://data.tradingview.com/socket.io/websocket", 
+            test_ws = self._ws_factory(
+                self.__ws_url, 
                 headers=self.__ws_headers, 
                 timeout=self.__token_validation_timeout
             )
@@ -200,13 +257,21 @@ class TvDatafeed:
                     "password": password,
                     "remember": "on"}
             try:
-                response = requests.post(
+                response = self._http.post(
                     url=self.__sign_in_url, data=data, headers=self.__signin_headers)
                 token = response.json()['user']['auth_token']
                 # print(token)
             except Exception as e:
                 logger.error('Captha required, please singin manually')
                 token = None
+
+                try:
+                    # only needed for the browser login, install with pip install tvdatafeed[browser]
+                    from selenium import webdriver
+                    from bs4 import BeautifulSoup
+                except ImportError:
+                    logger.error("Browser login requires selenium and beautifulsoup4, install them with 'pip install tvdatafeed[browser]'")
+                    return None
                 
                 try:
 
@@ -270,109 +335,63 @@ class TvDatafeed:
             print("token retrived successfully")
             return token
 
-    def __create_connection(self):
-        logging.debug("creating websocket connection")
-        self.ws = create_connection(
-            "wss://data.tradingview.com/socket.io/websocket", headers=self.__ws_headers, timeout=self.__ws_timeout
-        )
-
-    @staticmethod
-    def __filter_raw_message(text):
-        try:
-            found = re.search('"m":"(.+?)",', text).group(1)
-            found2 = re.search('"p":(.+?"}"])}', text).group(1)
-
-            return found, found2
-        except AttributeError:
-            logger.error("error in filter_raw_message")
-
-    @staticmethod
-    def __generate_session():
-        stringLength = 12
-        letters = string.ascii_lowercase
-        random_string = "".join(random.choice(letters)
-                                for i in range(stringLength))
-        return "qs_" + random_string
-
-    @staticmethod
-    def __generate_chart_session():
-        stringLength = 12
-        letters = string.ascii_lowercase
-        random_string = "".join(random.choice(letters)
-                                for i in range(stringLength))
-        return "cs_" + random_string
-
-    @staticmethod
-    def __prepend_header(st):
-        return "~m~" + str(len(st)) + "~m~" + st
-
-    @staticmethod
-    def __construct_message(func, param_list):
-        return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
+    def _open_connection(self):
+        """Open a new authenticated websocket connection outside of the pool
 
-    def __create_message(self, func, paramList):
-        return self.__prepend_header(self.__construct_message(func, paramList))
+        Used for long-lived streaming sessions, the caller is responsible
+        for closing it.
 
-    def __send_message(self, func, args):
+        Returns:
+            PooledConnection: connection with chart and quote sessions created
+        """
+        return self.__open_pooled_connection()
+
+    def __open_pooled_connection(self):
+        # open a new websocket and do the one time session setup, used as pool factory
+        logger.debug("creating pooled websocket connection")
+        start = time.perf_counter()
+        with tracing.span("connect"):
+            ws = self._ws_factory(
+                self.__ws_url, headers=self.__ws_headers, timeout=self.__ws_timeout
+            )
+        conn = PooledConnection(
+            ws,
+            token=self.token,
+            chart_session=self.__generate_chart_session(),
+            quote_session=self.__generate_session(),
+        )
+        try:
+            with tracing.span("auth"):
+                self.__send_message("set_auth_token", [self.token], ws)
+                self.__send_message("chart_create_session", [conn.chart_session, ""], ws)
+                self.__send_message("quote_create_session", [conn.quote_session], ws)
+                self.__send_message("quote_set_fields", [conn.quote_session] + self.__quote_fields, ws)
+        except Exception:
+            conn.close()
+            raise
+        metrics.connect_seconds.observe(time.perf_counter() - start)
+        return conn
+
+    __generate_session = staticmethod(protocol.generate_session)
+    __generate_chart_session = staticmethod(protocol.generate_chart_session)
+    __prepend_header = staticmethod(protocol.prepend_header)
+    __construct_message = staticmethod(protocol.construct_message)
+    __create_message = staticmethod(protocol.create_message)
+
+    def __index_timezone(self, symbol_info):
+        # timezone for the datetime index of returned dataframes
+        return protocol.index_timezone(self.timezone, symbol_info)
+
+    def __send_message(self, func, args, ws=None):
         m = self.__create_message(func, args)
         if self.ws_debug:
             print(m)
-        self.ws.send(m)
+        (ws or self.ws).send(m)
 
-    @staticmethod
-    def __create_df(raw_data, symbol):
-        try:
-            out = re.search(r'"s":\[(.+?)\}\]', raw_data).group(1)
-            x = out.split(',{"')
-            data = list()
-            volume_data = True
-
-            for xi in x:
-                xi = re.split(r"\[|:|,|\]", xi)
-                ts = datetime.datetime.fromtimestamp(float(xi[4]))
-
-                row = [ts]
-
-                for i in range(5, 10):
-
-                    # skip converting volume data if does not exists
-                    if not volume_data and i == 9:
-                        row.append(0.0)
-                        continue
-                    try:
-                        row.append(float(xi[i]))
-
-                    except ValueError:
-                        volume_data = False
-                        row.append(0.0)
-                        logger.debug('no volume data')
-
-                data.append(row)
-
-            data = pd.DataFrame(
-                data, columns=["datetime", "open",
-                               "high", "low", "close", "volume"]
-            ).set_index("datetime")
-            data.insert(0, "symbol", value=symbol)
-            return data
-        except AttributeError:
-            logger.error("no data, please check the exchange and symbol")
-
-    @staticmethod
-    def __format_symbol(symbol, exchange, contract: int = None):
-
-        if ":" in symbol:
-            pass
-        elif contract is None:
-            symbol = f"{exchange}:{symbol}"
-
-        elif isinstance(contract, int):
-            symbol = f"{exchange}:{symbol}{contract}!"
-
-        else:
-            raise ValueError("not a valid contract")
-
-        return symbol
+    __create_df = staticmethod(protocol.create_df)
+    __bars_to_df = staticmethod(protocol.bars_to_df)
+    __resolve_symbol_param = staticmethod(protocol.resolve_symbol_param)
+    __format_symbol = staticmethod(protocol.format_symbol)
 
     def get_hist(
         self,
@@ -382,6 +401,7 @@ class TvDatafeed:
         n_bars: int = 10,
         fut_contract: int = None,
         extended_session: bool = False,
+        use_cache: bool = True,
         _retry_count: int = 0,
     ) -> pd.DataFrame:
         """get historical data
@@ -390,15 +410,38 @@ class TvDatafeed:
             symbol (str): symbol name
             exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
             interval (str, optional): chart interval. Defaults to 'D'.
-            n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
+            n_bars (int, optional): no of bars to download, more than 5000 bars are downloaded in
+                chunks with get_hist_range. Defaults to 10.
             fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
             extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            use_cache (bool, optional): use the bar cache if one is configured. Defaults to True.
             _retry_count (int, optional): internal parameter for retry logic. Defaults to 0.
 
         Returns:
             pd.Dataframe: dataframe with sohlcv as columns
         """
+        with tracing.span(
+            "get_hist",
+            symbol=symbol,
+            exchange=exchange,
+            interval=getattr(interval, "value", interval),
+            n_bars=n_bars,
+            retry=_retry_count,
+        ) as span:
+            data = self.__fetch_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, use_cache, _retry_count)
+            span.set_attribute("bars", 0 if data is None else len(data))
+            return data
+
+    def __fetch_hist(self, symbol, exchange, interval, n_bars, fut_contract, extended_session, use_cache, _retry_count,
+                     _reconnected=False):
+        # get_hist without the span, retries call get_hist again so they are reported as nested spans
         logger.debug(f"get_hist called: symbol={symbol}, exchange={exchange}, interval={interval}, n_bars={n_bars}, retry_count={_retry_count}")
+
+        if use_cache and self._cache is not None and _retry_count == 0:
+            return self.__get_hist_cached(symbol, exchange, interval, n_bars, fut_contract, extended_session)
+
+        if n_bars > self.__max_bars_per_request:
+            return self.__fetch_hist_range(symbol, exchange, interval, n_bars, fut_contract, extended_session, _retry_count)
         
         # Сохраняем оригинальный interval для рекурсивных вызовов
         original_interval = interval
@@ -415,97 +458,116 @@ class TvDatafeed:
             interval_str = interval
             logger.debug(f"Interval is already a string: {interval_str}")
 
+        conn = None
+        reusable = False
+        received = 0
         try:
-            self.__create_connection()
+            with tracing.span("acquire"):
+                conn = self._pool.acquire(token=self.token)
+            symbol_id, series_id = conn.next_series_ids()
 
-            self.__send_message("set_auth_token", [self.token])
-            self.__send_message("chart_create_session", [self.chart_session, ""])
-            self.__send_message("quote_create_session", [self.session])
             self.__send_message(
-                "quote_set_fields",
-                [
-                    self.session,
-                    "ch",
-                    "chp",
-                    "current_session",
-                    "description",
-                    "local_description",
-                    "language",
-                    "exchange",
-                    "fractional",
-                    "is_tradable",
-                    "lp",
-                    "lp_time",
-                    "minmov",
-                    "minmove2",
-                    "original_name",
-                    "pricescale",
-                    "pro_name",
-                    "short_name",
-                    "type",
-                    "update_mode",
-                    "volume",
-                    "currency_code",
-                    "rchp",
-                    "rtc",
-                ],
-            )
-
-            self.__send_message(
-                "quote_add_symbols", [self.session, symbol]
+                "quote_add_symbols", [conn.quote_session, symbol], conn.ws
             )
-            self.__send_message("quote_fast_symbols", [self.session, symbol])
+            self.__send_message("quote_fast_symbols", [conn.quote_session, symbol], conn.ws)
 
+            resolve_span = tracing.start_span("resolve", symbol=symbol)  # until symbol_resolved
             self.__send_message(
                 "resolve_symbol",
                 [
-                    self.chart_session,
-                    "symbol_1",
-                    '={"symbol":"'
-                    + symbol
-                    + '","adjustment":"splits","session":'
-                    + ('"regular"' if not extended_session else '"extended"')
-                    + "}",
+                    conn.chart_session,
+                    symbol_id,
+                    self.__resolve_symbol_param(symbol, extended_session),
                 ],
+                conn.ws,
             )
+            series_span = tracing.start_span("create_series", interval=interval_str, n_bars=n_bars)  # until the first bars
             self.__send_message(
                 "create_series",
-                [self.chart_session, "s1", "s1", "symbol_1", interval_str, n_bars],
+                [conn.chart_session, series_id, series_id, symbol_id, interval_str, n_bars],
+                conn.ws,
             )
             self.__send_message("switch_timezone", [
-                                self.chart_session, "exchange"])
+                                conn.chart_session, "exchange"], conn.ws)
+            series_start = time.perf_counter()
+            receive_span = tracing.start_span("receive")  # until series_completed
 
-            raw_data = ""
+            parser = protocol.FrameParser()
+            collector = protocol.BarCollector([series_id])
+            symbol_info = None
             auth_error_detected = False
+            parameter_error_detected = False
+            completed = False
 
             logger.debug(f"getting data for {symbol}...")
-            while True:
+            while not completed:
                 try:
-                    result = self.ws.recv()
-                    raw_data = raw_data + result + "\n"
-                    
+                    result = conn.ws.recv()
+                except Exception as e:
+                    if conn.reused and not received:
+                        raise  # handled below, the server closed the connection while it was idle
+                    logger.error(e)
+                    break
+
+                received += len(result)
+                with tracing.span("parse", bytes=len(result)):
+                    messages = list(parser.messages(result))
+
+                for payload, message in messages:
+                    if message is None:
+                        # pooled connections are long lived, keep them alive by answering heartbeats
+                        if payload.startswith("~h~"):
+                            conn.ws.send(self.__prepend_header(payload))
+                        continue
+
+                    func = message.get("m")
+                    params = message.get("p", [])
+                    if func in protocol.DATA_MESSAGES:
+                        if collector.process(message):
+                            series_span.end()
+                        continue
+
+                    if func == "symbol_resolved" and len(params) > 2 and params[1] == symbol_id:
+                        resolve_span.end()
+                        symbol_info = params[2]
+                        self.symbol_cache.put_resolved(symbol, symbol_info, extended_session)
+                        continue
+
                     # Checking for authentication and parameter errors
-                    if "critical_error" in result:
+                    if func == "critical_error":
                         # Checking that this is an authentication error, not a parameter error
-                        if "invalid parameters" in result:
-                            logger.warning(f"A parameter error (not authentication) was detected: {result[:500]}...")
-                            break
-                            # This is a parameter error, not an authentication error - continue
+                        if "invalid parameters" in payload:
+                            parameter_error_detected = True
+                            logger.warning(f"A parameter error (not authentication) was detected: {payload[:500]}...")
                         else:
                             auth_error_detected = True
-                            logger.warning(f"A critical error was detected in the server response: {result[:500]}...")
-                            break
-                    elif "auth_error" in result or "unauthorized" in result.lower():
+                            logger.warning(f"A critical error was detected in the server response: {payload[:500]}...")
+                        completed = True
+                    elif "auth_error" in payload or "unauthorized" in payload.lower():
                         auth_error_detected = True
-                        logger.warning(f"An authentication error was detected in the server response: {result[:500]}...")
+                        logger.warning(f"An authentication error was detected in the server response: {payload[:500]}...")
+                        completed = True
+                    elif func in ("series_completed", "symbol_error", "series_error") and len(params) > 1 \
+                            and params[1] in (symbol_id, series_id):
+                        if func != "series_completed":
+                            logger.warning(f"{func} for {symbol}: {params[2:]}")
+                        else:
+                            metrics.series_completed_seconds.observe(time.perf_counter() - series_start, interval=interval_str)
+                        # remove the series so it does not keep pushing updates on the pooled connection
+                        self.__send_message("remove_series", [conn.chart_session, series_id], conn.ws)
+                        self.__send_message("quote_remove_symbols", [conn.quote_session, symbol], conn.ws)
+                        reusable = True
+                        completed = True
+
+                    if completed:
                         break
-                        
-                except Exception as e:
-                    logger.error(e)
-                    break
 
-                if "series_completed" in result:
-                    break
+            receive_span.set_attribute("bytes", received)
+            receive_span.set_attribute("completed", reusable)
+            for stage_span in (resolve_span, series_span, receive_span):
+                stage_span.end()  # also the stages which did not finish
+            self._pool.release(conn, discard=not reusable)
+            conn = None
 
             # If an authentication error was detected and credentials are available for a retry
 
@@ -513,82 +575,648 @@ class TvDatafeed:
                 logger.info("Attempt to refresh the token due to an authentication error...")
                 if self.refresh_token():
                     logger.info("The token has been refreshed, retrying the request...")
-                    return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count + 1)
+                    metrics.retries.inc(cause="auth")
+                    return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count=_retry_count + 1)
                 else:
                     logger.error("Failed to refresh the token")
 
-            result_df = self.__create_df(raw_data, symbol)
+            bars = collector.pop(series_id)
+            if bars:
+                with tracing.span("dataframe", bars=len(bars)):
+                    result_df = self.__bars_to_df(bars, symbol, self.__index_timezone(symbol_info))
+            else:
+                result_df = None
+                logger.error("no data, please check the exchange and symbol")
             # Additional check: if data was not received and the token can be refreshed
 
             if result_df is None and self.username and self.password and _retry_count < self.__max_retry_attempts:
                 logger.warning("Data was not received; the token may have expired. Attempting to refresh...")
                 if self.refresh_token():
                     logger.info("Token updated, repeating the request...")
-                    return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count + 1)
-            
+                    metrics.retries.inc(cause="parameter" if parameter_error_detected else "auth")
+                    return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count=_retry_count + 1)
+
             return result_df
             
         except Exception as e:
-            error_msg = str(e).lower()
-            logger.error(f"Error receiving data: {e}")
-            
-            # Checking for network errors (SSL timeout, connection errors, etc.)
-            network_errors = [
-                "handshake operation timed out",
-                "connection timed out", 
-                "connection refused",
-                "connection reset",
-                "ssl",
-                "timeout",
-                "network"
-            ]
-            
-            is_network_error = any(err in error_msg for err in network_errors)
-            
-            if is_network_error and _retry_count < self.__network_retry_attempts:
-                logger.warning(f"A network error was detected, attempting {_retry_count + 1} of {self.__network_retry_attempts}")
-                logger.info(f"Waiting {self.__network_retry_delay} seconds before retrying...")
-                time.sleep(self.__network_retry_delay)
-                return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count + 1)
-            
-            # If this is an authentication error and it is possible to refresh the token
+            stale = conn is not None and conn.reused and not received
+            if conn is not None:
+                self._pool.release(conn, discard=True)
+
+            if stale and not _reconnected:
+                # the idle connection passed the health check but the server had already closed it, the other
+                # idle connections were most likely closed as well so the request is repeated on a new one
+                logger.debug(f"Pooled connection was closed by the server ({e}), retrying on a new connection")
+                self._pool.clear()
+                metrics.retries.inc(cause="stale_connection")
+                return self.__fetch_hist(
+                    symbol, exchange, original_interval, n_bars, fut_contract, extended_session, False, _retry_count,
+                    _reconnected=True,
+                )
 
-            elif ("auth" in error_msg or "unauthorized" in error_msg) and self.username and self.password and _retry_count < self.__max_retry_attempts:
-                logger.info("Authentication error detected, attempting to refresh the token...")
-                if self.refresh_token():
-                    logger.info("Token updated, repeating the request...")
-                    return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count + 1)
-            
-            # If all attempts have been exhausted or it is not a network/authentication error
-            if is_network_error and _retry_count >= self.__network_retry_attempts:
-                logger.error(f"All attempts ({self.__network_retry_attempts}) to resolve a network error have been exhausted")
-            
+            logger.error(f"Error receiving data: {e}")
+            if self.__retry_error(e, _retry_count):
+                return self.get_hist(symbol, exchange, original_interval, n_bars, fut_contract, extended_session, _retry_count=_retry_count + 1)
             raise e
 
-    def search_symbol(self, text: str, exchange: str = ''):
+    def __fetch_hist_range(self, symbol, exchange, interval, n_bars, fut_contract, extended_session, _retry_count):
+        # get_hist of more than 5000 bars through get_hist_range, an invalid symbol returns None and
+        # failures are retried the same way as those of a single request
+        try:
+            return self.get_hist_range(
+                symbol, exchange, interval, n_bars=n_bars, fut_contract=fut_contract, extended_session=extended_session
+            )
+        except Exception as e:
+            invalid = isinstance(e, ValueError)  # symbol_error or series_error
+            if invalid:
+                logger.error(f"no data, please check the exchange and symbol: {e}")
+            else:
+                logger.error(f"Error receiving data: {e}")
+            # like get_hist, missing data and critical errors may be caused by an expired token
+            if self.__retry_error(e, _retry_count, auth_error=invalid or "critical_error" in str(e)):
+                return self.get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, _retry_count=_retry_count + 1)
+            if invalid:
+                return None
+            raise
+
+    def __retry_error(self, error, retry_count, auth_error=False):
+        # retry policy of get_hist and get_hist_many for a failed request: network errors are retried
+        # after a delay, authentication errors after refreshing the token. Returns True to retry
+        error_msg = str(error).lower()
+
+        # Checking for network errors (SSL timeout, connection errors, etc.)
+        network_errors = [
+            "handshake operation timed out",
+            "connection timed out", 
+            "connection refused",
+            "connection reset",
+            "ssl",
+            "timeout",
+            "network"
+        ]
+        
+        is_network_error = any(err in error_msg for err in network_errors)
+        
+        if is_network_error and retry_count < self.__network_retry_attempts:
+            logger.warning(f"A network error was detected, attempting {retry_count + 1} of {self.__network_retry_attempts}")
+            logger.info(f"Waiting {self.__network_retry_delay} seconds before retrying...")
+            time.sleep(self.__network_retry_delay)
+            metrics.retries.inc(cause="network")
+            return True
+        
+        # If this is an authentication error and it is possible to refresh the token
+
+        if (auth_error or "auth" in error_msg or "unauthorized" in error_msg) and self.username and self.password \
+                and retry_count < self.__max_retry_attempts:
+            logger.info("Authentication error detected, attempting to refresh the token...")
+            if self.refresh_token():
+                logger.info("Token updated, repeating the request...")
+                metrics.retries.inc(cause="auth")
+                return True
+        
+        # If all attempts have been exhausted or it is not a network/authentication error
+        if is_network_error:
+            logger.error(f"All attempts ({self.__network_retry_attempts}) to resolve a network error have been exhausted")
+        
+        return False
+
+    def __get_hist_cached(self, symbol, exchange, interval, n_bars, fut_contract, extended_session):
+        # get_hist through the bar cache, only bars newer than the last cached bar are downloaded
+        interval_str = interval.value if hasattr(interval, "value") else interval
+        key = self._cache.key(self.__format_symbol(symbol, exchange, fut_contract), interval_str, extended_session)
+        cached = self._cache.load(key)
+
+        fetch_bars = n_bars
+        if cached is not None and len(cached) >= n_bars:
+            # the last cached bar may not have been closed yet, so it is downloaded again
+            elapsed = (pd.Timestamp.now(tz="UTC") - cached.index[-1]).total_seconds()
+            fetch_bars = min(n_bars, int(elapsed // protocol.interval_seconds(interval_str)) + 2)
+
+        fresh = self.get_hist(symbol, exchange, interval, fetch_bars, fut_contract, extended_session, use_cache=False)
+        if fresh is None:
+            return None
+
+        step = pd.Timedelta(seconds=protocol.interval_seconds(interval_str))
+        if cached is not None and fresh.index[0] <= cached.index[-1] + step and fresh.index[-1] >= cached.index[0] - step:
+            # downloaded bars overlap or adjoin the cached ones, newer downloaded bars replace cached ones
+            data = pd.concat([cached.tz_convert(fresh.index.tz), fresh])
+            data = data[~data.index.duplicated(keep="last")].sort_index()
+            logger.debug(f"bar cache hit for {key}, downloaded {len(fresh)} bars")
+        elif cached is None or len(fresh) >= len(cached):
+            data = fresh
+        else:
+            # gap between cached and downloaded bars, keep the longer cached history
+            logger.debug(f"bar cache for {key} not updated, downloaded bars do not connect to the cached ones")
+            return fresh.iloc[-n_bars:]
+
+        try:
+            self._cache.store(key, data)
+        except Exception as e:
+            logger.warning(f"Could not store bars in cache: {e}")
+
+        return data.iloc[-n_bars:]
+
+    def __receive_series(self, conn, parser, collector, symbol_id, series_id):
+        # receive until the series is completed, returns resolved symbol info if it was received
+        symbol_info = None
+        while True:
+            result = conn.ws.recv()
+            for payload, message in parser.messages(result):
+                if message is None:
+                    if payload.startswith("~h~"):
+                        conn.ws.send(self.__prepend_header(payload))
+                    continue
+
+                func = message.get("m")
+                params = message.get("p", [])
+                if func in protocol.DATA_MESSAGES:
+                    collector.process(message)
+                elif func == "symbol_resolved" and params[1] == symbol_id:
+                    symbol_info = params[2]
+                elif func == "series_completed" and params[1] == series_id:
+                    return symbol_info
+                elif func in ("symbol_error", "series_error") and params[1] in (symbol_id, series_id):
+                    raise ValueError(f"{func}: {params[2:]}")
+                elif func in ("critical_error", "protocol_error"):
+                    raise ConnectionError(f"{func}: {payload[:500]}")
+
+    def iter_hist_chunks(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = None,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        start=None,
+        end=None,
+        chunk_size: int = 5000,
+    ):
+        """get historical data in chunks, going back beyond the 5000 bar limit
+
+        Creates one series and keeps requesting older bars on it with
+        request_more_data. Chunks are yielded as soon as they are received,
+        newest first, and requesting stops once n_bars bars were received,
+        start is reached or there is no older data.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            interval (Interval, optional): chart interval. Defaults to Interval.in_daily.
+            n_bars (int, optional): no of bars to download. Defaults to None (until start).
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            start (datetime | str, optional): oldest bar datetime to download, local timezone if naive. Defaults to None.
+            end (datetime | str, optional): newest bar datetime to return, local timezone if naive. Defaults to None.
+            chunk_size (int, optional): no of bars requested at a time, max 5000. Defaults to 5000.
+
+        Yields:
+            pd.DataFrame: chunk of bars with sohlcv as columns
+
+        Raises:
+            ValueError: if neither n_bars nor start is given or the symbol is invalid
+        """
+        if n_bars is None and start is None:
+            raise ValueError("n_bars or start must be provided")
+
+        start = self.__to_timestamp(start)
+        end = self.__to_timestamp(end)
+        chunk_size = min(chunk_size, self.__max_bars_per_request)
+        symbol = self.__format_symbol(symbol=symbol, exchange=exchange, contract=fut_contract)
+        interval_str = interval.value if hasattr(interval, "value") else interval
+
+        conn = self._pool.acquire(token=self.token)
+        reusable = False
+        try:
+            symbol_id, series_id = conn.next_series_ids()
+            parser = protocol.FrameParser()
+            collector = protocol.BarCollector([series_id])
+            symbol_info = None
+
+            self.__send_message(
+                "resolve_symbol",
+                [conn.chart_session, symbol_id, self.__resolve_symbol_param(symbol, extended_session)],
+                conn.ws,
+            )
+            self.__send_message(
+                "create_series",
+                [conn.chart_session, series_id, series_id, symbol_id, interval_str,
+                 chunk_size if n_bars is None else min(chunk_size, n_bars)],
+                conn.ws,
+            )
+
+            received = 0
+            oldest = None
+            while True:
+                symbol_info = self.__receive_series(conn, parser, collector, symbol_id, series_id) or symbol_info
+                bars = collector.pop(series_id)
+                collector.add(series_id)
+                if not bars:
+                    break
+
+                chunk = self.__bars_to_df(bars, symbol, self.__index_timezone(symbol_info))
+                if oldest is not None:
+                    chunk = chunk[chunk.index < oldest]  # drop bars that were already yielded
+                if chunk.empty:
+                    break  # no older data available
+
+                if n_bars is not None:
+                    chunk = chunk.iloc[-(n_bars - received):]
+                received += len(chunk)
+                oldest = chunk.index[0]
+
+                selected = chunk
+                if start is not None:
+                    selected = selected[selected.index >= start]
+                if end is not None:
+                    selected = selected[selected.index <= end]
+                if not selected.empty:
+                    yield selected
+
+                if (n_bars is not None and received >= n_bars) or (start is not None and oldest <= start):
+                    break
+
+                remaining = chunk_size if n_bars is None else min(chunk_size, n_bars - received)
+                self.__send_message("request_more_data", [conn.chart_session, series_id, remaining], conn.ws)
+
+            self.__send_message("remove_series", [conn.chart_session, series_id], conn.ws)
+            reusable = True
+        finally:
+            # state of the connection is unknown if the generator was not exhausted
+            self._pool.release(conn, discard=not reusable)
+
+    def get_hist_range(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = None,
+        fut_contract: int = None,
+        extended_session: bool = False,
+        start=None,
+        end=None,
+        chunk_size: int = 5000,
+    ) -> pd.DataFrame:
+        """get historical data beyond the 5000 bar limit or for a datetime range
+
+        Takes the same arguments as iter_hist_chunks.
+
+        Returns:
+            pd.Dataframe: dataframe with sohlcv as columns sorted by datetime, None if no data
+        """
+        chunks = list(self.iter_hist_chunks(
+            symbol, exchange, interval, n_bars, fut_contract, extended_session, start, end, chunk_size
+        ))
+        if not chunks:
+            logger.error("no data, please check the exchange, symbol and range")
+            return None
+
+        data = pd.concat(chunks[::-1])
+        return data[~data.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def __to_timestamp(value):
+        if value is None:
+            return None
+        value = pd.Timestamp(value)
+        if value.tzinfo is None:
+            value = value.tz_localize(tzlocal())
+        return value
+
+    def get_hist_many(
+        self,
+        symbols,
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 10,
+        extended_session: bool = False,
+        long_format: bool = False,
+        max_in_flight: int = 50,
+    ):
+        """get historical data for many symbols over a single websocket
+
+        All series are created on one chart session and fetched concurrently,
+        so the total time is close to the time of the slowest symbol instead
+        of the sum of all of them.
+
+        Args:
+            symbols (list): items can be a symbol string in format EXCHANGE:SYMBOL, a
+                (symbol, exchange) tuple or a dict with get_hist keyword arguments
+                (symbol, exchange, interval, n_bars, fut_contract, extended_session).
+            interval (Interval, optional): default chart interval. Defaults to Interval.in_daily.
+            n_bars (int, optional): default no of bars to download, max 5000. Defaults to 10.
+            extended_session (bool, optional): default session type. Defaults to False.
+            long_format (bool, optional): return a single long format dataframe instead of
+                a dict. Defaults to False.
+            max_in_flight (int, optional): maximum number of series requested at once. Defaults to 50.
+
+        Returns:
+            dict | pd.DataFrame: dataframes keyed by EXCHANGE:SYMBOL, None for symbols that
+                could not be fetched. If long_format is True then a single dataframe with
+                all the bars and symbol column.
+
+        Raises:
+            Exception: error of the connection if the request could not be completed after retries,
+                e.g. ConnectionError when the server rejected the session
+        """
+        specs = []
+        for item in symbols:
+            if isinstance(item, str):
+                item = {"symbol": item}
+            elif isinstance(item, (tuple, list)):
+                item = dict(zip(("symbol", "exchange"), item))
+            spec = {
+                "interval": interval,
+                "n_bars": n_bars,
+                "extended_session": extended_session,
+                "exchange": "NSE",
+                "fut_contract": None,
+                **item,
+            }
+            spec["symbol"] = self.__format_symbol(
+                spec["symbol"], spec["exchange"], spec["fut_contract"]
+            )
+            if hasattr(spec["interval"], "value"):
+                spec["interval"] = spec["interval"].value
+            specs.append(spec)
+
+        results = {spec["symbol"]: None for spec in specs}
+        done = set()  # symbols completed or rejected by the server, not requested again on a retry
+        retry_count = 0
+        reconnected = False
+
+        while True:
+            pending = [spec for spec in reversed(specs) if spec["symbol"] not in done]
+            if not pending:
+                break
+
+            in_flight = {}  # series id -> spec
+            symbol_ids = {}  # symbol id -> series id
+            symbol_info = {}  # series id -> resolved symbol info
+            started = {}  # series id -> time create_series was sent
+            parser = protocol.FrameParser()
+            collector = protocol.BarCollector([])
+            conn = None
+            reusable = False
+            received = 0
+            error = None
+            auth_error = False
+
+            try:
+                conn = self._pool.acquire(token=self.token)
+                while pending or in_flight:
+                    while pending and len(in_flight) < max_in_flight:
+                        spec = pending.pop()
+                        symbol_id, series_id = conn.next_series_ids()
+                        symbol_ids[symbol_id] = series_id
+                        in_flight[series_id] = spec
+                        collector.add(series_id)
+                        self.__send_message(
+                            "resolve_symbol",
+                            [
+                                conn.chart_session,
+                                symbol_id,
+                                self.__resolve_symbol_param(spec["symbol"], spec["extended_session"]),
+                            ],
+                            conn.ws,
+                        )
+                        self.__send_message(
+                            "create_series",
+                            [conn.chart_session, series_id, series_id, symbol_id, spec["interval"], spec["n_bars"]],
+                            conn.ws,
+                        )
+                        started[series_id] = time.perf_counter()
+
+                    result = conn.ws.recv()
+                    received += len(result)
+
+                    for payload, message in parser.messages(result):
+                        if message is None:
+                            if payload.startswith("~h~"):
+                                conn.ws.send(self.__prepend_header(payload))
+                            continue
+
+                        func = message.get("m")
+                        params = message.get("p", [])
+                        if func in protocol.DATA_MESSAGES:
+                            collector.process(message)
+                        elif func == "symbol_resolved" and params[1] in symbol_ids:
+                            series_id = symbol_ids[params[1]]
+                            symbol_info[series_id] = params[2]
+                            if series_id in in_flight:
+                                spec = in_flight[series_id]
+                                self.symbol_cache.put_resolved(spec["symbol"], params[2], spec["extended_session"])
+                        elif func == "series_completed":
+                            series_id = params[1]
+                            if series_id in in_flight:
+                                spec = in_flight.pop(series_id)
+                                metrics.series_completed_seconds.observe(
+                                    time.perf_counter() - started.pop(series_id), interval=spec["interval"]
+                                )
+                                bars = collector.pop(series_id)
+                                if bars:
+                                    results[spec["symbol"]] = self.__bars_to_df(
+                                        bars, spec["symbol"], self.__index_timezone(symbol_info.pop(series_id, None))
+                                    )
+                                done.add(spec["symbol"])
+                                self.__send_message("remove_series", [conn.chart_session, series_id], conn.ws)
+                        elif func in ("symbol_error", "series_error"):
+                            series_id = symbol_ids.get(params[1], params[1])
+                            if series_id in in_flight:
+                                spec = in_flight.pop(series_id)
+                                collector.pop(series_id)
+                                done.add(spec["symbol"])
+                                logger.warning(f"{func} for {spec['symbol']}: {params[2:]}")
+                                self.__send_message("remove_series", [conn.chart_session, series_id], conn.ws)
+                        elif func in ("critical_error", "protocol_error"):
+                            # the server rejected the session, the connection must not be reused
+                            auth_error = func == "critical_error" and "invalid parameters" not in payload
+                            raise ConnectionError(f"{func}: {payload[:500]}")
+
+                reusable = True
+            except Exception as e:
+                error = e
+            finally:
+                if conn is not None:
+                    self._pool.release(conn, discard=not reusable)
+
+            if error is None:
+                break
+
+            if conn is not None and conn.reused and not received and not reconnected:
+                # same as in get_hist, the idle connection had already been closed by the server
+                logger.debug(f"Pooled connection was closed by the server ({error}), retrying on a new connection")
+                self._pool.clear()
+                metrics.retries.inc(cause="stale_connection")
+                reconnected = True
+                continue
+
+            logger.error(f"Error receiving data: {error}")
+            if not self.__retry_error(error, retry_count, auth_error=auth_error):
+                raise error
+            retry_count += 1
+
+        if long_format:
+            frames = [df for df in results.values() if df is not None]
+            return pd.concat(frames) if frames else None
+
+        return results
+
+    def get_symbol_info(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        fut_contract: int = None,
+        extended_session: bool = False,
+        use_cache: bool = True,
+    ):
+        """get resolved symbol information
+
+        Returns the symbol_resolved info TradingView sends for a symbol, with
+        its exchange timezone, trading session and session holidays. Info
+        received by get_hist and get_hist_many is kept in the process wide
+        symbol cache, so no request is needed for symbols fetched before.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to "NSE".
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+            use_cache (bool, optional): return cached info if available. Defaults to True.
+
+        Returns:
+            dict: symbol info with timezone, session and session_holidays keys, None if the symbol
+                could not be resolved
+        """
+        symbol = self.__format_symbol(symbol, exchange, fut_contract)
+        if use_cache and (info := self.symbol_cache.get_resolved(symbol, extended_session)) is not None:
+            return info
+
+        info = None
+        reusable = False
+        conn = self._pool.acquire(token=self.token)
+        try:
+            symbol_id, _ = conn.next_series_ids()
+            self.__send_message(
+                "resolve_symbol",
+                [conn.chart_session, symbol_id, self.__resolve_symbol_param(symbol, extended_session)],
+                conn.ws,
+            )
+
+            parser = protocol.FrameParser()
+            completed = False
+            while not completed:
+                result = conn.ws.recv()
+                for payload, message in parser.messages(result):
+                    if message is None:
+                        if payload.startswith("~h~"):
+                            conn.ws.send(self.__prepend_header(payload))
+                        continue
+
+                    func = message.get("m")
+                    params = message.get("p", [])
+                    if func == "symbol_resolved" and params[1] == symbol_id:
+                        info = params[2]
+                        completed = True
+                    elif func == "symbol_error" and params[1] == symbol_id:
+                        logger.warning(f"symbol_error for {symbol}: {params[2:]}")
+                        completed = True
+                    elif func in ("critical_error", "protocol_error"):
+                        raise ConnectionError(f"{func}: {payload[:500]}")
+            reusable = True
+        except Exception as e:
+            logger.error(f"Error resolving symbol {symbol}: {e}")
+        finally:
+            self._pool.release(conn, discard=not reusable)
+
+        if info is not None:
+            self.symbol_cache.put_resolved(symbol, info, extended_session)
+        return info
+
+    def open_session(self, read_timeout: float = 30, max_reconnect_delay: float = 30):
+        """open a supervised long-lived websocket session
+
+        The returned ConnectionSupervisor keeps the connection alive: it
+        answers heartbeats, reconnects with jittered exponential backoff when
+        the connection drops or nothing is received for read_timeout seconds,
+        and replays the chart and quote session messages sent with send(), so
+        series and quote symbols survive a reconnect under the same ids.
+
+        Args:
+            read_timeout (float, optional): seconds without any received frame after which the
+                connection is considered stalled. Defaults to 30.
+            max_reconnect_delay (float, optional): maximum seconds between reconnect attempts. Defaults to 30.
+
+        Returns:
+            ConnectionSupervisor: call close() on it when done
+
+        Example:
+            with tv.open_session() as session:
+                symbol_id, series_id = session.next_series_ids()
+                session.send("resolve_symbol", [session.chart_session, symbol_id, '={"symbol":"BINANCE:BTCUSDT"}'])
+                session.send("create_series", [session.chart_session, series_id, series_id, symbol_id, "1", 10])
+                while True:
+                    for message in session.recv():
+                        print(message)
+        """
+        return ConnectionSupervisor(
+            self._open_connection, read_timeout=read_timeout, max_reconnect_delay=max_reconnect_delay
+        )
+
+    def subscribe_quotes(self, symbols, fields=None, callback=None):
+        """subscribe to real-time quotes pushed on a long-lived quote session
+
+        All subscriptions share one websocket connection which stays open
+        until the last subscription is closed or close() is called. Each
+        subscription has its own buffer which holds every updated symbol
+        once, later updates of a pending symbol are merged into it, so slow
+        subscribers do not slow down the stream or each other.
+
+        Args:
+            symbols (list): symbol strings in format EXCHANGE:SYMBOL or (symbol, exchange) tuples
+            fields (list, optional): quote fields to receive, e.g. ["lp", "ch", "volume"].
+                Defaults to None (all fields).
+            callback (callable, optional): called as callback(symbol, quote) in a separate
+                thread for every update. Defaults to None, read updates with get(), a for loop
+                or an async for loop over the subscription instead.
+
+        Returns:
+            QuoteSubscription: call close() on it to unsubscribe
+
+        Example:
+            with tv.subscribe_quotes(["BINANCE:BTCUSDT"], ["lp"]) as quotes:
+                for symbol, quote in quotes:
+                    print(symbol, quote["lp"])
+        """
+        symbols = [
+            symbol if isinstance(symbol, str) else self.__format_symbol(symbol[0], symbol[1], None)
+            for symbol in symbols
+        ]
+        if self._quote_stream is None:
+            self._quote_stream = QuoteStream(self._open_connection)
+        return self._quote_stream.subscribe(symbols, fields, callback)
+
+    def search_symbol(self, text: str, exchange: str = '', use_cache: bool = True):
+        """search symbols on TradingView
+
+        Results are kept in the process wide symbol cache (tvDatafeed.symbol_cache)
+        so repeated searches do not need an HTTP request.
+
+        Args:
+            text (str): search text
+            exchange (str, optional): exchange to search in. Defaults to ''.
+            use_cache (bool, optional): return cached result if available. Defaults to True.
+        """
+        if use_cache and (cached := self.symbol_cache.get_search(text, exchange)) is not None:
+            return cached
+
         url = self.__search_url.format(text, exchange)
 
         symbols_list = []
         try:
-            headers = {
-                "Accept": "*/*",
-                "Accept-Encoding": "gzip, deflate, br, zstd",
-                "Accept-Language": "en-US,en;q=0.9",
-                "DNT": "1",
-                "Origin": "https://in.tradingview.com",
-                "Referer": "https://in.tradingview.com/",
-                "Sec-CH-UA": '"Google Chrome";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
-                "Sec-CH-UA-Mobile": "?0",
-                "Sec-CH-UA-Platform": '"Windows"',
-                "Sec-Fetch-Dest": "empty",
-                "Sec-Fetch-Mode": "cors",
-                "Sec-Fetch-Site": "same-site",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
-            }
-              
-            resp = requests.get(url, headers=headers)
+            resp = self._http.get(url, headers=protocol.SEARCH_HEADERS)
             
             symbols_list = json.loads(resp.text.replace('</em>', '').replace('<em>', ''))
+            self.symbol_cache.put_search(text, exchange, symbols_list)
         except Exception as e:
             logger.error(e)
 
@@ -609,10 +1237,13 @@ class TvDatafeed:
             if new_token and new_token != "unauthorized_user_token":
                 self.token_manager.save_token(new_token, self.username)
                 self.token = new_token
+                self._pool.clear()  # pooled sessions were authenticated with the old token
                 logger.info("Token successfully refreshed")
+                metrics.token_refreshes.inc(result="ok")
                 return True
             else:
                 logger.error("Failed to obtain a new token")
+                metrics.token_refreshes.inc(result="failed")
                 return False
         else:
             logger.error("No credentials to refresh the token")
@@ -0,0 +1,386 @@
+"""Counters, gauges and histograms of the client and the live feed
+
+All metrics live in the process wide ``registry``, which TvDatafeed and
+TvDatafeedLive expose as their ``metrics`` attribute. Values can be read
+with ``value()`` of a metric or ``registry.snapshot()``, rendered in the
+Prometheus text format with ``registry.to_prometheus()`` or served for
+scraping from a local endpoint:
+
+    server = tv.metrics.serve(port=9464)  # http://127.0.0.1:9464/metrics
+"""
+import bisect
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a fast local round trip to a slow multi-chunk download
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class _Metric:
+    # metric with one value per combination of label values
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}  # tuple of label values -> value
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.name}')"
+
+    def _key(self, labels):
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} needs the labels {self.labels}, got {tuple(labels)}")
+        try:
+            return tuple(str(labels[name]) for name in self.labels)
+        except KeyError:
+            raise ValueError(f"{self.name} needs the labels {self.labels}, got {tuple(labels)}") from None
+
+    def _items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def clear(self):
+        """Forget all recorded values"""
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        """Return {label values: value}, the key is () for metrics without labels"""
+        return dict(self._items())
+
+    def samples(self):
+        """Yield (sample name, label names, label values, value) in Prometheus order"""
+        items = sorted(self._items()) or ([((), 0)] if not self.labels else [])  # 0 before the first update
+        for key, value in items:
+            yield self.name, self.labels, key, value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. of received frames or retries
+
+    Args:
+        name (str): metric name, ends with _total by convention
+        documentation (str): help text
+        labels (tuple, optional): label names. Defaults to ().
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the count of the given label values"""
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. a queue depth
+
+    Args:
+        name (str): metric name
+        documentation (str): help text
+        labels (tuple, optional): label names. Defaults to ().
+        function (callable, optional): called without arguments whenever the gauge is read, returns
+            the value of a gauge without labels. Defaults to None.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self._function = function
+
+    def set_function(self, function):
+        """Compute the value with function() whenever the gauge is read"""
+        if self.labels:
+            raise ValueError("only gauges without labels can be computed")
+        self._function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _items(self):
+        if self._function is None:
+            return super()._items()
+        try:
+            return [((), self._function())]
+        except Exception as e:
+            logger.error(f"Could not compute {self.name}: {e}")
+            return []
+
+    def value(self, **labels):
+        return dict(self._items()).get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies in seconds
+
+    Args:
+        name (str): metric name, ends with the unit, e.g. _seconds
+        documentation (str): help text
+        labels (tuple, optional): label names. Defaults to ().
+        buckets (tuple, optional): upper bounds of the buckets, +Inf is added. Defaults to DEFAULT_BUCKETS.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:  # [count per bucket incl. +Inf, sum]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _summary(self, state):
+        counts, total = state
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative[bound] = running
+        return {"count": running, "sum": total, "buckets": cumulative}
+
+    def _items(self):
+        with self._lock:
+            return [(key, [list(state[0]), state[1]]) for key, state in self._values.items()]
+
+    def snapshot(self):
+        """Return {label values: {"count", "sum", "buckets": {upper bound: cumulative count}}}"""
+        return {key: self._summary(state) for key, state in self._items()}
+
+    def value(self, **labels):
+        state = dict(self._items()).get(self._key(labels))
+        return self._summary(state if state is not None else [[0] * (len(self.buckets) + 1), 0.0])
+
+    def samples(self):
+        empty = [((), [[0] * (len(self.buckets) + 1), 0.0])] if not self.labels else []
+        for key, state in sorted(self._items()) or empty:
+            summary = self._summary(state)
+            for bound, count in summary["buckets"].items():
+                yield f"{self.name}_bucket", self.labels + ("le",), key + (_format_value(bound),), count
+            yield f"{self.name}_sum", self.labels, key, summary["sum"]
+            yield f"{self.name}_count", self.labels, key, summary["count"]
+
+
+class MetricsRegistry:
+    """Collection of named metrics, rendered together for Prometheus
+
+    counter(), gauge() and histogram() return the existing metric of a
+    name, so modules can declare the metrics they update independently.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._servers = []
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._metrics.values()))
+
+    def __contains__(self, name):
+        return name in self._metrics
+
+    def get(self, name):
+        """Return the metric of a name, None if there is none"""
+        return self._metrics.get(name)
+
+    def _register(self, cls, name, documentation, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, **kwargs)
+            elif type(metric) is not cls or metric.labels != tuple(labels):
+                raise ValueError(f"{name} is already registered as {metric.kind} with labels {metric.labels}")
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=(), function=None):
+        return self._register(Gauge, name, documentation, labels, function=function)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def clear(self):
+        """Reset the values of all metrics, e.g. between benchmark runs"""
+        for metric in self:
+            metric.clear()
+
+    def snapshot(self):
+        """Return {metric name: metric.snapshot()} of all metrics"""
+        return {metric.name: metric.snapshot() for metric in self}
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in sorted(self, key=lambda metric: metric.name):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, label_names, label_values, value in metric.samples():
+                lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """Serve the metrics at http://host:port/metrics from a background thread
+
+        Args:
+            port (int, optional): port to listen on, 0 for a free port. Defaults to 9464.
+            host (str, optional): interface to listen on. Defaults to "127.0.0.1".
+
+        Returns:
+            http.server.ThreadingHTTPServer: the running server, stop it with shutdown()
+                or with close() of the registry
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only needed when serving
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(name="metrics_server", target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+        logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    def close(self):
+        """Stop all servers started with serve()"""
+        while self._servers:
+            server = self._servers.pop()
+            server.shutdown()
+            server.server_close()
+
+
+registry = MetricsRegistry()
+
+# websocket client
+connect_seconds = registry.histogram(
+    "tvdatafeed_connect_seconds", "Time to open and set up an authenticated websocket connection"
+)
+series_completed_seconds = registry.histogram(
+    "tvdatafeed_series_completed_seconds", "Time from create_series to series_completed", ("interval",)
+)
+frames_received = registry.counter("tvdatafeed_frames_received_total", "Websocket frames received, heartbeats included")
+bytes_received = registry.counter("tvdatafeed_received_bytes_total", "Characters of websocket messages received")
+parse_seconds = registry.histogram(
+    "tvdatafeed_parse_seconds", "Time spent decoding received messages (frames) and building dataframes", ("stage",)
+)
+retries = registry.counter("tvdatafeed_retries_total", "get_hist retries by cause: network, auth, parameter or stale_connection", ("cause",))
+token_refreshes = registry.counter("tvdatafeed_token_refreshes_total", "Token refreshes by result", ("result",))
+reconnects = registry.counter("tvdatafeed_reconnects_total", "Reconnects of supervised long-lived connections")
+
+# live feed
+trigger_lag_seconds = registry.histogram(
+    "tvdatafeed_trigger_lag_seconds", "Delay from the expiry of an interval group to its processing", ("interval",)
+)
+group_fetch_seconds = registry.histogram(
+    "tvdatafeed_group_fetch_seconds", "Time to fetch and deliver the new bars of an expired interval group",
+    ("interval", "session"),
+)
+stream_delay_seconds = registry.histogram(
+    "tvdatafeed_stream_delay_seconds", "Delay from bar close to delivery of a streamed bar", ("interval",)
+)
+consumer_dropped = registry.counter(
+    "tvdatafeed_consumer_dropped_total", "Bars dropped or replaced because a consumer buffer was full"
+)
+
+_consumers = weakref.WeakSet()  # running consumers, their buffers are read when the gauges are collected
+_consumers_lock = threading.Lock()
+
+
+def track_consumer(consumer):
+    """Include a consumer's buffer in the consumer queue gauges"""
+    with _consumers_lock:
+        _consumers.add(consumer)
+
+
+def untrack_consumer(consumer):
+    with _consumers_lock:
+        _consumers.discard(consumer)
+
+
+def _depths():
+    with _consumers_lock:
+        consumers = list(_consumers)
+    return [consumer.depth for consumer in consumers]
+
+
+registry.gauge("tvdatafeed_consumers", "Running consumers", function=lambda: len(_depths()))
+registry.gauge(
+    "tvdatafeed_consumer_queue_depth", "Bars waiting for consumer callbacks", function=lambda: sum(_depths())
+)
+registry.gauge(
+    "tvdatafeed_consumer_queue_max_depth", "Bars waiting for the most behind consumer",
+    function=lambda: max(_depths(), default=0),
+)
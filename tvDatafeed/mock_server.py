@@ -0,0 +1,566 @@
+"""Local stand-in for the TradingView websocket endpoint
+
+Speaks the ~m~ framed chart and quote protocol over a plain RFC 6455
+websocket, using the standard library only, so get_hist, the streaming
+and polling live feeds, quote subscriptions and symbol search can be run,
+measured and tested without network access:
+
+    with MockTradingViewServer(latency=0.02) as server:
+        tv = TvDatafeed(ws_url=server.url)
+        data = tv.get_hist("BTCUSDT", "MOCK", Interval.in_1_minute, n_bars=5000)
+
+Or run it on its own, e.g. on an isolated benchmark box:
+
+    python -m tvDatafeed.mock_server --port 8765 --latency 0.02
+"""
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import math
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+from . import protocol
+
+logger = logging.getLogger(__name__)
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"  # RFC 6455 handshake constant
+_TEXT, _BINARY, _CLOSE, _PING, _PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class _Disconnect(Exception):
+    pass
+
+
+class _Series:
+    # bars of one chart series, bar 0 is the currently open bar and older bars count up
+    def __init__(self, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.seconds = protocol.interval_seconds(interval)
+        self.loaded = 0  # number of bars sent so far, the open bar has index loaded - 1
+        self.open_time = None  # open time of the last bar sent
+
+
+class _Connection(socketserver.BaseRequestHandler):
+    # one websocket client: handshake, then a reader loop in this thread
+    # and a pusher thread sending heartbeats and live updates
+
+    def setup(self):
+        self.mock = self.server.mock
+        self.write_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.opened = time.monotonic()
+        self.series = {}  # series id -> _Series
+        self.symbols = {}  # symbol id -> symbol
+        self.quotes = set()  # symbols in the quote session
+        self.chart_session = None
+        self.quote_session = None
+        self.buffer = b""
+        self.mock._connections.add(self)
+
+    def handle(self):
+        try:
+            while not self._handshake():  # plain HTTP requests on a keep-alive connection
+                pass
+        except (OSError, _Disconnect, ValueError) as e:
+            logger.debug(f"Handshake failed: {e}")
+            return
+
+        self.mock._count("connections")
+        self._send_frames([json.dumps({
+            "session_id": f"mock_{id(self)}", "timestamp": int(time.time()), "release": "mock", "protocol": "json",
+        })])
+        pusher = threading.Thread(name="mock_pusher", target=self._push, daemon=True)
+        pusher.start()
+        try:
+            self._read()
+        except (OSError, _Disconnect):
+            pass
+        finally:
+            self.closed.set()
+
+    def finish(self):
+        self.mock._connections.discard(self)
+        self.drop()
+
+    def drop(self):
+        # close the socket without a close frame, like a lost connection
+        self.closed.set()
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+            self.request.close()
+        except OSError:
+            pass
+
+    # websocket layer
+
+    def _recv_exact(self, size):
+        while len(self.buffer) < size:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                raise _Disconnect("client closed the connection")
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def _handshake(self):
+        # answer one HTTP request, True once the connection was upgraded to a websocket
+        while b"\r\n\r\n" not in self.buffer:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                raise _Disconnect("closed during handshake")
+            self.buffer += chunk
+        head, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        headers = {}
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            method, _, target = head.decode("latin-1").split("\r\n")[0].partition(" ")
+            url = urlsplit(target.rpartition(" ")[0])
+            if method != "GET" or not url.path.startswith("/symbol_search"):
+                self.request.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+                raise ValueError("not a websocket or symbol search request")
+            query = parse_qs(url.query)
+            self._search(query.get("text", [""])[0], query.get("exchange", [""])[0])
+            if headers.get("connection", "").lower() == "close":
+                raise _Disconnect("client closed the connection")
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + _GUID).encode("ascii")).digest()).decode("ascii")
+        self.request.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode("ascii"))
+        return True
+
+    def _search(self, text, exchange):
+        # symbol search answer in the format of TradingView's symbol_search endpoint
+        self.mock._count("symbol_search")
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        body = json.dumps(self.mock.search(text, exchange)).encode("utf-8")
+        self.request.sendall((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("ascii") + body)
+
+    def _read_message(self):
+        # return (opcode, payload) of the next complete message, control frames included
+        parts = []
+        message_opcode = _TEXT
+        while True:
+            first, second = self._recv_exact(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._recv_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._recv_exact(8))[0]
+            mask = self._recv_exact(4) if second & 0x80 else None
+            payload = self._recv_exact(length)
+            if mask is not None and length:
+                key = (mask * (length // 4 + 1))[:length]
+                payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+            if opcode >= _CLOSE:  # control frames are never fragmented
+                return opcode, payload
+            parts.append(payload)
+            if opcode:
+                message_opcode = opcode
+            if first & 0x80:
+                return message_opcode, b"".join(parts)
+
+    def _write(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        with self.write_lock:
+            if self.closed.is_set():
+                return
+            self.request.sendall(header + payload)
+
+    def _send_frames(self, payloads):
+        # send payloads as ~m~ frames in one websocket message, like TradingView does
+        if self._stalled() or not payloads:
+            return
+        data = "".join(protocol.prepend_header(payload) for payload in payloads).encode("utf-8")
+        self._write(_TEXT, data)
+        self.mock._count("frames_sent", len(payloads))
+        self.mock._count("bytes_sent", len(data))
+
+    def _stalled(self):
+        return self.mock.stall_after is not None and time.monotonic() - self.opened > self.mock.stall_after
+
+    def _read(self):
+        parser = protocol.FrameParser()
+        while not self.closed.is_set():
+            opcode, payload = self._read_message()
+            if opcode == _CLOSE:
+                self._write(_CLOSE, payload[:2])
+                return
+            if opcode == _PING:
+                self._write(_PONG, payload)
+                continue
+            if opcode != _TEXT:
+                continue
+            for text in parser.feed(payload.decode("utf-8")):  # not messages(), which counts client metrics
+                message = protocol.decode_frame(text)
+                if message is not None:
+                    self._handle(message)
+
+    # TradingView protocol
+
+    def _reply(self, func, params):
+        return protocol.construct_message(func, params)
+
+    def _handle(self, message):
+        func = message.get("m")
+        params = message.get("p", [])
+        self.mock._count(func)
+        if self.mock.failure_rate and self.mock._random.random() < self.mock.failure_rate:
+            self.mock._count("injected_failures")
+            raise _Disconnect("injected failure")
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+
+        handler = getattr(self, "_on_" + str(func), None)
+        if handler is not None:
+            self._send_frames(handler(params))
+
+    def _on_chart_create_session(self, params):
+        self.chart_session = params[0]
+        return []
+
+    def _on_quote_create_session(self, params):
+        self.quote_session = params[0]
+        return []
+
+    def _on_resolve_symbol(self, params):
+        session, symbol_id, spec = params[:3]
+        symbol = json.loads(spec[1:])["symbol"] if spec.startswith("=") else spec
+        self.symbols[symbol_id] = symbol
+        if symbol in self.mock.error_symbols:
+            return [self._reply("symbol_error", [session, symbol_id, "invalid symbol"])]
+        return [self._reply("symbol_resolved", [session, symbol_id, self.mock.symbol_info(symbol)])]
+
+    def _on_create_series(self, params):
+        session, series_id, _, symbol_id, interval, n_bars = params[:6]
+        symbol = self.symbols.get(symbol_id)
+        if symbol is None or symbol in self.mock.error_symbols:
+            return [self._reply("series_error", [session, series_id, "unknown symbol"])]
+        series = self.series[series_id] = _Series(symbol, interval)
+        bars = self.mock.bars(symbol, series.seconds, 0, n_bars)
+        series.loaded = len(bars)
+        series.open_time = bars[-1][0] if bars else None
+        return self._series_reply(session, series_id, bars)
+
+    _on_modify_series = _on_create_series
+
+    def _on_request_more_data(self, params):
+        session, series_id, n_bars = params[:3]
+        series = self.series.get(series_id)
+        if series is None:
+            return [self._reply("series_error", [session, series_id, "unknown series"])]
+        bars = self.mock.bars(series.symbol, series.seconds, series.loaded, n_bars, newest=series.open_time)
+        series.loaded += len(bars)
+        return self._series_reply(session, series_id, bars)
+
+    def _series_reply(self, session, series_id, bars):
+        update = {series_id: {"node": "mock", "s": [{"i": i, "v": values} for i, values in enumerate(bars)],
+                              "ns": {"d": "", "indexes": []}, "t": "s1", "lbs": {}}}
+        return [
+            self._reply("timescale_update", [session, update]),
+            self._reply("series_completed", [session, series_id, "streaming", "s1"]),
+        ]
+
+    def _on_remove_series(self, params):
+        self.series.pop(params[1], None)
+        return []
+
+    def _on_quote_add_symbols(self, params):
+        self.quotes.update(params[1:])
+        return [self._quote(symbol) for symbol in params[1:]] + [
+            self._reply("quote_completed", [params[0], symbol]) for symbol in params[1:]
+        ]
+
+    def _on_quote_remove_symbols(self, params):
+        self.quotes.difference_update(params[1:])
+        return []
+
+    def _quote(self, symbol):
+        now = time.time()
+        close = self.mock.price(symbol, 60, now // 60 * 60, live=now)
+        previous = self.mock.price(symbol, 86400, now // 86400 * 86400 - 86400)
+        values = {
+            "lp": close, "lp_time": int(now), "ch": round(close - previous, 2),
+            "chp": round((close - previous) / previous * 100, 2), "volume": self.mock.volume(symbol, 86400, now // 86400),
+            "bid": round(close - 0.01, 2), "ask": round(close + 0.01, 2), "current_session": "market",
+            "update_mode": "streaming", "pro_name": symbol, "short_name": symbol.split(":")[-1],
+        }
+        return self._reply("qsd", [self.quote_session, {"n": symbol, "s": "ok", "v": values}])
+
+    def _push(self):
+        # heartbeats and live updates of all series and quote symbols
+        heartbeat = 0
+        next_heartbeat = time.monotonic() + self.mock.heartbeat_interval
+        interval = self.mock.push_interval
+        while not self.closed.wait(interval if interval else self.mock.heartbeat_interval):
+            try:
+                if time.monotonic() >= next_heartbeat:
+                    heartbeat += 1
+                    next_heartbeat += self.mock.heartbeat_interval
+                    self._send_frames([f"~h~{heartbeat}"])
+                if interval:
+                    self._send_frames(self._live_updates())
+            except OSError:
+                break
+
+    def _live_updates(self):
+        now = time.time()
+        payloads = []
+        updates = {}
+        for series_id, series in list(self.series.items()):
+            if series.open_time is None:
+                continue
+            bars = []
+            open_time = now // series.seconds * series.seconds
+            while series.open_time < open_time:  # bars opened since the last push
+                bars.append({"i": series.loaded - 1, "v": self.mock.bar(series.symbol, series.seconds, series.open_time)})
+                series.open_time += series.seconds
+                series.loaded += 1
+            bars.append({"i": series.loaded - 1, "v": self.mock.bar(series.symbol, series.seconds, series.open_time, live=now)})
+            updates[series_id] = {"s": bars}
+        if updates:
+            payloads.append(self._reply("du", [self.chart_session, updates]))
+        payloads.extend(self._quote(symbol) for symbol in list(self.quotes))
+        return payloads
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MockTradingViewServer:
+    """Local TradingView websocket server with deterministic data
+
+    Bars are generated from the symbol, interval and bar time, so repeated
+    requests return the same history and the open bar of every interval
+    moves with the clock. Every connection gets a heartbeat every
+    heartbeat_interval seconds and, every push_interval seconds, du updates
+    of its chart series and qsd updates of its quote symbols. Symbol search
+    is answered over HTTP on the same port. Point a client at it with
+    TvDatafeed(ws_url=server.url, search_url=server.search_url); sign in is
+    not served.
+
+    Args:
+        host (str, optional): interface to listen on. Defaults to "127.0.0.1".
+        port (int, optional): port to listen on, 0 for a free port. Defaults to 0.
+        n_bars (int, optional): history length of every series. Defaults to 20000.
+        latency (float, optional): seconds to wait before answering each client message. Defaults to 0.
+        push_interval (float, optional): seconds between live updates, None to disable them. Defaults to 1.
+        heartbeat_interval (float, optional): seconds between heartbeats. Defaults to 10.
+        failure_rate (float, optional): probability of dropping the connection when a client
+            message arrives. Defaults to 0.
+        stall_after (float, optional): seconds after which a connection stops sending anything,
+            heartbeats included, while staying open. Defaults to None (never).
+        error_symbols (iterable, optional): symbols in EXCHANGE:SYMBOL format answered with
+            symbol_error. Defaults to ().
+        timezone (str, optional): exchange timezone reported in symbol_resolved. Defaults to "Etc/UTC".
+        session (str, optional): trading session reported in symbol_resolved. Defaults to "24x7".
+        seed (int, optional): seed of generated prices and injected failures. Defaults to 0.
+
+    Attributes:
+        stats (Counter): number of connections, received messages by name, injected failures,
+            sent frames and bytes, symbol searches
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        n_bars=20000,
+        latency=0.0,
+        push_interval=1.0,
+        heartbeat_interval=10.0,
+        failure_rate=0.0,
+        stall_after=None,
+        error_symbols=(),
+        timezone="Etc/UTC",
+        session="24x7",
+        seed=0,
+    ):
+        self.host = host
+        self.port = port
+        self.n_bars = n_bars
+        self.latency = latency
+        self.push_interval = push_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.failure_rate = failure_rate
+        self.stall_after = stall_after
+        self.error_symbols = frozenset(error_symbols)
+        self.timezone = timezone
+        self.session = session
+        self.seed = seed
+        self.stats = Counter()
+
+        self._random = random.Random(seed)
+        self._connections = set()
+        self._stats_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/socket.io/websocket"
+
+    @property
+    def search_url(self):
+        """Symbol search url with {} placeholders for text and exchange, like protocol.SEARCH_URL"""
+        return f"http://{self.host}:{self.port}/symbol_search/v3/?text={{}}&exchange={{}}"
+
+    def start(self):
+        """Start serving in a background thread, returns self"""
+        if self._server is None:
+            self._server = _Server((self.host, self.port), _Connection)
+            self._server.mock = self
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(name="mock_server", target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+            logger.info(f"Mock TradingView server listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving and close all connections"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+        self.drop_connections()
+
+    def drop_connections(self):
+        """Close all open connections without a close frame, clients see them as lost
+
+        Returns:
+            int: number of closed connections
+        """
+        connections = list(self._connections)
+        for connection in connections:
+            connection.drop()
+        return len(connections)
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def symbol_info(self, symbol):
+        """Return the symbol_resolved info of a symbol"""
+        exchange, _, name = symbol.rpartition(":")
+        return {
+            "name": name, "exchange": exchange or "MOCK", "listed_exchange": exchange or "MOCK",
+            "description": f"Mock {name}", "type": "stock", "currency_code": "USD",
+            "timezone": self.timezone, "session": self.session, "session_holidays": "",
+            "pricescale": 100, "minmov": 1, "has_intraday": True, "has_seconds": True,
+        }
+
+    def search(self, text, exchange="", limit=10):
+        """Return symbol search results for text, matches are marked with <em> like TradingView does"""
+        text = text.upper()
+        symbols = [
+            {
+                "symbol": f"<em>{text}</em>{suffix}", "description": f"Mock <em>{text}</em>{suffix}",
+                "type": "stock", "exchange": exchange or "MOCK", "currency_code": "USD", "provider_id": "mock",
+            }
+            for suffix in ([""] + [str(i) for i in range(1, limit)] if text else [])
+        ]
+        return {"symbols_remaining": 0, "symbols": symbols}
+
+    def price(self, symbol, seconds, open_time, live=None):
+        """Close price of a bar, or the current price of the open bar if live is the current time"""
+        base = 50 + zlib.crc32(symbol.encode("utf-8")) % 950
+        drift = math.sin(open_time / (seconds * 50.0)) * 0.05 + math.sin(open_time / 86400.0 / 30) * 0.1
+        noise = zlib.crc32(f"{self.seed}:{symbol}:{seconds}:{open_time}:{live and int(live)}".encode("utf-8"))
+        return round(base * (1 + drift) + (noise % 1000 - 500) / 1000.0, 2)
+
+    def volume(self, symbol, seconds, open_time):
+        return float(zlib.crc32(f"{symbol}:{seconds}:{open_time}:v".encode("utf-8")) % 100000)
+
+    def bar(self, symbol, seconds, open_time, live=None):
+        """Return [time, open, high, low, close, volume] of the bar opened at open_time"""
+        open_price = self.price(symbol, seconds, open_time - seconds)
+        close = self.price(symbol, seconds, open_time, live)
+        spread = abs(close - open_price) / 2 + 0.05
+        volume = self.volume(symbol, seconds, open_time)
+        if live is not None:  # the open bar fills up over its duration
+            volume = round(volume * min(1.0, (live - open_time) / seconds), 0)
+        return [open_time, open_price, round(max(open_price, close) + spread, 2), round(min(open_price, close) - spread, 2), close, volume]
+
+    def bars(self, symbol, seconds, skip, n_bars, newest=None):
+        """Return up to n_bars bars oldest first, older than the skip newest bars
+
+        Args:
+            newest (int, optional): open time of the newest bar. Defaults to None (the open bar now).
+        """
+        now = time.time()
+        newest = int(now // seconds * seconds) if newest is None else newest
+        count = max(0, min(n_bars, self.n_bars - skip))
+        first = newest - (skip + count - 1) * seconds
+        bars = [self.bar(symbol, seconds, first + k * seconds) for k in range(count)]
+        if bars and skip == 0:
+            bars[-1] = self.bar(symbol, seconds, newest, live=now)
+        return bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the TradingView websocket endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--n-bars", type=int, default=20000, help="history length of every series")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before answering each message")
+    parser.add_argument("--push-interval", type=float, default=1.0, help="seconds between live updates, 0 to disable")
+    parser.add_argument("--heartbeat-interval", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of dropping a connection per message")
+    parser.add_argument("--stall-after", type=float, default=None, help="seconds after which connections go silent")
+    parser.add_argument("--error-symbol", action="append", default=[], help="symbol answered with symbol_error")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockTradingViewServer(
+        args.host, args.port, n_bars=args.n_bars, latency=args.latency, push_interval=args.push_interval or None,
+        heartbeat_interval=args.heartbeat_interval, failure_rate=args.failure_rate, stall_after=args.stall_after,
+        error_symbols=args.error_symbol,
+    ).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
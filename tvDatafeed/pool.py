@@ -0,0 +1,232 @@
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """Authenticated websocket connection kept open by ConnectionPool
+
+    Holds the websocket together with the chart and quote session ids that
+    were created on it, so the session setup only has to be done once per
+    connection instead of once per request.
+
+    Args:
+        ws: open websocket object
+        token (str): auth token used to authenticate the connection
+        chart_session (str): chart session id created on this connection
+        quote_session (str): quote session id created on this connection
+    """
+
+    def __init__(self, ws, token, chart_session, quote_session):
+        self.ws = ws
+        self.token = token
+        self.chart_session = chart_session
+        self.quote_session = quote_session
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.reused = False  # handed out again after having been released to the pool
+        self._series_counter = 0
+
+    def __repr__(self):
+        return f"PooledConnection({self.chart_session},{self.quote_session})"
+
+    def next_series_ids(self):
+        """Return a new (symbol_id, series_id) pair unique on this connection"""
+        self._series_counter += 1
+        return f"symbol_{self._series_counter}", f"s{self._series_counter}"
+
+    @property
+    def connected(self):
+        return bool(getattr(self.ws, "connected", False))
+
+    def ping(self):
+        """Check that the connection is still usable
+
+        Returns:
+            bool: True if ping could be sent, False otherwise
+        """
+        try:
+            self.ws.ping()
+            return True
+        except Exception as e:
+            logger.debug(f"Ping failed on {self}: {e}")
+            return False
+
+    def close(self):
+        try:
+            self.ws.close()
+        except Exception as e:
+            logger.debug(f"Error while closing {self}: {e}")
+
+
+class ConnectionPool:
+    """Thread-safe pool of authenticated websocket connections
+
+    Connections are created on demand by the factory function up to
+    max_size and handed back to the pool after use. Idle connections are
+    reused most-recently-used first, checked for health before being handed
+    out and closed once they have been idle for longer than idle_timeout.
+
+    Args:
+        factory (callable): function returning a new PooledConnection
+        max_size (int, optional): maximum number of open connections. Defaults to 2.
+        idle_timeout (float, optional): seconds after which an idle connection is closed. Defaults to 60.
+        health_check_interval (float, optional): connections idle for longer than this are pinged
+            before reuse. Defaults to 10.
+    """
+
+    def __init__(self, factory, max_size=2, idle_timeout=60, health_check_interval=10):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # most recently released connection is on the right
+        self._size = 0  # idle plus checked out connections
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return self._size
+
+    def _is_healthy(self, conn, token):
+        # token changes after a refresh, sessions authenticated with the old one are dropped
+        if conn.token != token or not conn.connected:
+            return False
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > self.health_check_interval:
+            return conn.ping()
+        return True
+
+    def _reap_idle(self):
+        # close connections that have been idle for too long, caller must hold the lock
+        now = time.monotonic()
+        expired = [conn for conn in self._idle if now - conn.last_used > self.idle_timeout]
+        for conn in expired:
+            self._idle.remove(conn)
+            self._size -= 1
+        return expired
+
+    def acquire(self, token=None, timeout=None):
+        """Get a connection from the pool, creating one if needed
+
+        Args:
+            token (str, optional): auth token the connection must be authenticated with.
+                Idle connections with a different token are closed. Defaults to None (any token).
+            timeout (float, optional): maximum time to wait for a free connection. Defaults to None (blocking).
+
+        Returns:
+            PooledConnection: connection ready to be used
+
+        Raises:
+            TimeoutError: if no connection became available within timeout
+            RuntimeError: if the pool has been closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            stale = []
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                stale.extend(self._reap_idle())
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._is_healthy(candidate, token if token is not None else candidate.token):
+                        conn = candidate
+                        conn.reused = True
+                        break
+                    stale.append(candidate)
+                    self._size -= 1
+
+                create = conn is None and self._size < self.max_size
+                if create:
+                    self._size += 1  # reserve a slot before creating outside of the lock
+                elif conn is None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a free connection")
+                    self._cond.wait(remaining)
+
+            for old in stale:
+                logger.debug(f"Closing stale connection {old}")
+                old.close()
+
+            if conn is not None:
+                return conn
+
+            if create:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                logger.debug(f"Created pooled connection {conn}, pool size {self._size}")
+                return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool
+
+        Args:
+            conn (PooledConnection): connection acquired from this pool
+            discard (bool, optional): close the connection instead of keeping it,
+                used when its state is unknown after an error. Defaults to False.
+        """
+        conn.last_used = time.monotonic()
+        with self._cond:
+            if discard or self._closed or not conn.connected:
+                self._size -= 1
+                keep = False
+            else:
+                self._idle.append(conn)
+                keep = True
+            self._cond.notify()
+
+        if not keep:
+            logger.debug(f"Discarding pooled connection {conn}")
+            conn.close()
+
+    def close_idle(self):
+        """Close connections that have been idle for longer than idle_timeout
+
+        Returns:
+            int: number of closed connections
+        """
+        with self._cond:
+            expired = self._reap_idle()
+            self._cond.notify_all()
+        for conn in expired:
+            conn.close()
+        return len(expired)
+
+    def clear(self):
+        """Close all idle connections
+
+        Checked out connections are not affected, they are returned to the
+        pool when released unless the pool has been closed.
+        """
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def close(self):
+        """Close all idle connections and refuse new acquisitions"""
+        with self._cond:
+            self._closed = True
+        self.clear()
@@ -0,0 +1,169 @@
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import threading
+import zlib
+from . import protocol
+
+logger = logging.getLogger(__name__)
+
+# consumer id, bar time and open, high, low, close, volume - 52 bytes per bar
+_BAR = struct.Struct("<I6d")
+
+
+def _worker(inbox):
+    # Worker process main loop: keeps the consumers of its shard and calls
+    # their callbacks with one row dataframes rebuilt from packed bars
+    consumers = {}  # consumer id -> [seis, callback, symbol, tz]
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+
+        if isinstance(message, bytes):
+            consumer_id, *values = _BAR.unpack(message)
+            consumer = consumers.get(consumer_id)
+            if consumer is None:
+                continue
+            seis, callback, symbol, tz = consumer
+            if math.isnan(values[5]):
+                values = values[:5]  # bars_to_df sets missing volume to NaN
+            try:
+                callback(seis, protocol.bars_to_df({0: values}, symbol, tz))
+            except Exception:
+                logger.exception(f"Callback {getattr(callback, '__name__', callback)} failed, removing it")
+                consumers.pop(consumer_id, None)
+        elif message[0] == "add":
+            _, consumer_id, seis, callback = message
+            consumers[consumer_id] = [seis, callback, protocol.format_symbol(seis.symbol, seis.exchange, None), None]
+        elif message[0] == "meta":
+            _, consumer_id, symbol, tz = message
+            if consumer_id in consumers:
+                consumers[consumer_id][2:] = [symbol, tz]
+        elif message[0] == "remove":
+            consumers.pop(message[1], None)
+
+
+class ProcessPool:
+    """Worker processes running consumer callbacks outside of the feed process
+
+    Consumers are sharded over the workers by their Seis, so all bars of a
+    Seis are processed in order by the same worker. Bars are sent as 52 byte
+    packed structs instead of pickled dataframes; each worker rebuilds the
+    one row dataframe before calling the callback, so callbacks keep the
+    func(seis, data) prototype. Callbacks must be picklable, i.e. functions
+    defined at module level.
+
+    Args:
+        processes (int, optional): number of worker processes. Defaults to os.cpu_count().
+        start_method (str, optional): multiprocessing start method. Defaults to "spawn",
+            which is safe to use from a process with running threads.
+    """
+
+    def __init__(self, processes=None, start_method="spawn"):
+        context = multiprocessing.get_context(start_method)
+        self.processes = processes or os.cpu_count() or 1
+        self._inboxes = [context.Queue() for _ in range(self.processes)]
+        self._workers = [
+            context.Process(target=_worker, args=(inbox,), name=f"tvdatafeed_worker_{i}", daemon=True)
+            for i, inbox in enumerate(self._inboxes)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def shard(self, seis):
+        """Return the index of the worker processing bars of seis"""
+        key = f"{seis.symbol}:{seis.exchange}:{seis.interval.value}".encode("utf-8")
+        return zlib.crc32(key) % self.processes  # stable, unlike hash() of str
+
+    def _next_id(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def _send(self, shard, message):
+        self._inboxes[shard].put(message)
+
+    def close(self, timeout=None):
+        """Stop the worker processes after they processed all sent bars"""
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+
+class ProcessConsumer:
+    """Consumer whose callback runs in a worker process of a ProcessPool
+
+    Has the interface of Consumer, so it is used by TvDatafeedLive and Seis
+    in the same way. put() packs the bar and sends it to the worker of the
+    shard, so the callback never holds the GIL of the feed process.
+
+    Args:
+        seis (Seis): Seis the consumer receives bars from
+        callback (callable): picklable function called as callback(seis, data) in the worker process
+        pool (ProcessPool): worker processes to run the callback in
+    """
+
+    def __init__(self, seis, callback, pool):
+        self.seis = seis
+        self.callback = callback
+        self.name = callback.__name__ + "_" + seis.symbol + "_" + seis.exchange + "_" + seis.interval.value
+        self._pool = pool
+        self._id = pool._next_id()
+        self._shard = pool.shard(seis)
+        self._meta = None  # (symbol, tz) last sent to the worker
+        self._started = False
+        self._stopped = threading.Event()
+
+    def __repr__(self):
+        return f'ProcessConsumer({repr(self.seis)},{self.callback.__name__})'
+
+    def start(self):
+        # the worker only needs a Seis without its TvDatafeedLive reference
+        seis = type(self.seis)(self.seis.symbol, self.seis.exchange, self.seis.interval)
+        self._pool._send(self._shard, ("add", self._id, seis, self.callback))
+        self._started = True
+
+    def put(self, data):
+        """Send a bar to the worker process
+
+        Args:
+            data (pd.DataFrame): single bar data, None stops the consumer
+        """
+        if data is None:
+            return self.stop()
+        if self._stopped.is_set():
+            return
+
+        meta = (data["symbol"].iloc[0], data.index.tz)
+        if meta != self._meta:
+            self._pool._send(self._shard, ("meta", self._id) + meta)
+            self._meta = meta
+
+        row = data.iloc[0]
+        self._pool._send(self._shard, _BAR.pack(
+            self._id, data.index[0].timestamp(), row["open"], row["high"], row["low"], row["close"], row["volume"]
+        ))
+
+    def stop(self):
+        if not self._stopped.is_set():
+            self._stopped.set()
+            if self._started:
+                self._pool._send(self._shard, ("remove", self._id))
+
+    def join(self, timeout=None):
+        self._stopped.wait(timeout)
+
+    def is_alive(self):
+        return self._started and not self._stopped.is_set()
+
+    def del_consumer(self, timeout=-1):
+        return self.seis.del_consumer(self, timeout)
@@ -0,0 +1,337 @@
+import json
+import logging
+import random
+import re
+import string
+import time
+from array import array
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+WS_URL = "wss://data.tradingview.com/socket.io/websocket"
+WS_ORIGIN = "https://data.tradingview.com"
+SIGN_IN_URL = "https://www.tradingview.com/accounts/signin/"
+SEARCH_URL = "https://symbol-search.tradingview.com/symbol_search/v3/?text={}&hl=1&exchange={}&lang=en&search_type=undefined&domain=production&sort_by_country=IN"
+SIGN_IN_HEADERS = {"Referer": "https://www.tradingview.com"}
+SEARCH_HEADERS = {
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "DNT": "1",
+    "Origin": "https://in.tradingview.com",
+    "Referer": "https://in.tradingview.com/",
+    "Sec-CH-UA": '"Google Chrome";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
+    "Sec-CH-UA-Mobile": "?0",
+    "Sec-CH-UA-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-site",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
+}
+
+QUOTE_FIELDS = [
+    "ch",
+    "chp",
+    "current_session",
+    "description",
+    "local_description",
+    "language",
+    "exchange",
+    "fractional",
+    "is_tradable",
+    "lp",
+    "lp_time",
+    "minmov",
+    "minmove2",
+    "original_name",
+    "pricescale",
+    "pro_name",
+    "short_name",
+    "type",
+    "update_mode",
+    "volume",
+    "currency_code",
+    "rchp",
+    "rtc",
+]
+
+# messages carrying market data, everything else is session or error related
+DATA_MESSAGES = frozenset(("timescale_update", "du", "qsd"))
+
+
+def generate_session(prefix="qs_"):
+    """Generate random session id, qs_ for quote and cs_ for chart sessions"""
+    letters = string.ascii_lowercase
+    return prefix + "".join(random.choice(letters) for i in range(12))
+
+
+def generate_chart_session():
+    return generate_session("cs_")
+
+
+def prepend_header(st):
+    return "~m~" + str(len(st)) + "~m~" + st
+
+
+def construct_message(func, param_list):
+    return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
+
+
+def create_message(func, param_list):
+    return prepend_header(construct_message(func, param_list))
+
+
+class FrameParser:
+    """Incremental parser for the ~m~<len>~m~ framed websocket protocol
+
+    Websocket messages are fed in as they are received, complete frame
+    payloads are returned and an incomplete trailing frame is kept until the
+    rest of it arrives. Every message is scanned once, so parsing time is
+    linear in the amount of received data and only the unfinished frame is
+    held in memory.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add received text and return payloads of all completed frames
+
+        Raises:
+            ValueError: if the data is not in the framed format
+        """
+        if self._buffer:
+            text = self._buffer + text
+            self._buffer = ""
+
+        frames = []
+        pos = 0
+        size = len(text)
+        while pos < size:
+            if not text.startswith("~m~", pos):
+                if "~m~".startswith(text[pos:]):
+                    break  # header is not complete yet
+                raise ValueError(f"invalid frame header at {pos}: {text[pos:pos + 20]!r}")
+            sep = text.find("~m~", pos + 3)
+            if sep < 0:
+                break  # length is not complete yet
+            start = sep + 3
+            end = start + int(text[pos + 3:sep])
+            if end > size:
+                break  # payload is not complete yet
+            frames.append(text[start:end])
+            pos = end
+
+        if pos < size:
+            self._buffer = text[pos:]
+        return frames
+
+    def messages(self, text):
+        """Add received text and yield (payload, message) for each completed frame
+
+        message is the decoded JSON object, or None for heartbeats and
+        payloads which are not JSON objects (e.g. ~h~ heartbeats).
+        """
+        start = time.perf_counter()
+        decoded = [(payload, decode_frame(payload)) for payload in self.feed(text)]
+        metrics.parse_seconds.observe(time.perf_counter() - start, stage="frames")
+        metrics.bytes_received.inc(len(text))
+        metrics.frames_received.inc(len(decoded))
+        yield from decoded
+
+
+def decode_frame(payload):
+    """Decode frame payload, returns None for heartbeats and non JSON payloads"""
+    if payload.startswith("~h~"):
+        return None
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        logger.debug(f"could not decode frame: {payload[:200]}")
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def split_frames(text):
+    """Split a websocket message into the payloads of its ~m~<len>~m~ frames"""
+    return FrameParser().feed(text)
+
+
+class BarCollector:
+    """Collects bars of chart series from decoded messages
+
+    Only timescale_update and du messages are looked at; bars are stored by
+    their index so updates of the last bar replace it instead of adding a row.
+
+    Args:
+        series_ids (iterable, optional): series ids to collect bars for, all if None
+    """
+
+    def __init__(self, series_ids=None):
+        self.series_ids = None if series_ids is None else set(series_ids)
+        self.bars = {}  # series id -> {bar index: [ts, open, high, low, close, volume]}
+
+    def add(self, series_id):
+        if self.series_ids is not None:
+            self.series_ids.add(series_id)
+
+    def pop(self, series_id):
+        """Stop collecting for series and return its bars"""
+        if self.series_ids is not None:
+            self.series_ids.discard(series_id)
+        return self.bars.pop(series_id, {})
+
+    def process(self, message):
+        """Collect bars from message
+
+        Returns:
+            list: series ids which received bars
+        """
+        if message.get("m") not in ("timescale_update", "du"):
+            return []
+
+        params = message.get("p", [])
+        if len(params) < 2 or not isinstance(params[1], dict):
+            return []
+
+        updated = []
+        for series_id, series in params[1].items():
+            if self.series_ids is not None and series_id not in self.series_ids:
+                continue
+            if not isinstance(series, dict) or "s" not in series:
+                continue
+            bars = self.bars.setdefault(series_id, {})
+            for bar in series["s"]:
+                bars[bar["i"]] = bar["v"]
+            updated.append(series_id)
+        return updated
+
+
+def format_symbol(symbol, exchange, contract: int = None):
+    """Return symbol in EXCHANGE:SYMBOL format used by TradingView
+
+    Raises:
+        ValueError: if contract is not an int
+    """
+    if ":" in symbol:
+        pass
+    elif contract is None:
+        symbol = f"{exchange}:{symbol}"
+
+    elif isinstance(contract, int):
+        symbol = f"{exchange}:{symbol}{contract}!"
+
+    else:
+        raise ValueError("not a valid contract")
+
+    return symbol
+
+
+def interval_seconds(interval):
+    """Approximate length of an interval value such as "5S", "15", "1H", "1D" or "1M" in seconds"""
+    match = re.fullmatch(r"(\d*)([SHDWM]?)", interval)
+    if match is None:
+        raise ValueError(f"not a valid interval {interval}")
+    count = int(match.group(1) or 1)
+    unit = {"S": 1, "": 60, "H": 3600, "D": 86400, "W": 7 * 86400, "M": 30 * 86400}[match.group(2)]
+    return count * unit
+
+
+def resolve_symbol_param(symbol, extended_session):
+    return (
+        '={"symbol":"'
+        + symbol
+        + '","adjustment":"splits","session":'
+        + ('"regular"' if not extended_session else '"extended"')
+        + "}"
+    )
+
+
+def index_timezone(timezone, symbol_info=None):
+    """Resolve timezone setting to the timezone of the datetime index
+
+    Args:
+        timezone (str): timezone name, None for local timezone or "exchange"
+        symbol_info (dict, optional): resolved symbol info with the exchange timezone
+
+    Returns:
+        str: timezone name or None for local timezone
+    """
+    if timezone == "exchange":
+        return (symbol_info or {}).get("timezone")  # falls back to local timezone if unknown
+    return timezone
+
+
+def bars_to_df(bars, symbol, tz=None):
+    """Build dataframe from bars of a timescale_update message
+
+    Bars are written in one pass into preallocated float64 column arrays
+    and the timestamps are converted in one vectorized step. Volume is NaN
+    unless a bar has it, as are other values missing from short bars.
+
+    Args:
+        bars (dict): bar index -> [timestamp, open, high, low, close, volume]
+        symbol (str): value for the symbol column
+        tz (str | tzinfo, optional): timezone of the datetime index. Defaults to None (local timezone).
+
+    Returns:
+        pd.DataFrame: dataframe with sohlcv as columns
+    """
+    start = time.perf_counter()
+    size = len(bars)
+    nan = float("nan")
+    columns = tuple(array("d", [nan]) * size for _ in range(6))  # faster to fill item by item than ndarrays
+    timestamps, opens, highs, lows, closes, volumes = columns
+    for row, key in enumerate(sorted(bars)):
+        values = bars[key]
+        try:
+            timestamps[row], opens[row], highs[row], lows[row], closes[row], volumes[row] = values[:6]
+        except (TypeError, ValueError):  # bar without volume or with null values
+            for column, value in zip(columns, values):
+                column[row] = nan if value is None else value
+    timestamps, opens, highs, lows, closes, volumes = (np.frombuffer(column, dtype=np.float64) for column in columns)
+
+    index = pd.to_datetime(timestamps.astype(np.int64), unit="s", utc=True)
+    index = index.tz_convert(tz if tz is not None else tzlocal()).rename("datetime")
+
+    data = pd.DataFrame(
+        {
+            "open": opens,
+            "high": highs,
+            "low": lows,
+            "close": closes,
+            "volume": volumes,
+        },
+        index=index,
+    )
+    data.insert(0, "symbol", value=symbol)
+    metrics.parse_seconds.observe(time.perf_counter() - start, stage="dataframe")
+    return data
+
+
+def create_df(raw_data, symbol, tz=None):
+    """Build dataframe from raw received websocket messages
+
+    Args:
+        raw_data (str): received messages, one per line
+        symbol (str): value for the symbol column
+        tz (str | tzinfo, optional): timezone of the datetime index. Defaults to None (local timezone).
+
+    Returns:
+        pd.DataFrame: dataframe with sohlcv as columns, None if no bars found
+    """
+    parser = FrameParser()
+    collector = BarCollector()
+    for line in raw_data.splitlines():
+        for _, message in parser.messages(line):
+            if message is not None:
+                collector.process(message)
+
+    for bars in collector.bars.values():
+        if bars:
+            return bars_to_df(bars, symbol, tz)
+
+    logger.error("no data, please check the exchange and symbol")
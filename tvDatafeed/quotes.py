@@ -0,0 +1,282 @@
+import logging
+import threading
+from collections import OrderedDict
+from . import protocol
+from .stream import SessionStream
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteSubscription:
+    """Subscriber of live quotes with its own bounded buffer
+
+    The buffer holds the symbols which changed since the subscriber last
+    read them, each at most once. Updates of a symbol which is already
+    pending are merged into it, so a slow subscriber never builds up a
+    backlog and always reads the latest values. Updates are passed to
+    callback in a separate thread if one is given, otherwise they can be
+    read with get(), by iterating the subscription or with
+    ``async for symbol, quote in subscription``.
+
+    Created by TvDatafeed.subscribe_quotes, not for direct use.
+
+    Attributes:
+        symbols (frozenset): subscribed symbols in EXCHANGE:SYMBOL format
+        fields (frozenset): subscribed quote fields, None for all fields
+        coalesced (int): number of updates merged into an already pending update
+    """
+
+    def __init__(self, stream, symbols, fields=None, callback=None):
+        self.symbols = frozenset(symbols)
+        self.fields = None if fields is None else frozenset(fields)
+        self.callback = callback
+        self.coalesced = 0
+
+        self._stream = stream
+        self._pending = OrderedDict()  # symbols with unread updates, oldest first
+        self._cond = threading.Condition()
+        self._closed = False
+        self._loop = None  # event loop and event of an async reader
+        self._event = None
+        self._thread = None
+
+    def __repr__(self):
+        return f"QuoteSubscription({sorted(self.symbols)})"
+
+    def _start(self):
+        if self.callback is not None:
+            name = getattr(self.callback, "__name__", "callback")
+            self._thread = threading.Thread(name=f"quotes_{name}", target=self._run, daemon=True)
+            self._thread.start()
+
+    def _publish(self, symbol, changed):
+        # called by the stream thread with the names of changed fields
+        if self.fields is not None and self.fields.isdisjoint(changed):
+            return
+        with self._cond:
+            if self._closed:
+                return
+            if symbol in self._pending:
+                self.coalesced += 1
+            else:
+                self._pending[symbol] = None
+            self._cond.notify()
+            loop, event = self._loop, self._event
+        if loop is not None:
+            loop.call_soon_threadsafe(event.set)
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def get(self, timeout=None):
+        """Return the next updated symbol and its quote
+
+        Args:
+            timeout (float, optional): maximum time to wait in seconds. Defaults to None (blocking).
+
+        Returns:
+            tuple: (symbol, quote dict), None if timed out or the subscription was closed
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending or self._closed, timeout):
+                return None
+            if not self._pending:
+                return None
+            symbol, _ = self._pending.popitem(last=False)
+        return symbol, self._stream.quote(symbol, self.fields)
+
+    def __iter__(self):
+        while (item := self.get()) is not None:
+            yield item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        import asyncio  # slow to import, only needed by async readers
+
+        with self._cond:
+            if self._event is None:
+                self._loop = asyncio.get_running_loop()
+                self._event = asyncio.Event()
+        while True:
+            self._event.clear()
+            item = self.get(timeout=0)  # checked after clearing so no update is missed
+            if item is not None:
+                return item
+            if self._closed:
+                raise StopAsyncIteration
+            await self._event.wait()
+
+    def _run(self):
+        # callback thread
+        while (item := self.get()) is not None:
+            try:
+                self.callback(*item)
+            except Exception as e:
+                logger.error(f"Error in quote callback {self.callback}: {e}")
+
+    def close(self):
+        """Unsubscribe and stop the callback thread"""
+        self._stream.unsubscribe(self)
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+            loop, event = self._loop, self._event
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class QuoteStream(SessionStream):
+    """Long-lived quote session decoding pushed ``qsd`` updates
+
+    Keeps the latest value of every quote field per symbol and passes the
+    names of changed fields to the subscriptions of the symbol. A symbol is
+    added to the quote session while at least one subscription uses it.
+    Listeners added with add_listener see every update without coalescing.
+
+    Args:
+        open_connection (callable): function returning a new authenticated PooledConnection
+        max_reconnect_delay (float, optional): maximum seconds between reconnect attempts. Defaults to 30.
+        read_timeout (float, optional): seconds without any received frame after which the
+            connection is considered stalled and reopened. Defaults to 30.
+    """
+
+    _thread_name = "quote_stream"
+
+    def __init__(self, open_connection, max_reconnect_delay=30, read_timeout=30):
+        super().__init__(open_connection, max_reconnect_delay, read_timeout)
+        self._fields = list(protocol.QUOTE_FIELDS)
+        self._state = {}  # symbol -> {field: latest value}
+        self._symbols = {}  # symbol -> number of subscriptions
+        self._subscriptions = []
+        self._listeners = []
+
+    def quote(self, symbol, fields=None):
+        """Return a copy of the latest quote values of a symbol"""
+        with self._lock:
+            values = self._state.get(symbol, {})
+            if fields is None:
+                return dict(values)
+            return {field: values[field] for field in fields if field in values}
+
+    def subscribe(self, symbols, fields=None, callback=None):
+        """Create a subscription, see TvDatafeed.subscribe_quotes"""
+        subscription = QuoteSubscription(self, symbols, fields, callback)
+        with self._lock:
+            new_fields = [field for field in (fields or ()) if field not in self._fields]
+            if new_fields:
+                self._fields += new_fields
+                if self._conn is not None:
+                    self._send_if_connected("quote_set_fields", [self._conn.quote_session] + self._fields)
+
+            new_symbols = []
+            for symbol in subscription.symbols:
+                if not self._symbols.get(symbol):
+                    new_symbols.append(symbol)
+                self._symbols[symbol] = self._symbols.get(symbol, 0) + 1
+            self._subscriptions.append(subscription)
+
+            if new_symbols and self._conn is not None:
+                self._send_if_connected("quote_add_symbols", [self._conn.quote_session] + new_symbols)
+                self._send_if_connected("quote_fast_symbols", [self._conn.quote_session] + new_symbols)
+
+            for symbol in subscription.symbols:  # deliver the current state of known symbols right away
+                if symbol in self._state:
+                    subscription._publish(symbol, self._state[symbol].keys())
+
+        subscription._start()
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.remove(subscription)
+
+            removed = []
+            for symbol in subscription.symbols:
+                self._symbols[symbol] -= 1
+                if not self._symbols[symbol]:
+                    del self._symbols[symbol]
+                    self._state.pop(symbol, None)
+                    removed.append(symbol)
+
+            if removed and self._conn is not None:
+                self._send_if_connected("quote_remove_symbols", [self._conn.quote_session] + removed)
+
+    def add_listener(self, listener):
+        """Call listener(symbol, quote, changed) for every update of a subscribed symbol
+
+        Unlike subscriptions, listeners see every update, e.g. to build bars
+        from all traded prices. They are called in the stream thread with the
+        latest values of all fields and the changed values, so they must
+        return quickly.
+
+        Args:
+            listener (callable): function to call
+
+        Returns:
+            callable: listener
+        """
+        with self._lock:
+            self._listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def _setup(self, conn):
+        self._send(conn, "quote_set_fields", [conn.quote_session] + self._fields)
+        if self._symbols:
+            self._send(conn, "quote_add_symbols", [conn.quote_session] + list(self._symbols))
+            self._send(conn, "quote_fast_symbols", [conn.quote_session] + list(self._symbols))
+        logger.debug(f"Quote stream connected with {len(self._symbols)} symbols")
+
+    def _on_message(self, message):
+        func = message.get("m")
+        params = message.get("p", [])
+        if func == "qsd":
+            update = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+            symbol = update.get("n")
+            if update.get("s") not in (None, "ok"):
+                logger.warning(f"Quote error for {symbol}: {update}")
+                return
+            changed = update.get("v") or {}
+            with self._lock:
+                if symbol not in self._symbols or not changed:
+                    return
+                quote = self._state.setdefault(symbol, {})
+                quote.update(changed)
+                subscriptions = [sub for sub in self._subscriptions if symbol in sub.symbols]
+                listeners = list(self._listeners)
+                if listeners:
+                    quote = dict(quote)
+            for listener in listeners:
+                try:
+                    listener(symbol, quote, changed)
+                except Exception as e:
+                    logger.error(f"Error in quote listener {listener}: {e}")
+            for subscription in subscriptions:
+                subscription._publish(symbol, changed.keys())
+        elif func in ("critical_error", "protocol_error"):
+            raise ConnectionError(f"{func} from server: {params}")
@@ -0,0 +1,228 @@
+import gzip
+import logging
+import struct
+import threading
+import time
+from websocket import WebSocketConnectionClosedException, WebSocketTimeoutException, create_connection
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"TVWSLOG1"
+# seconds since recording started, connection number, direction, payload length
+_RECORD = struct.Struct("<dIBI")
+OPEN, RECV, SEND = 0, 1, 2
+
+
+def _open(path, mode):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def read_log(path):
+    """Read a frame log written by FrameRecorder
+
+    Args:
+        path (str): log file, gzip compressed if it ends with .gz
+
+    Yields:
+        tuple: (seconds since recording started, connection number, direction, payload), direction is
+            OPEN when the connection was opened, RECV for received and SEND for sent frames
+    """
+    with _open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a websocket frame log")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            offset, connection, direction, length = _RECORD.unpack(header)
+            yield offset, connection, direction, f.read(length).decode("utf-8")
+
+
+class _RecordingWebSocket:
+    # websocket proxy writing every sent and received message to the recorder
+    def __init__(self, ws, recorder, connection):
+        self._ws = ws
+        self._recorder = recorder
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+    def send(self, payload, *args, **kwargs):
+        self._recorder._write(self._connection, SEND, payload)
+        return self._ws.send(payload, *args, **kwargs)
+
+    def recv(self):
+        payload = self._ws.recv()
+        self._recorder._write(self._connection, RECV, payload)
+        return payload
+
+
+class FrameRecorder:
+    """Records the raw websocket messages of every connection to a log file
+
+    Use create_connection as the ws_factory of TvDatafeed; every opened
+    connection is numbered and all messages sent and received on it are
+    written with their time, so the session can be replayed later with
+    FrameReplayer. Records are a 17 byte header plus the payload, the file
+    is gzip compressed if its name ends with .gz.
+
+    Args:
+        path (str): log file to write, replaced if it exists
+        factory (callable, optional): function opening the real websocket, called with the
+            arguments of websocket.create_connection. Defaults to websocket.create_connection.
+
+    Example:
+        recorder = FrameRecorder("session.tvlog.gz")
+        tv = TvDatafeed(ws_factory=recorder.create_connection)
+        tv.get_hist("BTCUSDT", "BINANCE", Interval.in_1_minute, n_bars=5000)
+        recorder.close()
+    """
+
+    def __init__(self, path, factory=None):
+        self.path = path
+        self._factory = factory or create_connection
+        self._file = _open(path, "wb")
+        self._file.write(_MAGIC)
+        self._start = time.monotonic()
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write(self, connection, direction, payload):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(time.monotonic() - self._start, connection, direction, len(payload)))
+            self._file.write(payload)
+
+    def create_connection(self, url, **kwargs):
+        """Open a websocket with the factory and record its messages"""
+        ws = self._factory(url, **kwargs)
+        with self._lock:
+            self._connections += 1
+            connection = self._connections
+        self._write(connection, OPEN, url)
+        return _RecordingWebSocket(ws, self, connection)
+
+    def close(self):
+        """Finish the log file, connections opened by the recorder are no longer recorded"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _ReplayWebSocket:
+    # plays back the received messages of one recorded connection
+    def __init__(self, frames, speed, timeout=None):
+        self._frames = frames  # [(seconds since the connection was opened, payload)]
+        self._position = 0
+        self._speed = speed
+        self._timeout = timeout
+        self._opened = time.monotonic()
+        self.connected = True
+        self.sent = 0
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def send(self, payload, *args, **kwargs):
+        if not self.connected:
+            raise WebSocketConnectionClosedException("socket is already closed.")
+        self.sent += 1  # the recorded answers are played back whatever is sent
+
+    def ping(self, payload=""):
+        if not self.connected:
+            raise WebSocketConnectionClosedException("socket is already closed.")
+
+    def recv(self):
+        if not self.connected:
+            raise WebSocketConnectionClosedException("socket is already closed.")
+        if self._position >= len(self._frames):
+            self.connected = False
+            raise WebSocketConnectionClosedException("Connection to remote host was lost.")
+
+        offset, payload = self._frames[self._position]
+        if self._speed:
+            wait = self._opened + offset / self._speed - time.monotonic()
+            if self._timeout is not None and wait > self._timeout:
+                time.sleep(self._timeout)
+                raise WebSocketTimeoutException("timed out")
+            if wait > 0:
+                time.sleep(wait)
+        self._position += 1
+        return payload
+
+    def close(self, *args, **kwargs):
+        self.connected = False
+
+
+class FrameReplayer:
+    """Plays back a frame log recorded by FrameRecorder as websocket connections
+
+    Use create_connection as the ws_factory of TvDatafeed; connections are
+    handed out in the order they were recorded and each one returns the
+    messages received on the recorded connection, through the same parsing
+    path as live data. Sent messages are accepted and ignored, so replaying
+    gives the recorded results as long as the same calls are made in the
+    same order.
+
+    Args:
+        path (str): log file written by FrameRecorder
+        speed (float, optional): playback speed relative to the recording, 1 for recorded
+            speed. Defaults to None (as fast as possible).
+
+    Raises:
+        ValueError: if path is not a frame log
+
+    Example:
+        replayer = FrameReplayer("session.tvlog.gz")
+        tv = TvDatafeed(ws_factory=replayer.create_connection)
+        data = tv.get_hist("BTCUSDT", "BINANCE", Interval.in_1_minute, n_bars=5000)
+    """
+
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+        self._opened = {}  # connection -> time it was opened
+        self._frames = {}  # connection -> [(seconds since opened, payload)] of received messages
+        for offset, connection, direction, payload in read_log(path):
+            if direction == OPEN:
+                self._opened[connection] = offset
+                self._frames[connection] = []
+            elif direction == RECV and connection in self._frames:
+                self._frames[connection].append((offset - self._opened[connection], payload))
+        self._order = sorted(self._opened, key=self._opened.get)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._order)
+
+    def frames(self, connection=None):
+        """Return the received payloads of one or all recorded connections, e.g. to profile parsing"""
+        connections = self._order if connection is None else [connection]
+        return [payload for number in connections for _, payload in self._frames[number]]
+
+    def create_connection(self, url=None, timeout=None, **kwargs):
+        """Return the next recorded connection
+
+        Raises:
+            ConnectionError: if all recorded connections were used
+        """
+        with self._lock:
+            if not self._order:
+                raise ConnectionError(f"No more recorded connections in {self.path}")
+            connection = self._order.pop(0)
+        logger.debug(f"Replaying connection {connection} of {self.path}")
+        return _ReplayWebSocket(self._frames[connection], self.speed, timeout)
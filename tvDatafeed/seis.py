@@ -19,7 +19,7 @@ class Seis(object):
     
     Methods
     -------
-    new_consumer(callback)
+    new_consumer(callback, timeout, maxsize, policy)
         Create a new consumer and add to Seis
     del_consumer(consumer)
         Remove consumer from Seis
@@ -53,6 +53,11 @@ class Seis(object):
         
         return False
     
+    def __hash__(self):
+        # Hash of the same attributes which are compared for equality, so
+        # Seis instances can be used as dict keys and set members
+        return hash((self.symbol, self.exchange, self.interval))
+    
     def __repr__(self):
         return f'Seis("{self._symbol}","{self._exchange}",{self._interval})'
     
@@ -88,7 +93,7 @@ class Seis(object):
     def tvdatafeed(self):
         self._tvdatafeed=None
     
-    def new_consumer(self, callback, timeout=-1):
+    def new_consumer(self, callback, timeout=-1, maxsize=0, policy="block"):
         '''
         Create a new consumer and add to Seis
         
@@ -99,6 +104,12 @@ class Seis(object):
         timeout : int, optional
             maximum time to wait in seconds for return, default
             is -1 (blocking)
+        maxsize : int, optional
+            maximum number of bars waiting for the callback, 0 for
+            unbounded (default 0)
+        policy : str, optional
+            "block", "drop_oldest", "drop_newest" or "coalesce", see
+            Consumer (default "block")
         
         Returns
         -------
@@ -114,7 +125,7 @@ class Seis(object):
         if self._tvdatafeed is None:
             raise NameError("TvDatafeed not provided")
         
-        return self._tvdatafeed.new_consumer(self, callback, timeout) # methods go through tvdatafeed to acquire lock and make it thread safe
+        return self._tvdatafeed.new_consumer(self, callback, timeout, maxsize, policy) # methods go through tvdatafeed to acquire lock and make it thread safe
     
     def del_consumer(self, consumer, timeout=-1):
         '''
@@ -0,0 +1,158 @@
+import logging
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from . import protocol
+
+logger = logging.getLogger(__name__)
+
+_WEEKDAYS = "23456"  # TradingView day numbers, 1 is Sunday and 7 is Saturday
+
+
+class TradingSession:
+    """Trading hours and holidays of a symbol in its exchange timezone
+
+    Parses the session strings TradingView sends in symbol_resolved, e.g.
+    "0915-1530" (Monday to Friday), "0930-1600:23456", "0930-1200,1300-1500",
+    "1700-1600:23456" (overnight, starting the evening before) or "24x7",
+    and the session_holidays list of YYYYMMDD dates. Knows when a bar of a
+    given interval can close: intraday bars are aligned to the session open
+    and the last bar of a session closes at the session close, daily bars
+    close at the end of each trading day, weekly and monthly bars at the
+    end of the last trading day of the week or month.
+
+    Args:
+        session (str): TradingView session string
+        timezone (str): exchange timezone name, e.g. "Asia/Kolkata"
+        holidays (iterable, optional): closed dates as YYYYMMDD strings. Defaults to ().
+
+    Raises:
+        ValueError: if session string can not be parsed
+    """
+
+    _search_days = 40  # how far ahead to look for the next trading day
+
+    def __init__(self, session, timezone, holidays=()):
+        self.session = session
+        self.timezone = timezone
+        self.holidays = frozenset(datetime.strptime(day, "%Y%m%d").date() for day in holidays if day)
+        self.tz = ZoneInfo(timezone)
+        self._ranges = self._parse(session)  # (TradingView days, start minute, end minute)
+        self._cache = {}  # date -> sessions of that trading day
+
+    def __repr__(self):
+        return f"TradingSession('{self.session}','{self.timezone}')"
+
+    def __eq__(self, other):
+        return isinstance(other, TradingSession) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return (self.session, self.timezone, self.holidays)
+
+    @classmethod
+    def from_symbol_info(cls, symbol_info):
+        """Create from symbol_resolved info, None if it has no usable session"""
+        if not symbol_info or not symbol_info.get("session") or not symbol_info.get("timezone"):
+            return None
+        holidays = [day for day in symbol_info.get("session_holidays", "").split(",") if day]
+        try:
+            return cls(symbol_info["session"], symbol_info["timezone"], holidays)
+        except (ValueError, KeyError) as e:  # ZoneInfoNotFoundError is a KeyError
+            logger.debug(f"Can not use session {symbol_info.get('session')}: {e}")
+            return None
+
+    @staticmethod
+    def _parse(session):
+        if session == "24x7":
+            session = "0000-0000:1234567"
+        ranges = []
+        for part in session.split("|"):
+            times, _, days = part.partition(":")
+            days = frozenset(int(day) for day in (days or _WEEKDAYS))
+            for span in times.split(","):
+                match = re.fullmatch(r"(\d\d)(\d\d)-(\d\d)(\d\d)", span)
+                if match is None:
+                    raise ValueError(f"not a valid session {session}")
+                start_h, start_m, end_h, end_m = (int(value) for value in match.groups())
+                ranges.append((days, start_h * 60 + start_m, end_h * 60 + end_m))
+        return ranges
+
+    def sessions(self, day):
+        """Return (open, close) datetimes of the sessions of a trading day, empty on holidays"""
+        if day in self._cache:
+            return self._cache[day]
+
+        result = []
+        if day not in self.holidays:
+            weekday = day.isoweekday() % 7 + 1
+            midnight = datetime(day.year, day.month, day.day, tzinfo=self.tz)
+            for days, start, end in self._ranges:
+                if weekday not in days:
+                    continue
+                if start == end == 0:  # whole day
+                    result.append((midnight, midnight + timedelta(days=1)))
+                elif start >= end:  # overnight session opens the day before
+                    result.append((midnight - timedelta(days=1, minutes=-start), midnight + timedelta(minutes=end)))
+                else:
+                    result.append((midnight + timedelta(minutes=start), midnight + timedelta(minutes=end)))
+            result.sort()
+
+        if len(self._cache) > 64:
+            self._cache.clear()
+        self._cache[day] = result
+        return result
+
+    def is_open(self, when):
+        """True if the market is open at the timezone aware datetime when"""
+        day = when.astimezone(self.tz).date()
+        return any(
+            open_dt <= when < close_dt
+            for offset in (0, 1)  # overnight sessions of the next trading day
+            for open_dt, close_dt in self.sessions(day + timedelta(days=offset))
+        )
+
+    def _is_period_end(self, day, unit):
+        # True if day is the last trading day of its week or month
+        if unit == "D":
+            return True
+        for offset in range(1, self._search_days):
+            following = day + timedelta(days=offset)
+            if self.sessions(following):
+                if unit == "W":
+                    return following.isocalendar()[:2] != day.isocalendar()[:2]
+                return following.month != day.month
+        return True
+
+    def next_bar_close(self, after, interval):
+        """Return when the next bar of interval closes after a datetime
+
+        Args:
+            after (datetime): timezone aware datetime
+            interval (str): interval value, e.g. "5S", "15", "1H", "1D", "1W" or "1M"
+
+        Returns:
+            datetime: close time of the next bar, None if no trading day was found
+        """
+        unit = interval[-1] if interval[-1] in "DWM" else None
+        length = None if unit else timedelta(seconds=protocol.interval_seconds(interval))
+        day = after.astimezone(self.tz).date() - timedelta(days=1)  # overnight sessions started the day before
+
+        for _ in range(self._search_days):
+            sessions = self.sessions(day)
+            if unit is not None:
+                if sessions and sessions[-1][1] > after and self._is_period_end(day, unit):
+                    return sessions[-1][1]
+            else:
+                for open_dt, close_dt in sessions:
+                    if close_dt <= after:
+                        continue
+                    if after < open_dt:
+                        return min(open_dt + length, close_dt)
+                    bars = (after - open_dt) // length + 1
+                    return min(open_dt + bars * length, close_dt)
+            day += timedelta(days=1)
+
+        return None
@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+from . import protocol
+from .supervisor import ConnectionSupervisor
+
+logger = logging.getLogger(__name__)
+
+
+class _Series:
+    # streaming state of one Seis on a chart session
+    def __init__(self, seis, symbol_id, series_id):
+        self.seis = seis
+        self.symbol_id = symbol_id
+        self.series_id = series_id
+        self.symbol = protocol.format_symbol(seis.symbol, seis.exchange, None)
+        self.interval_seconds = protocol.interval_seconds(seis.interval.value)
+        self.symbol_info = None
+        self.bar = None  # values of the currently open bar, [ts, o, h, l, c, v]
+        self.emitted = None  # timestamp of the last bar delivered as closed
+        self.ready = False  # initial snapshot received, bar changes from now on are live
+
+
+class SessionStream:
+    """Base of streams reading pushed messages from a long-lived websocket
+
+    Runs a reader thread on a ConnectionSupervisor, which opens an
+    authenticated connection, answers heartbeats and reopens the connection
+    with jittered exponential backoff if it drops or nothing was received
+    for read_timeout seconds. The subclass creates its sessions in _setup,
+    which is called again on every new connection, so subclasses must keep
+    enough state to recreate their sessions. Every decoded message is
+    passed to _on_message and _on_idle is called after every received frame
+    and at least once per second.
+
+    Args:
+        open_connection (callable): function returning a new authenticated PooledConnection
+        max_reconnect_delay (float, optional): maximum seconds between reconnect attempts. Defaults to 30.
+        read_timeout (float, optional): seconds without any received frame after which the
+            connection is considered stalled and reopened. Defaults to 30.
+    """
+
+    _recv_timeout = 1  # seconds, also the resolution of _on_idle calls
+    _thread_name = "session_stream"
+
+    def __init__(self, open_connection, max_reconnect_delay=30, read_timeout=30):
+        self._open_connection = open_connection
+        self.max_reconnect_delay = max_reconnect_delay
+        self.read_timeout = read_timeout
+
+        self._supervisor = None
+        self._conn = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def reconnects(self):
+        """Number of times the connection was reopened"""
+        return 0 if self._supervisor is None else self._supervisor.reconnects
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._supervisor = ConnectionSupervisor(
+                self._open_connection,
+                on_connect=self._connect,
+                on_disconnect=self._disconnect,
+                read_timeout=self.read_timeout,
+                max_reconnect_delay=self.max_reconnect_delay,
+                poll_interval=self._recv_timeout,
+            )
+            self._thread = threading.Thread(name=self._thread_name, target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the reader thread and close the connection"""
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.close()  # unblocks recv
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _send(self, conn, func, args):
+        conn.ws.send(protocol.create_message(func, args))
+
+    def _send_if_connected(self, func, args):
+        # send on the current connection, lock must be held; sessions are recreated on reconnect anyway
+        if self._conn is None:
+            return
+        try:
+            self._send(self._conn, func, args)
+        except Exception as e:
+            logger.debug(f"Could not send {func}, it is replayed on reconnect: {e}")
+
+    def _setup(self, conn):
+        # create sessions on a new connection, called with the lock held
+        raise NotImplementedError
+
+    def _on_message(self, message):
+        raise NotImplementedError
+
+    def _on_idle(self):
+        pass
+
+    def _connect(self, conn):
+        # called by the supervisor for every new connection
+        with self._lock:
+            self._setup(conn)
+            self._conn = conn
+
+    def _disconnect(self, conn, reason):
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+
+    def _run(self):
+        supervisor = self._supervisor
+        while not self._stop.is_set():
+            try:
+                for message in supervisor.recv():
+                    self._on_message(message)
+            except ConnectionError as e:  # reported by the server, start over on a new connection
+                supervisor.reconnect(e)
+            except Exception as e:
+                logger.error(f"Error in {self._thread_name}: {e}")
+            self._on_idle()
+
+
+class ChartStream(SessionStream):
+    """Long-lived chart session streaming live bars of many Seis
+
+    All Seis are added as series on one chart session of a single websocket
+    connection. TradingView pushes every change of the open bar in ``du``
+    messages; when a bar with a newer timestamp appears, the previous bar
+    has closed and it is delivered to on_bar right away. Intraday bars of
+    symbols without trades after the close are delivered once their end
+    time plus close_grace has passed. The connection is reopened with
+    jittered exponential backoff and all series are re-added if it drops or
+    stalls. Open bars are kept over a reconnect and series are re-added with
+    enough bars to cover the outage, so bars which closed while disconnected
+    are still delivered, in order.
+
+    Args:
+        open_connection (callable): function returning a new authenticated PooledConnection
+        on_bar (callable): called as on_bar(seis, data) with a one row dataframe of the closed bar
+        timezone (str, optional): timezone of the datetime index, "exchange" for exchange time.
+            Defaults to None (local timezone).
+        close_grace (float, optional): seconds after the end of an intraday bar after which it is
+            delivered even if no newer bar was pushed. Defaults to 2.
+        max_reconnect_delay (float, optional): maximum seconds between reconnect attempts. Defaults to 30.
+        read_timeout (float, optional): seconds without any received frame after which the
+            connection is considered stalled and reopened. Defaults to 30.
+    """
+
+    _thread_name = "chart_stream"
+    _max_bars = 5000  # most bars a series can be created with
+
+    def __init__(self, open_connection, on_bar, timezone=None, close_grace=2, max_reconnect_delay=30, read_timeout=30):
+        super().__init__(open_connection, max_reconnect_delay, read_timeout)
+        self._on_bar = on_bar
+        self.timezone = timezone
+        self.close_grace = close_grace
+
+        self._series = {}  # series_id -> _Series
+        self._keys = {}  # (symbol, exchange, interval) -> series_id
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._series)
+
+    @staticmethod
+    def _key(seis):
+        return (seis.symbol, seis.exchange, seis.interval.value)
+
+    def __contains__(self, seis):
+        return self._key(seis) in self._keys
+
+    def add(self, seis):
+        """Start streaming bars of the Seis"""
+        with self._lock:
+            if seis in self:
+                return
+            self._counter += 1
+            series = _Series(seis, f"symbol_{self._counter}", f"s{self._counter}")
+            self._series[series.series_id] = series
+            self._keys[self._key(seis)] = series.series_id
+            if self._conn is not None:
+                try:
+                    self._create_series(self._conn, series)
+                except Exception as e:
+                    logger.debug(f"Could not add {seis}, it is added on reconnect: {e}")
+
+    def remove(self, seis):
+        """Stop streaming bars of the Seis"""
+        with self._lock:
+            series_id = self._keys.pop(self._key(seis), None)
+            if series_id is None:
+                return
+            self._series.pop(series_id)
+            if self._conn is not None:
+                self._send_if_connected("remove_series", [self._conn.chart_session, series_id])
+
+    def _create_series(self, conn, series):
+        n_bars = 2
+        if series.bar is None:
+            series.ready = False
+        else:  # re-added after a reconnect, bars newer than the kept open bar are live
+            missed = int((time.time() - series.bar[0]) // series.interval_seconds)
+            n_bars = max(2, min(missed + 2, self._max_bars))
+            series.ready = True
+        self._send(conn, "resolve_symbol", [
+            conn.chart_session, series.symbol_id, protocol.resolve_symbol_param(series.symbol, False)
+        ])
+        self._send(conn, "create_series", [
+            conn.chart_session, series.series_id, series.series_id, series.symbol_id, series.seis.interval.value, n_bars
+        ])
+
+    def _setup(self, conn):
+        self._send(conn, "switch_timezone", [conn.chart_session, "exchange"])
+        for series in self._series.values():
+            self._create_series(conn, series)
+        logger.debug(f"Chart stream connected with {len(self._series)} series")
+
+    def _on_message(self, message):
+        self._deliver(self._process(message))
+
+    def _on_idle(self):
+        self._deliver(self._closed_expired())
+
+    def _process(self, message):
+        # update series state, returns closed bars as (series, values) pairs
+        func = message.get("m")
+        params = message.get("p", [])
+        closed = []
+        with self._lock:
+            if func in ("timescale_update", "du"):
+                if len(params) < 2 or not isinstance(params[1], dict):
+                    return closed
+                for series_id, update in params[1].items():
+                    series = self._series.get(series_id)
+                    if series is None or not isinstance(update, dict):
+                        continue
+                    for bar in sorted(update.get("s", []), key=lambda bar: bar["i"]):
+                        self._update(series, bar["v"], closed)
+            elif func == "series_completed":
+                series = self._series.get(params[1])
+                if series is not None:
+                    series.ready = True
+            elif func == "symbol_resolved":
+                for series in self._series.values():
+                    if series.symbol_id == params[1]:
+                        series.symbol_info = params[2]
+            elif func in ("symbol_error", "series_error"):
+                logger.warning(f"{func} in chart stream: {params[1:]}")
+            elif func in ("critical_error", "protocol_error"):
+                raise ConnectionError(f"{func} from server: {params}")
+        return closed
+
+    def _update(self, series, values, closed):
+        if series.bar is None or values[0] == series.bar[0]:
+            series.bar = values
+        elif values[0] > series.bar[0]:
+            if series.ready:
+                closed.append((series, series.bar))
+            series.bar = values
+
+    def _closed_expired(self):
+        # intraday bars whose end time has passed without a newer bar being pushed
+        now = time.time()
+        closed = []
+        with self._lock:
+            for series in self._series.values():
+                if (
+                    series.ready
+                    and series.bar is not None
+                    and series.interval_seconds < 86400  # daily and longer bars follow trading sessions
+                    and now >= series.bar[0] + series.interval_seconds + self.close_grace
+                    and series.emitted != series.bar[0]
+                ):
+                    closed.append((series, series.bar))
+        return closed
+
+    def _deliver(self, closed):
+        # called without holding the lock, on_bar may block on locks of the caller
+        for series, values in closed:
+            with self._lock:
+                if series.emitted is not None and values[0] <= series.emitted:
+                    continue  # already delivered by the close timer
+                series.emitted = values[0]
+                tz = protocol.index_timezone(self.timezone, series.symbol_info)
+            data = protocol.bars_to_df({0: values}, series.symbol, tz)
+            try:
+                self._on_bar(series.seis, data)
+            except Exception as e:
+                logger.error(f"Error delivering bar of {series.seis}: {e}")
@@ -0,0 +1,334 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from websocket import WebSocketTimeoutException
+from . import metrics, protocol
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    """Exponential backoff with jitter between reconnect attempts
+
+    Delays double from base up to max_delay. Each delay is drawn uniformly
+    from its upper half, so many clients losing their connections at the
+    same time do not reconnect in lockstep.
+
+    Args:
+        base (float, optional): first delay in seconds. Defaults to 1.
+        max_delay (float, optional): maximum delay in seconds. Defaults to 30.
+    """
+
+    def __init__(self, base=1, max_delay=30):
+        self.base = base
+        self.max_delay = max_delay
+        self.attempts = 0
+
+    def next(self):
+        """Return the delay before the next attempt and count the attempt"""
+        delay = min(self.base * 2 ** self.attempts, self.max_delay)
+        self.attempts += 1
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class ConnectionSupervisor:
+    """Keeps one authenticated websocket connection alive for long-lived sessions
+
+    Answers TradingView heartbeats, treats a connection on which nothing
+    was received for read_timeout seconds as stalled and reopens dropped or
+    stalled connections with jittered exponential backoff. After every
+    reconnect on_connect is called with the new connection, then the
+    session journal is replayed: chart and quote session messages sent with
+    send() (resolve_symbol, create_series, modify_series, switch_timezone,
+    quote_set_fields, quote_add_symbols, ...) are recorded and sent again,
+    and entries cancelled by remove_series, quote_remove_symbols or a
+    session delete are dropped from it. The session ids of the first
+    connection stay valid for the lifetime of the supervisor: they are
+    translated to the ids of the current connection in sent messages and
+    back in received ones, so callers do not notice a reconnect apart from
+    the snapshots the server sends for the restored series.
+
+    Args:
+        open_connection (callable): function returning a new authenticated PooledConnection
+        on_connect (callable, optional): called as on_connect(conn) after every (re)connect,
+            before the journal is replayed. Defaults to None.
+        on_disconnect (callable, optional): called as on_disconnect(conn, reason) when a
+            connection is dropped. Defaults to None.
+        read_timeout (float, optional): seconds without any received frame, heartbeats
+            included, after which the connection is considered stalled. Defaults to 30.
+        max_reconnect_delay (float, optional): maximum seconds between reconnect attempts. Defaults to 30.
+        poll_interval (float, optional): maximum seconds recv() blocks. Defaults to 1.
+
+    Attributes:
+        reconnects (int): number of connections opened after the first one
+    """
+
+    _replaced = ("switch_timezone", "quote_set_fields")  # only the last one is kept per session
+    _series_messages = ("create_series", "modify_series")
+    _quote_symbols = ("quote_add_symbols", "quote_fast_symbols")
+    _session_messages = ("chart_create_session", "quote_create_session")
+    _session_deletes = ("chart_delete_session", "quote_delete_session")
+
+    def __init__(
+        self,
+        open_connection,
+        on_connect=None,
+        on_disconnect=None,
+        read_timeout=30,
+        max_reconnect_delay=30,
+        poll_interval=1,
+    ):
+        self._open_connection = open_connection
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.read_timeout = read_timeout
+        self.poll_interval = poll_interval
+        self.reconnects = 0
+
+        self._backoff = Backoff(max_delay=max_reconnect_delay)
+        self._retry_at = 0  # monotonic time of the next connection attempt
+        self._conn = None
+        self._parser = None
+        self._last_frame = None
+        self._received = False  # a frame was received on the current connection
+        self._sessions = None  # stable (chart session, quote session) ids of the first connection
+        self._actual = {}  # stable session id -> session id on the current connection
+        self._stable = {}  # session id on the current connection -> stable session id
+        self._counter = 0
+        self._journal = OrderedDict()  # key -> [func, args] with stable session ids
+        self._lock = threading.RLock()
+        self._connect_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def connected(self):
+        conn = self._conn
+        return conn is not None and conn.connected
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    @property
+    def chart_session(self):
+        """Chart session id, stays the same across reconnects; connects if needed"""
+        self._ensure_connected()
+        return None if self._sessions is None else self._sessions[0]
+
+    @property
+    def quote_session(self):
+        """Quote session id, stays the same across reconnects; connects if needed"""
+        self._ensure_connected()
+        return None if self._sessions is None else self._sessions[1]
+
+    def next_series_ids(self):
+        """Return a new (symbol_id, series_id) pair unique on this supervisor"""
+        with self._lock:
+            self._counter += 1
+            return f"symbol_{self._counter}", f"s{self._counter}"
+
+    def _record(self, func, args):
+        # add a session message to the journal or drop the entries it cancels, lock must be held
+        session = args[0] if args else None
+        if func in self._replaced or func in self._session_messages:
+            self._journal[(func, session)] = [func, list(args)]
+        elif func == "resolve_symbol" or func in self._series_messages:
+            self._journal[(func, session, args[1])] = [func, list(args)]
+        elif func == "remove_series":
+            symbol_ids = set()
+            for name in self._series_messages:
+                entry = self._journal.pop((name, session, args[1]), None)
+                if entry is not None and len(entry[1]) > 3:
+                    symbol_ids.add(entry[1][3])
+            for key, entry in self._journal.items():
+                if key[0] in self._series_messages and key[1] == session and len(entry[1]) > 3:
+                    symbol_ids.discard(entry[1][3])  # symbol is still used by another series
+            for symbol_id in symbol_ids:
+                self._journal.pop(("resolve_symbol", session, symbol_id), None)
+        elif func in self._quote_symbols:
+            entry = self._journal.setdefault((func, session), [func, [session]])
+            entry[1] += [symbol for symbol in args[1:] if symbol not in entry[1][1:]]
+        elif func == "quote_remove_symbols":
+            removed = set(args[1:])
+            for name in self._quote_symbols:
+                entry = self._journal.get((name, session))
+                if entry is not None:
+                    entry[1] = [session] + [symbol for symbol in entry[1][1:] if symbol not in removed]
+                    if len(entry[1]) == 1:
+                        del self._journal[(name, session)]
+        elif func in self._session_deletes:
+            for key in [key for key in self._journal if key[1] == session]:
+                del self._journal[key]
+
+    def journal(self):
+        """Return the recorded session messages as (func, args) pairs in replay order"""
+        with self._lock:
+            return [(func, list(args)) for func, args in self._journal.values()]
+
+    def _write(self, conn, func, args):
+        if args and args[0] in self._actual:
+            args = [self._actual[args[0]]] + list(args[1:])
+        conn.ws.send(protocol.create_message(func, args))
+
+    def send(self, func, args):
+        """Send a message, recording session messages in the journal
+
+        Journaled messages sent while disconnected are not lost, they are
+        sent once the connection is restored.
+
+        Args:
+            func (str): message name, e.g. "create_series"
+            args (list): message parameters, session ids as returned by chart_session and quote_session
+        """
+        with self._lock:
+            self._record(func, args)
+            conn = self._conn
+            if conn is None:
+                return
+            try:
+                self._write(conn, func, args)
+                return
+            except Exception as e:
+                error = e
+        self._drop(conn, error)
+
+    def _ensure_connected(self):
+        # open a connection if there is none, retrying with backoff; None if closed
+        with self._connect_lock:
+            while not self._closed.is_set():
+                conn = self._conn
+                if conn is not None:
+                    return conn
+
+                wait = self._retry_at - time.monotonic()
+                if wait > 0 and self._closed.wait(wait):
+                    break
+
+                try:
+                    conn = self._open_connection()
+                    conn.ws.settimeout(self.poll_interval)
+                except Exception as e:
+                    delay = self._backoff.next()
+                    self._retry_at = time.monotonic() + delay
+                    logger.warning(f"Could not connect, retrying in {delay:.1f}s: {e}")
+                    continue
+
+                if self._setup(conn):
+                    return conn
+        return None
+
+    def _setup(self, conn):
+        # make conn the current connection and restore the sessions on it, False if it failed
+        with self._lock:
+            if self._closed.is_set():
+                conn.close()
+                return False
+            if self._sessions is None:  # the first connection defines the stable session ids
+                self._sessions = (conn.chart_session, conn.quote_session)
+            else:
+                self.reconnects += 1
+                metrics.reconnects.inc()
+            self._actual = dict(zip(self._sessions, (conn.chart_session, conn.quote_session)))
+            self._stable = {actual: stable for stable, actual in self._actual.items()}
+            self._parser = protocol.FrameParser()
+            self._last_frame = time.monotonic()
+            self._received = False
+
+        try:
+            if self.on_connect is not None:
+                self.on_connect(conn)
+            with self._lock:
+                for func, args in self._journal.values():
+                    self._write(conn, func, args)
+                self._conn = conn
+        except Exception as e:
+            self._retry_at = time.monotonic() + self._backoff.next()
+            logger.warning(f"Could not restore sessions: {e}")
+            conn.close()
+            return False
+
+        logger.debug(f"Connected {conn}, replayed {len(self._journal)} session messages")
+        return True
+
+    def _drop(self, conn, reason):
+        # close a failed connection, the next recv reconnects
+        with self._lock:
+            if self._conn is not conn:
+                return  # already dropped
+            self._conn = None
+            self._retry_at = time.monotonic() + self._backoff.next()
+        conn.close()
+        if not self._closed.is_set():
+            logger.warning(f"Connection {conn} lost: {reason}")
+        if self.on_disconnect is not None:
+            try:
+                self.on_disconnect(conn, reason)
+            except Exception as e:
+                logger.error(f"Error in on_disconnect: {e}")
+
+    def reconnect(self, reason="reconnect requested"):
+        """Drop the current connection, the next recv() opens a new one and restores the sessions"""
+        conn = self._conn
+        if conn is not None:
+            self._drop(conn, reason)
+
+    def recv(self):
+        """Receive the next frame, reconnecting if the connection dropped or stalled
+
+        Heartbeats are answered and not returned. Blocks for at most
+        poll_interval seconds once connected, while disconnected it blocks
+        until the connection is restored or the supervisor is closed.
+
+        Returns:
+            list: decoded messages of the frame, empty if nothing was received
+        """
+        conn = self._ensure_connected()
+        if conn is None:
+            return []
+
+        try:
+            frame = conn.ws.recv()
+        except WebSocketTimeoutException:
+            if time.monotonic() - self._last_frame > self.read_timeout:
+                self._drop(conn, f"nothing received for {self.read_timeout}s")
+            return []
+        except Exception as e:
+            self._drop(conn, e)
+            return []
+
+        self._last_frame = time.monotonic()
+        if not self._received:  # connection works, start over with short delays
+            self._received = True
+            self._backoff.reset()
+
+        messages = []
+        for payload, message in self._parser.messages(frame):
+            if message is None:
+                if payload.startswith("~h~"):
+                    try:
+                        conn.ws.send(protocol.prepend_header(payload))
+                    except Exception as e:
+                        self._drop(conn, e)
+                        break
+                continue
+            params = message.get("p")
+            if params and isinstance(params[0], str) and params[0] in self._stable:
+                params[0] = self._stable[params[0]]
+            messages.append(message)
+        return messages
+
+    def close(self):
+        """Close the connection, recv() returns right away from now on"""
+        self._closed.set()
+        self.reconnect("closed")
@@ -0,0 +1,125 @@
+import csv
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolCache:
+    """Thread-safe LRU cache with TTL for symbol search results and metadata
+
+    Holds three kinds of entries: raw search_symbol results keyed by search
+    text and exchange, metadata of single symbols keyed by symbol and
+    exchange, and symbol_resolved info (timezone, session, holidays) keyed
+    by symbol in EXCHANGE:SYMBOL format. Symbols found in search results are
+    indexed as well, so validating a symbol which was seen before needs no
+    HTTP request.
+
+    Args:
+        maxsize (int, optional): maximum number of entries. Defaults to 10000.
+        ttl (float, optional): seconds an entry stays valid. Defaults to 3600.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expiry time or None, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiry, value = entry
+            if expiry is not None and expiry < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key, value, ttl):
+        expiry = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_search(self, text, exchange=''):
+        """Return cached search_symbol result or None"""
+        return self._get(("search", text, exchange))
+
+    def put_search(self, text, exchange, result):
+        """Cache search_symbol result and index the symbols it contains"""
+        self._put(("search", text, exchange), result, self.ttl)
+        items = result.get("symbols", []) if isinstance(result, dict) else result
+        for item in items:
+            if isinstance(item, dict):
+                self.put_symbol(item)
+
+    def get_symbol(self, symbol, exchange):
+        """Return cached metadata dict of symbol or None if unknown"""
+        return self._get(("symbol", symbol, exchange))
+
+    def put_symbol(self, item, ttl=-1):
+        """Cache metadata of a single symbol
+
+        Args:
+            item (dict): symbol metadata, must contain symbol and exchange keys
+            ttl (float, optional): seconds the entry stays valid, None for no expiry.
+                Defaults to the ttl of the cache.
+        """
+        self._put(("symbol", item["symbol"], item["exchange"]), item, self.ttl if ttl == -1 else ttl)
+
+    def get_resolved(self, symbol, extended_session=False):
+        """Return cached symbol_resolved info of symbol in EXCHANGE:SYMBOL format or None"""
+        return self._get(("resolved", symbol, extended_session))
+
+    def put_resolved(self, symbol, info, extended_session=False):
+        """Cache symbol_resolved info received for symbol in EXCHANGE:SYMBOL format"""
+        self._put(("resolved", symbol, extended_session), info, self.ttl)
+
+    def load(self, path, ttl=None):
+        """Preload symbol metadata from a local symbol list file
+
+        The file can be a CSV file with at least symbol and exchange columns,
+        or a JSON file with a list of symbol dicts (or a search_symbol result
+        with a symbols list).
+
+        Args:
+            path (str): path to .csv or .json file
+            ttl (float, optional): seconds the entries stay valid. Defaults to None (no expiry).
+
+        Returns:
+            int: number of loaded symbols
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            if path.lower().endswith(".csv"):
+                items = list(csv.DictReader(f))
+            else:
+                items = json.load(f)
+                if isinstance(items, dict):
+                    items = items.get("symbols", [])
+
+        count = 0
+        for item in items:
+            if item.get("symbol") and item.get("exchange"):
+                self.put_symbol(item, ttl)
+                count += 1
+        logger.info(f"Loaded {count} symbols from {path}")
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# process wide cache shared by all TvDatafeed instances
+symbol_cache = SymbolCache()
@@ -0,0 +1,325 @@
+"""Span hooks around get_hist stages and consumer callbacks
+
+get_hist reports its stages as spans: acquire (taking a pooled
+connection) with connect and auth when a new connection is opened,
+resolve (until symbol_resolved), create_series (until the first bars
+arrive), receive (until series_completed) with one parse span per
+received message, and dataframe. Consumer callbacks are reported as
+consumer_callback spans. Spans are only created while a hook is added or
+the profiler is enabled, otherwise tracing costs one check per stage.
+
+    recorder = tracing.SpanRecorder()
+    tracing.add_hook(recorder)
+    tv.get_hist("NIFTY", "NSE", n_bars=5000)
+    for span in recorder.spans:
+        print(span.name, span.duration, span.attributes)
+
+The opt-in sampling profiler samples the stacks of threads inside
+get_hist or a consumer callback and attaches the most frequent ones to
+spans which took longer than a threshold:
+
+    tracing.enable_profiler(threshold=0.5, callback=lambda span: print(span.format_profile()))
+"""
+import itertools
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_hooks = []
+_profiler = None
+_active = False  # a hook is added or the profiler is enabled
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+def _current():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+class Span:
+    """Timing and attributes of one stage
+
+    Attributes:
+        name (str): stage name, e.g. "get_hist", "resolve" or "consumer_callback"
+        attributes (dict): details of the stage, e.g. symbol, interval or received bytes
+        span_id (int): unique id of the span
+        parent (Span): enclosing span of the same thread, None for root spans
+        trace_id (int): span_id of the root span
+        start_time (float): unix time the stage started
+        duration (float): seconds the stage took, None while it is running
+        thread (str): name of the thread the stage started in
+        error (str): repr of the exception the stage ended with, None if it succeeded
+        profile (list): (sample count, stack) pairs of the slowest calls if the profiler sampled the
+            span and it took longer than the threshold, None otherwise
+    """
+
+    __slots__ = (
+        "name", "attributes", "span_id", "parent", "trace_id", "start_time", "duration", "thread", "error",
+        "profile", "_start", "_samples",
+    )
+
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_ids)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.start_time = time.time()
+        self.duration = None
+        self.thread = threading.current_thread().name
+        self.error = None
+        self.profile = None
+        self._samples = None
+        self._start = time.perf_counter()
+
+    def __repr__(self):
+        duration = "running" if self.duration is None else f"{self.duration:.6f}s"
+        return f"Span('{self.name}',{duration},{self.attributes})"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        """Finish the span and pass it to the hooks, later calls do nothing"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = repr(error)
+        profiler = _profiler
+        if profiler is not None and self._samples is not None:
+            profiler._finish(self)
+        for hook in list(_hooks):
+            try:
+                hook(self)
+            except Exception as e:
+                logger.error(f"Tracing hook {hook} failed: {e}")
+
+    def format_profile(self):
+        """Return the sampled stacks as text, most frequent first"""
+        if not self.profile:
+            return ""
+        total = sum(count for count, _ in self.profile)
+        parts = [f"{self.name} took {self.duration:.3f}s, {total} samples"]
+        for count, stack in self.profile:
+            parts.append(f"{count} samples:\n" + "".join(f"  {line}\n" for line in stack))
+        return "\n".join(parts)
+
+
+class _NoSpan:
+    # returned while tracing is off, every method does nothing
+    __slots__ = ()
+    name = None
+    duration = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start_span(name, **attributes):
+    """Start a span that is ended with end(), e.g. for stages that overlap others
+
+    The span is a child of the span of the enclosing with span() block of
+    this thread but does not become the parent of later spans.
+
+    Returns:
+        Span: the started span, a no-op stand-in if tracing is off
+    """
+    if not _active:
+        return _NO_SPAN
+    return Span(name, attributes, _current())
+
+
+@contextmanager
+def span(name, **attributes):
+    """Report the with block as a span, nested spans become its children
+
+    Yields:
+        Span: the running span, a no-op stand-in if tracing is off
+    """
+    if not _active:
+        yield _NO_SPAN
+        return
+
+    current = Span(name, attributes, _current())
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(current)
+    profiler = _profiler
+    if profiler is not None:
+        profiler._begin(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    finally:
+        stack.pop()
+        current.end()
+
+
+def _update():
+    global _active
+    _active = bool(_hooks) or _profiler is not None
+
+
+def add_hook(hook):
+    """Call hook(span) for every finished span, returns hook"""
+    _hooks.append(hook)
+    _update()
+    return hook
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+    _update()
+
+
+class SpanRecorder:
+    """Hook keeping the last finished spans, e.g. for tests and benchmarks
+
+    Args:
+        maxlen (int, optional): number of spans kept. Defaults to 10000.
+    """
+
+    def __init__(self, maxlen=10000):
+        self.spans = deque(maxlen=maxlen)
+
+    def __call__(self, span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+    def durations(self, name):
+        """Return the durations of the recorded spans of a name"""
+        return [span.duration for span in list(self.spans) if span.name == name]
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads running profiled spans
+
+    A background thread takes a stack sample of every thread inside a
+    profiled root span every interval seconds. When such a span took at
+    least threshold seconds its most frequent stacks are stored in
+    span.profile, logged as a warning and passed to callback. Use
+    enable_profiler() to start it.
+
+    Args:
+        threshold (float, optional): seconds above which a span is reported. Defaults to 1.
+        interval (float, optional): seconds between stack samples. Defaults to 0.005.
+        names (iterable, optional): names of the profiled spans. Defaults to ("get_hist", "consumer_callback").
+        callback (callable, optional): called as callback(span) for every slow span. Defaults to None.
+        top (int, optional): number of stacks kept per span. Defaults to 5.
+        depth (int, optional): frames kept per stack, innermost first. Defaults to 20.
+    """
+
+    def __init__(self, threshold=1.0, interval=0.005, names=("get_hist", "consumer_callback"), callback=None, top=5,
+                 depth=20):
+        self.threshold = threshold
+        self.interval = interval
+        self.names = frozenset(names)
+        self.callback = callback
+        self.top = top
+        self.depth = depth
+        self.slow_spans = 0
+        self._threads = {}  # thread ident -> profiled span running in it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(name="tracing_profiler", target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _begin(self, span):
+        # start sampling the thread of span if it is a profiled span and the thread is not sampled yet
+        if span.name not in self.names:
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                span._samples = Counter()
+                self._threads[ident] = span
+
+    def _finish(self, span):
+        # detached in the same block as the thread entry, so _run cannot add samples afterwards
+        with self._lock:
+            for ident, running in list(self._threads.items()):
+                if running is span:
+                    del self._threads[ident]
+            samples, span._samples = span._samples, None
+        if span.duration < self.threshold or not samples:
+            return
+
+        span.profile = [(count, list(stack)) for stack, count in samples.most_common(self.top)]
+        self.slow_spans += 1
+        logger.warning(f"Slow {span.name} {span.attributes}:\n{span.format_profile()}")
+        if self.callback is not None:
+            try:
+                self.callback(span)
+            except Exception as e:
+                logger.error(f"Profiler callback failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                running = list(self._threads.items())
+            if not running:
+                continue
+            frames = sys._current_frames()
+            for ident, span in running:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = traceback.extract_stack(frame, limit=self.depth)
+                key = tuple(f"{entry.filename}:{entry.lineno} {entry.name}" for entry in reversed(stack))
+                with self._lock:
+                    # the span may have finished since the snapshot, its samples are detached then
+                    if self._threads.get(ident) is span and span._samples is not None:
+                        span._samples[key] += 1
+
+
+def enable_profiler(threshold=1.0, interval=0.005, names=("get_hist", "consumer_callback"), callback=None):
+    """Start sampling stacks of profiled spans, see SamplingProfiler
+
+    Returns:
+        SamplingProfiler: the running profiler
+    """
+    global _profiler
+    disable_profiler()
+    _profiler = SamplingProfiler(threshold, interval, names, callback).start()
+    _update()
+    return _profiler
+
+
+def disable_profiler():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    _update()
+    if profiler is not None:
+        profiler.stop()